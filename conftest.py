@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent / "src_shiny_app"
+
+# The app and the packages vendored next to it are imported from its directory,
+# whose own test suites (e.g. h11's) are not ours to run.
+sys.path.insert(0, str(APP_DIR))
+collect_ignore = ["src_shiny_app", "docs"]
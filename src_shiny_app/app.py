@@ -1,71 +1,368 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from shiny import reactive, req
 from shiny.express import input, render, ui
-import numpy as np
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from fieldsim import (
+    Simulation,
+    draw_field,
+    parse_config,
+    parse_particles,
+    parse_probes,
+    trace,
+)
+from fieldsim.export import EXPORTS, aiter_chunks
+from fieldsim.flight import compute_field_shared
+from fieldsim.monitor import instrument_shiny as monitor_callbacks
+from fieldsim.monitor import monitor
+from fieldsim.output import field_canvas
+from fieldsim.presets import PRESETS, PresetStore
+from fieldsim.raster import heatmap_png, png_file
+from fieldsim.summary import summarize
+from fieldsim.sweep import GIF_TRAILER, MAX_FRAMES, Sweep, aiter_frames, gif_frame
+from fieldsim.tracing import instrument_shiny, tracer
+
+# Stage timings are only collected with FIELDSIM_TRACE=1, and event-loop lag
+# and slow reactive callbacks with FIELDSIM_LOOP_MONITOR=1. `python -m fieldsim
+# serve` serves both, next to the field API.
+if tracer.enabled:
+    instrument_shiny()
+if monitor.enabled:
+    monitor_callbacks()
 
-MAX_VALUE = 10**5
+presets = PresetStore(Path(__file__).parent / "www" / "presets")
 
 Q = [(0, 1, -2), (-1, 2, 3), (4, -1, 7), (0, 0, -1)]
+ui.input_select(
+    "preset",
+    "Готовые примеры:",
+    {"": "Свой набор зарядов", **{name: preset.label for name, preset in PRESETS.items()}},
+)
 ui.input_text("charge_input", "Введите заряды:", value=str(Q), width="100%")
 ui.help_text("Заряды вводятся в формате списка кортежей (x, y, заряд), например [(0, 1, -2), (-2, 1, 1)].")
+ui.help_text(
+    "Заземлённые проводники добавляются в тот же список: ('plane', x0, y0, nx, ny) — плоскость через точку (x0, y0) "
+    "с нормалью (nx, ny), направленной к зарядам; ('sphere', x, y, R) — сфера радиуса R."
+)
+ui.help_text(
+    "Распределённые заряды: ('segment', x1, y1, x2, y2, λ1, λ2) — отрезок с линейной плотностью от λ1 до λ2; "
+    "('arc', x, y, R, угол1, угол2, λ1, λ2) — дуга (углы в градусах); ('polygon', [(x, y), ...], λ1, λ2) — контур "
+    "многоугольника, плотность меняется вдоль него от λ1 в первой вершине до λ2 при возвращении в неё; "
+    "('disc', x, y, R, σ) — диск с поверхностной плотностью σ. Вторую плотность λ2 можно опустить."
+)
+
+
+@reactive.calc
+def config():
+    try:
+        return parse_config(input.charge_input())
+    except (ValueError, SyntaxError):
+        req(False)
+
+
+@reactive.calc
+def preset_name():
+    return presets.match(config())
+
+
+# The computation runs outside of Shiny's reactive lock, which every session's
+# flush holds: awaited from a calc it would keep other sessions from even
+# joining it in compute_field_shared until it was done.
+@reactive.extended_task
+async def field_task(config):
+    return await compute_field_shared(config)
+
+
+@reactive.effect
+def _compute_field():
+    field_task.cancel()
+    if preset_name() is None:
+        field_task(config())
+
+
+@reactive.calc
+def field():
+    name = preset_name()
+    if name is not None:
+        return presets.field(name, config())
+    return field_task.result()
+
+
+@reactive.calc
+def charge_summary():
+    return summarize(config())
+
+
+@reactive.effect
+@reactive.event(input.preset)
+def _apply_preset():
+    if input.preset():
+        ui.update_text("charge_input", value=PRESETS[input.preset()].text)
+
 
 with ui.card(full_screen=True):
-    
+
+    # Presets are drawn ahead of time and fetched by the browser as static files.
+    @render.ui
+    def preset_image():
+        name = preset_name()
+        req(name is not None)
+        return ui.img(src="presets/{}.png".format(name), style="width: 100%;")
+
     @render.plot
     def plot():
+        req(preset_name() is None)
+        result = field()
+        fig, ax = plt.subplots()
+        draw_field(ax, result)
+
+        return fig
+
+with ui.card(full_screen=True):
+    ui.input_radio_buttons(
+        "heatmap_quantity",
+        None,
+        {"magnitude": "Модуль напряжённости |E|", "potential": "Потенциал"},
+        inline=True,
+    )
+
+    @render.image(delete_file=True)
+    def heatmap():
+        width = input[".clientdata_output_heatmap_width"]()
+        height = input[".clientdata_output_heatmap_height"]()
+        ratio = input[".clientdata_pixelratio"]()
+        png, w, h = heatmap_png(
+            field(), int(width * ratio), int(height * ratio), input.heatmap_quantity()
+        )
+
+        return {"src": png_file(png), "width": w / ratio, "height": h / ratio}
+
+with ui.card(full_screen=True):
+
+    @field_canvas
+    def canvas():
+        return field()
+
+with ui.card(full_screen=True):
+    ui.card_header("Данные поля")
+    ui.input_radio_buttons(
+        "export_format",
+        None,
+        {name: export.label for name, export in EXPORTS.items()},
+        inline=True,
+    )
+
+    # The file is encoded piece by piece on a worker thread while it is sent,
+    # from the same field the plots use.
+    @render.download(
+        filename=lambda: EXPORTS[input.export_format()].filename,
+        media_type=lambda: EXPORTS[input.export_format()].media_type,
+        label="Скачать",
+    )
+    async def field_download():
+        export = EXPORTS[input.export_format()]
+        async for chunk in aiter_chunks(export.chunks(field())):
+            yield chunk
+
+with ui.card(full_screen=True):
+    ui.card_header("Траектории пробных зарядов")
+    ui.input_text(
+        "probe_input",
+        "Пробные заряды (x, y, vx, vy):",
+        value="[(-2, -1.5, 3000, 0), (-2, -1, 3000, 0), (-2, 0.5, 3000, 0), (-2, 3, 3000, 0)]",
+        width="100%",
+    )
+    with ui.layout_columns():
+        ui.input_numeric("probe_charge", "Заряд пробной частицы", value=0.001)
+        ui.input_numeric("probe_mass", "Масса пробной частицы", value=1, min=0)
+
+    @render.plot
+    def trajectory_plot():
+        result = field()
         try:
-            user_input = input.charge_input()
-            Q = eval(user_input)
-
-
-            for q in Q:
-                if abs(q[0]) > MAX_VALUE or abs(q[1]) > MAX_VALUE or abs(q[2]) > MAX_VALUE:
-                    raise ValueError(f"Значение для зарядов или их координат превышает допустимый предел {MAX_VALUE}.")
-                    return
-            if not all(isinstance(q, tuple) and len(q) == 3 for q in Q):
-                raise ValueError("Неверный формат заряда. Ожидается список кортежей в формате [(x, y, заряд), ...]")
-                return
-        except Exception as e:
-            return
+            probes = parse_probes(input.probe_input())
+        except ValueError:
+            req(False)
+        q = input.probe_charge()
+        m = input.probe_mass()
+        req(q is not None and m is not None and m > 0)
+        paths = trace(result.config, probes, q, m, field=result)
+
+        fig, ax = plt.subplots()
+        draw_field(ax, result)
+        ax.plot(paths.paths[:, :, 0], paths.paths[:, :, 1], color='orange', linewidth=1.5)
+        ax.set_xlim(result.x[0, 0], result.x[0, -1])
+        ax.set_ylim(result.y[0, 0], result.y[-1, 0])
+
+        return fig
+
+with ui.card(full_screen=True):
+    ui.card_header("Силы и энергии")
+
+    @render.data_frame
+    def summary():
+        s = charge_summary()
+        return pd.DataFrame(
+            {
+                "x": s.charges[:, 0],
+                "y": s.charges[:, 1],
+                "Заряд": s.charges[:, 2],
+                "Fx, Н": s.forces[:, 0],
+                "Fy, Н": s.forces[:, 1],
+                "|F|, Н": np.hypot(s.forces[:, 0], s.forces[:, 1]),
+                "Потенциальная энергия, Дж": s.energies,
+            }
+        ).map("{:.4g}".format)
+
+    @render.text
+    def summary_totals():
+        s = charge_summary()
+        return (
+            "Полная энергия: {:.6g} Дж; дипольный момент: ({:.4g}, {:.4g}); "
+            "квадрупольный момент: Qxx = {:.4g}, Qyy = {:.4g}, Qxy = {:.4g}"
+        ).format(s.total_energy, *s.dipole, *s.quadrupole)
+
+with ui.card(full_screen=True):
+    ui.card_header("Анимация")
+    with ui.layout_columns():
+        ui.input_numeric("sweep_charge", "Номер заряда", value=2, min=1)
+        ui.input_select("sweep_parameter", "Параметр", {"x": "x", "y": "y", "q": "Заряд"})
+        ui.input_numeric("sweep_start", "От", value=-5)
+        ui.input_numeric("sweep_end", "До", value=5)
+        ui.input_numeric("sweep_frames", "Кадров", value=40, min=2, max=MAX_FRAMES)
+
+    @render.download(filename="sweep.gif", media_type="image/gif", label="Скачать GIF")
+    async def sweep_download():
+        try:
+            sweep = Sweep(
+                config(),
+                int(input.sweep_charge()) - 1,
+                input.sweep_parameter(),
+                input.sweep_start(),
+                input.sweep_end(),
+                int(input.sweep_frames()),
+            )
+        except (TypeError, ValueError) as e:
+            ui.notification_show(str(e), type="error")
+            # Breaking off the response makes the browser report the download
+            # as failed, instead of saving an empty sweep.gif.
+            raise
+        # Frames are streamed to the browser as soon as they are rendered.
+        first = True
+        async for frame in aiter_frames(sweep):
+            yield gif_frame(frame, first=first)
+            first = False
+        yield GIF_TRAILER
+
+FRAME_RATE = 10
+FRAME_STEPS = 50
+
+dynamics = reactive.value(None)
+frame = reactive.value(None)
+
+with ui.card(full_screen=True):
+    ui.card_header("Динамика зарядов")
+    ui.input_text(
+        "particle_input",
+        "Подвижные заряды (x, y, заряд[, масса[, vx, vy]]):",
+        value="[(-2, 0, 1, 1, 0, -30000), (2, 0, -1, 1, 0, 30000)]",
+        width="100%",
+    )
+    ui.help_text("Заряды из основного поля ввода остаются неподвижными и действуют на подвижные.")
+    with ui.layout_columns():
+        ui.input_action_button("dynamics_start", "Запустить")
+        ui.input_action_button("dynamics_stop", "Остановить")
+
+    @render.plot
+    def dynamics_plot():
+        current = dynamics()
+        f = frame()
+        req(current is not None and f is not None)
+        simulation, _, view = current
+        fixed = simulation.fixed
+        colors = ['red' if q > 0 else 'blue' for q in simulation.particles.q]
 
-        x_coords = [q[0] for q in Q]
-        y_coords = [q[1] for q in Q]
-
-        padding = 1
-
-        x1 = min(x_coords) - padding
-        x2 = max(x_coords) + padding
-        y1 = min(y_coords) - padding
-        y2 = max(y_coords) + padding
-        
-        lres = 10
-        
-        m, n = lres * (y2 - y1), lres * (x2 - x1)
-        x, y = np.linspace(x1, x2, n), np.linspace(y1, y2, m)
-        x, y = np.meshgrid(x, y)
-        Ex = np.zeros((m, n)) 
-        Ey = np.zeros((m, n)) 
-
-        k = 9 * 10**9
-        
-        for j in range(m):
-            for i in range(n):
-                xp, yp = x[j][i], y[j][i]
-                for q in Q:
-                    deltaX = xp - q[0]
-                    deltaY = yp - q[1] 
-
-                    distance = (deltaX**2 + deltaY**2)**0.5
-
-                    E = (k * q[2]) / (distance**2)     
-                    Ex[j][i] += E * (deltaX / distance)
-                    Ey[j][i] += E * (deltaY / distance) 
-        
         fig, ax = plt.subplots()
         ax.set_aspect('equal')
-        ax.scatter([q[0] for q in Q], [q[1] for q in Q], c='red', s=[abs(q[2])*50 for q in Q], zorder=1)
-        for q in Q:
-            ax.text(q[0] + 0.1, q[1] - 0.3, '{}'.format(q[2]), color='black', zorder=2)
-        ax.streamplot(x, y, Ex, Ey, linewidth=1, density=1.5, zorder=0)
-        ax.set_title('Симуляция электростатического поля')
+        ax.set_xlim(view[0], view[1])
+        ax.set_ylim(view[2], view[3])
+        ax.scatter(fixed[:, 0], fixed[:, 1], c='gray', s=abs(fixed[:, 2]) * 50, zorder=1)
+        ax.scatter(f.pos[:, 0], f.pos[:, 1], c=colors, s=30, zorder=2)
+        ax.set_title('t = {:.3g} с'.format(f.t))
 
         return fig
+
+    @render.text
+    def dynamics_status():
+        f = frame()
+        req(f is not None)
+        return "Шагов: {}, энергия: {:.6g} Дж, дрейф энергии: {:.2e}".format(f.steps, f.energy, f.drift)
+
+
+@reactive.effect
+@reactive.event(input.dynamics_start)
+def _start_dynamics():
+    try:
+        particles = parse_particles(input.particle_input())
+    except ValueError as e:
+        ui.notification_show(str(e), type="error")
+        return
+    try:
+        fixed = parse_config(input.charge_input()).charges
+    except ValueError as e:
+        ui.notification_show("Неподвижные заряды: {}".format(e), type="error")
+        return
+
+    simulation = Simulation(particles, fixed)
+    points = np.vstack((particles.pos, simulation.fixed[:, :2]))
+    padding = max(np.ptp(points), 1)
+    view = (points[:, 0].min() - padding, points[:, 0].max() + padding,
+            points[:, 1].min() - padding, points[:, 1].max() + padding)
+    frames = simulation.frames(FRAME_STEPS * simulation.time_step(), max_steps_per_frame=10 * FRAME_STEPS)
+    dynamics.set((simulation, frames, view))
+
+
+@reactive.effect
+@reactive.event(input.dynamics_stop)
+def _stop_dynamics():
+    dynamics.set(None)
+
+
+# Up to 10 * FRAME_STEPS steps per frame, taken on a worker thread outside of
+# the reactive lock so that other sessions' updates go on meanwhile (Pyodide
+# has no threads, so there they run inline).
+@reactive.extended_task
+async def _next_frame(current):
+    start = time.perf_counter()
+    _, frames, _ = current
+    if sys.platform == "emscripten":
+        next_frame = next(frames)
+    else:
+        next_frame = await asyncio.to_thread(next, frames)
+    await asyncio.sleep(max(0.0, 1 / FRAME_RATE - (time.perf_counter() - start)))
+    return current, next_frame
+
+
+@reactive.effect
+def _stream_frames():
+    current = dynamics()
+    _next_frame.cancel()
+    if current is not None:
+        _next_frame(current)
+
+
+@reactive.effect
+def _show_frame():
+    current, next_frame = _next_frame.result()
+    with reactive.isolate():
+        # The simulation may have been stopped or restarted meanwhile.
+        if dynamics() is not current:
+            return
+    frame.set(next_frame)
+    _next_frame(current)
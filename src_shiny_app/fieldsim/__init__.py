@@ -0,0 +1,40 @@
+from ._validation import MAX_VALUE
+from .charges import Config, parse_config, parse_particles, parse_probes
+from .conductors import Conductor, GroundedPlane, GroundedSphere, image_charges
+from .distributions import Arc, Disc, Distribution, Polygon, Segment
+from .dynamics import Particles, Simulation
+from .engine import FieldResult, compute_field, field_at, make_grid
+from .kernel import superpose
+from .plotting import draw_field
+from .symmetry import detect_symmetries, symmetric_superpose
+from .trajectories import Trajectories, launch_fan, trace
+
+__all__ = (
+    "MAX_VALUE",
+    "Config",
+    "parse_config",
+    "parse_particles",
+    "parse_probes",
+    "Conductor",
+    "GroundedPlane",
+    "GroundedSphere",
+    "image_charges",
+    "Distribution",
+    "Segment",
+    "Polygon",
+    "Arc",
+    "Disc",
+    "Particles",
+    "Simulation",
+    "FieldResult",
+    "compute_field",
+    "field_at",
+    "make_grid",
+    "superpose",
+    "draw_field",
+    "detect_symmetries",
+    "symmetric_superpose",
+    "Trajectories",
+    "launch_fan",
+    "trace",
+)
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from . import accuracy
+from . import bench as benchmarks
+from . import load as loadtest
+from .batch import read_configs, render_batch
+from .cache import CACHE_DIR_ENV, CACHE_MAX_BYTES, DiskCache
+from .charges import parse_config
+from .presets import PRESETS, build_presets
+from .sweep import FRAME_DPI, Sweep, gif_stream, iter_frames
+
+
+@click.group("fieldsim")
+def main() -> None:
+    pass
+
+
+@main.command(
+    help="""Render field diagrams for many configurations at once.
+
+SOURCE is a directory of configuration files (*.txt, *.py), each holding a list
+of charges in the same syntax as the app's input box, or a JSONL file with one
+{"name": ..., "config": ...} object per line. Images are written to DEST;
+configurations that have not changed since the last run are skipped.
+"""
+)
+@click.argument("source", type=click.Path(exists=True, path_type=Path))
+@click.argument("dest", type=click.Path(file_okay=False, path_type=Path))
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(["png", "svg"]),
+    default="png",
+    show_default=True,
+    help="Image format.",
+)
+@click.option("--dpi", type=int, default=100, show_default=True, help="Resolution of PNG images.")
+@click.option(
+    "-j",
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of worker processes. Defaults to the number of CPUs.",
+)
+@click.option("--force", is_flag=True, default=False, help="Re-render unchanged configurations.")
+def render(
+    source: Path, dest: Path, fmt: str, dpi: int, workers: Optional[int], force: bool
+) -> None:
+    report = render_batch(source, dest, fmt, dpi, workers, force)  # type: ignore[arg-type]
+    for outcome in report.failed:
+        click.echo("{}: {}".format(outcome.name, outcome.error), err=True)
+    click.echo(report.describe())
+    if report.failed:
+        raise SystemExit(1)
+
+
+@main.command(
+    help="""Compute fields ahead of time into the on-disk field cache.
+
+SOURCE is a directory or JSONL file of configurations, as for `render`. Without
+it, the preset gallery is cached.
+"""
+)
+@click.argument("source", type=click.Path(exists=True, path_type=Path), required=False)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    envvar=CACHE_DIR_ENV,
+    required=True,
+    help=f"Cache directory. Defaults to ${CACHE_DIR_ENV}.",
+)
+@click.option(
+    "--max-bytes",
+    type=int,
+    default=CACHE_MAX_BYTES,
+    show_default=True,
+    help="Size limit of the cache.",
+)
+def warm(source: Optional[Path], cache_dir: Path, max_bytes: int) -> None:
+    cache = DiskCache(cache_dir, max_bytes)
+    if source is None:
+        configs = [(name, preset.text) for name, preset in PRESETS.items()]
+    else:
+        configs = read_configs(source)
+    count = 0
+    for name, text in configs:
+        try:
+            config = parse_config(text)
+        except ValueError as e:
+            click.echo("{}: {}".format(name, e), err=True)
+            continue
+        cache.compute_field(config)
+        count += 1
+    click.echo("{} configurations cached, {:.1f} MiB in {}".format(count, cache.size() / 2**20, cache_dir))
+
+
+@main.command(
+    help="""Precompute the preset gallery into DEST.
+
+Run this before deploying or exporting the app, with DEST set to the app's
+www/presets directory, so that presets are served as static files.
+"""
+)
+@click.argument("dest", type=click.Path(file_okay=False, path_type=Path))
+@click.option("--dpi", type=int, default=100, show_default=True, help="Resolution of the images.")
+def presets(dest: Path, dpi: int) -> None:
+    index = build_presets(dest, dpi)
+    click.echo("{} presets written to {}".format(len(index), dest))
+
+
+@main.command(
+    help="""Animate one charge parameter of a configuration.
+
+CONFIG is a list of charges in the app's input syntax. Charge number CHARGE
+(counting from 1) has its PARAMETER (x, y or q) moved from START to END. If
+OUTPUT ends in .gif an animated GIF is written, otherwise OUTPUT is a directory
+that receives numbered PNG frames, e.g. for `ffmpeg -i frame-%04d.png out.mp4`.
+"""
+)
+@click.argument("config")
+@click.argument("output", type=click.Path(path_type=Path))
+@click.option("--charge", type=int, default=1, show_default=True, help="Number of the charge to move.")
+@click.option("--parameter", type=click.Choice(["x", "y", "q"]), default="x", show_default=True)
+@click.option("--start", type=float, required=True)
+@click.option("--end", type=float, required=True)
+@click.option("--frames", type=int, default=40, show_default=True)
+@click.option("--dpi", type=int, default=FRAME_DPI, show_default=True)
+@click.option("-j", "--workers", type=int, default=None, help="Number of worker processes.")
+def sweep(
+    config: str,
+    output: Path,
+    charge: int,
+    parameter: str,
+    start: float,
+    end: float,
+    frames: int,
+    dpi: int,
+    workers: Optional[int],
+) -> None:
+    try:
+        spec = Sweep(parse_config(config), charge - 1, parameter, start, end, frames)  # type: ignore[arg-type]
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    if output.suffix == ".gif":
+        with output.open("wb") as f:
+            for chunk in gif_stream(iter_frames(spec, "gif", dpi, workers)):
+                f.write(chunk)
+    else:
+        output.mkdir(parents=True, exist_ok=True)
+        for k, frame in enumerate(iter_frames(spec, "png", dpi, workers)):
+            (output / "frame-{:04d}.png".format(k)).write_bytes(frame)
+    click.echo("{} frames written to {}".format(frames, output))
+
+
+def _int_list(ctx: click.Context, param: click.Parameter, value: str) -> list[int]:
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise click.BadParameter("expected comma-separated integers")
+
+
+@main.group(help="Benchmark the field engine and the render path.")
+def bench() -> None:
+    pass
+
+
+@bench.command(
+    "run",
+    help="""Run the benchmark matrix and write the timings to OUTPUT as JSON.
+
+Every stage is timed over the charge counts and grid sides it depends on;
+cases estimated to exceed --max-work pair interactions are skipped. PATTERN
+restricts the run to matching case names or keys, e.g. 'field/*' or
+'parse[charges=100]'.
+""",
+)
+@click.argument("output", type=click.Path(dir_okay=False, path_type=Path))
+@click.argument("pattern", nargs=-1)
+@click.option(
+    "--charges",
+    default=",".join(map(str, benchmarks.CHARGE_COUNTS)),
+    show_default=True,
+    callback=_int_list,
+    help="Charge counts.",
+)
+@click.option(
+    "--grid",
+    default=",".join(map(str, benchmarks.GRID_SIDES)),
+    show_default=True,
+    callback=_int_list,
+    help="Grid sides, in points.",
+)
+@click.option(
+    "--max-work",
+    type=float,
+    default=benchmarks.MAX_WORK,
+    show_default=True,
+    help="Skip cases estimated to need more pair interactions than this.",
+)
+@click.option(
+    "--repeat", type=int, default=benchmarks.REPEATS, show_default=True, help="Timed runs per case."
+)
+def bench_run(
+    output: Path,
+    pattern: tuple[str, ...],
+    charges: list[int],
+    grid: list[int],
+    max_work: float,
+    repeat: int,
+) -> None:
+    selected = benchmarks.select(list(benchmarks.cases(charges, grid)), pattern)
+
+    def progress(case: benchmarks.Case, result: Optional[benchmarks.Result]) -> None:
+        if result is None:
+            click.echo("{:<50} skipped".format(case.key))
+        else:
+            click.echo("{:<50} {:10.4f} s".format(case.key, result.best))
+
+    report = benchmarks.run_benchmarks(selected, int(max_work), repeat, progress)
+    output.write_text(json.dumps(report.to_json(), indent=1), encoding="utf-8")
+    click.echo(
+        "{} cases timed, {} skipped; results in {}".format(
+            len(report.results), len(report.skipped), output
+        )
+    )
+
+
+@bench.command(
+    "compare",
+    help="""Compare benchmark results in CURRENT against BASELINE.
+
+Exits with status 1 if any case got slower by more than --threshold.
+""",
+)
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option(
+    "--threshold",
+    type=float,
+    default=benchmarks.THRESHOLD,
+    show_default=True,
+    help="Relative slowdown that counts as a regression.",
+)
+def bench_compare(baseline: Path, current: Path, threshold: float) -> None:
+    try:
+        before = benchmarks.load_results(baseline)
+        after = benchmarks.load_results(current)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    for line in benchmarks.machine_differences(before, after):
+        click.echo("machine differs, {}".format(line), err=True)
+    comparisons = benchmarks.compare(before, after, threshold)
+    for c in comparisons:
+        ratio = "" if c.ratio is None else "{:7.2f}x".format(c.ratio)
+        click.echo("{:<50} {:<8} {}".format(c.key, c.status, ratio))
+    slower = [c for c in comparisons if c.status == "slower"]
+    click.echo(
+        "{} of {} cases slower by more than {:.0%}".format(len(slower), len(comparisons), threshold)
+    )
+    if slower:
+        raise SystemExit(1)
+
+
+@main.command(
+    "accuracy",
+    help="""Check every field and force solver against an exact reference.
+
+Each solver runs on randomized and adversarial configurations (uniform,
+clustered, far out near the coordinate limit, near-coincident pairs). The
+maximum and RMS relative errors of E and V are reported with the wall time and
+peak memory, and written to OUTPUT as JSON. The reference sums in mpmath when
+it is installed and the case is small, otherwise exactly rounded float64
+(math.fsum).
+""",
+)
+@click.argument("output", type=click.Path(dir_okay=False, path_type=Path))
+@click.option(
+    "--charges",
+    default=",".join(map(str, accuracy.CHARGE_COUNTS)),
+    show_default=True,
+    callback=_int_list,
+    help="Charge counts.",
+)
+@click.option(
+    "--scenario",
+    "scenarios",
+    type=click.Choice(accuracy.SCENARIOS),
+    multiple=True,
+    help="Scenarios to run; all by default.",
+)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option(
+    "--repeat", type=int, default=accuracy.REPEATS, show_default=True, help="Timed runs per case."
+)
+def accuracy_command(
+    output: Path, charges: list[int], scenarios: tuple[str, ...], seed: int, repeat: int
+) -> None:
+    header = ("solver", "scenario", "charges", "E max", "E rms", "V max", "V rms", "cov")
+    click.echo(
+        "{:<24} {:<10} {:>7} {:>9} {:>9} {:>9} {:>9} {:>5} {:>10} {:>9}".format(
+            *header, "time, s", "peak, MB"
+        )
+    )
+    measurements = []
+    for m in accuracy.measure(charges, scenarios or accuracy.SCENARIOS, seed, repeat):
+        measurements.append(m)
+        click.echo(
+            "{:<24} {:<10} {:>7} {:9.2e} {:9.2e} {:9.2e} {:9.2e} {:5.2f} {:10.4f} {:9.2f}".format(
+                m.solver,
+                m.scenario,
+                m.charges,
+                m.e_max,
+                m.e_rms,
+                m.v_max,
+                m.v_rms,
+                m.coverage,
+                m.seconds,
+                m.peak_bytes / 1e6,
+            )
+        )
+    output.write_text(json.dumps(accuracy.to_json(measurements), indent=1), encoding="utf-8")
+
+
+@main.command(
+    help="""Run the app together with its HTTP endpoints.
+
+Serves the app, POST /api/field, and, when enabled with FIELDSIM_TRACE=1 and
+FIELDSIM_LOOP_MONITOR=1, /debug/trace.json, /debug/metrics and /admin/loop.
+`shiny run app.py` serves the app alone.
+"""
+)
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8000, show_default=True)
+def serve(host: str, port: int) -> None:
+    import uvicorn
+
+    from .server import create_app
+
+    uvicorn.run(create_app(), host=host, port=port)
+
+
+@main.command(
+    "load",
+    help="""Simulate many concurrent users of the app and report latencies.
+
+Each session opens the app, then replays edits of the charge box from SCRIPT
+(a directory or JSONL file of configurations, as for `render`; random
+configurations by default) with pauses of about --think seconds. Sessions run
+in this process unless --url points at a running server's websocket, e.g.
+ws://127.0.0.1:8000/websocket/. Reports p50/p95/p99 update latency, event-loop
+lag (in-process only) and CPU time per session.
+""",
+)
+@click.argument("script", type=click.Path(exists=True, path_type=Path), required=False)
+@click.option("-n", "--sessions", type=int, default=loadtest.SESSIONS, show_default=True)
+@click.option(
+    "--updates", type=int, default=loadtest.UPDATES, show_default=True, help="Edits per session."
+)
+@click.option(
+    "--think",
+    type=float,
+    default=loadtest.THINK_TIME,
+    show_default=True,
+    help="Mean pause between edits, in seconds.",
+)
+@click.option(
+    "--ramp-up",
+    type=float,
+    default=loadtest.RAMP_UP,
+    show_default=True,
+    help="Seconds over which sessions are opened.",
+)
+@click.option("--url", default=None, help="Websocket URL of a running app.")
+@click.option(
+    "--server-pid", type=int, default=None, help="Process to measure CPU time of, with --url."
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Also write the results to this JSON file.",
+)
+def load(
+    script: Optional[Path],
+    sessions: int,
+    updates: int,
+    think: float,
+    ramp_up: float,
+    url: Optional[str],
+    server_pid: Optional[int],
+    output: Optional[Path],
+) -> None:
+    texts = None if script is None else [text for _, text in read_configs(script)]
+    try:
+        report = asyncio.run(
+            loadtest.run_load(sessions, updates, think, ramp_up, texts, url, server_pid)
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    click.echo(report.describe())
+    for error in report.errors[:10]:
+        click.echo(error, err=True)
+    if output is not None:
+        output.write_text(json.dumps(report.to_json(), indent=1), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
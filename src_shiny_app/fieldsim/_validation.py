@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+MAX_VALUE = 10**5
+
+
+def check_limit(*values: float) -> None:
+    for v in values:
+        if abs(v) > MAX_VALUE:
+            raise ValueError(
+                f"Значение для зарядов или их координат превышает допустимый предел {MAX_VALUE}."
+            )
+
+
+def is_number(value: object) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
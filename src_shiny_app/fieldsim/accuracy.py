@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import math
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterator, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from ._validation import MAX_VALUE
+from .bench import EXTENT, machine_info, random_charges
+from .charges import Config
+from .dynamics import direct_forces, tree_forces
+from .engine import compute_field, grid_extent
+from .kernel import K, superpose
+from .symmetry import symmetric_superpose
+from .trajectories import GridField
+
+Array = npt.NDArray[np.float64]
+Arrays = tuple[Array, ...]
+FieldSolver = Callable[[Array, Array, Array], Arrays]
+ForceSolver = Callable[[Array, Array], Arrays]
+
+CHARGE_COUNTS = (10, 100, 1_000, 4_000)
+SCENARIOS = ("uniform", "clustered", "far", "coincident")
+# Side of the grid of points the field solvers are checked on.
+PROBE_SIDE = 48
+TREE_THETAS = (0.3, 0.5, 0.8)
+REPEATS = 3
+# Cases whose reference needs more pair terms than this are skipped.
+REFERENCE_LIMIT = 2 * 10**7
+# The mpmath reference is used up to this many pair terms, if it is installed.
+MPMATH_LIMIT = 2 * 10**5
+MPMATH_DIGITS = 40
+# Spread of a cluster and separation of a near-coincident pair.
+CLUSTER_SIGMA = 1e-3
+PAIR_SEPARATION = 1e-7
+
+
+def scenario_charges(scenario: str, n: int, seed: int = 0) -> npt.NDArray[np.float64]:
+    """
+    ``n`` charges laid out to stress one weakness of the solvers:
+
+    ``uniform``
+        Scattered over a square, the easy case.
+    ``clustered``
+        Tight Gaussian clusters, which tree codes and grid interpolation find hard.
+    ``far``
+        Spread over a few units next to ``MAX_VALUE``, where differences of
+        large coordinates lose digits.
+    ``coincident``
+        Opposite charges in pairs a hair apart, whose fields nearly cancel.
+    """
+    rng = np.random.default_rng(seed)
+    charges = random_charges(n, seed)
+    if scenario == "uniform":
+        pass
+    elif scenario == "clustered":
+        centers = rng.uniform(-EXTENT, EXTENT, (max(1, n // 50), 2))
+        members = rng.integers(len(centers), size=n)
+        charges[:, :2] = centers[members] + rng.normal(0, CLUSTER_SIGMA, (n, 2))
+    elif scenario == "far":
+        charges[:, :2] += 0.99 * MAX_VALUE
+    elif scenario == "coincident":
+        half = n // 2
+        charges[half : 2 * half, :2] = charges[:half, :2] + PAIR_SEPARATION
+        charges[half : 2 * half, 2] = -charges[:half, 2]
+    else:
+        raise ValueError(f"unknown scenario {scenario!r}")
+    return charges
+
+
+def probe_grid(charges: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.float64], ...]:
+    x1, x2, y1, y2 = grid_extent(Config(charges))
+    return tuple(np.meshgrid(np.linspace(x1, x2, PROBE_SIDE), np.linspace(y1, y2, PROBE_SIDE)))
+
+
+def _interpolated(
+    charges: npt.NDArray[np.float64], x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+) -> Arrays:
+    # What the trajectory tracer does: interpolate the app's grid, with points
+    # too close to a source left to a direct evaluation (NaN here).
+    field = GridField(compute_field(Config(charges)))
+    Ex, Ey, usable = field.lookup(x, y)
+    Ex[~usable] = Ey[~usable] = np.nan
+    return Ex, Ey, np.full(x.shape, np.nan)
+
+
+def _float32(
+    charges: npt.NDArray[np.float64], x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+) -> Arrays:
+    return superpose(charges.astype(np.float32), x.astype(np.float32), y.astype(np.float32))
+
+
+FIELD_SOLVERS: dict[str, FieldSolver] = {
+    "field/direct": superpose,
+    "field/symmetric": symmetric_superpose,
+    "field/float32": _float32,
+    "field/interpolated": _interpolated,
+}
+
+
+def _tree(theta: float) -> ForceSolver:
+    return lambda pos, q: tree_forces(pos, q, softening=0.0, theta=theta)
+
+
+FORCE_SOLVERS: dict[str, ForceSolver] = {
+    "forces/direct": lambda pos, q: direct_forces(pos, q, softening=0.0),
+    **{"forces/tree[theta={}]".format(theta): _tree(theta) for theta in TREE_THETAS},
+}
+
+
+def reference_field(
+    charges: npt.NDArray[np.float64], px: npt.NDArray[np.float64], py: npt.NDArray[np.float64]
+) -> tuple[Arrays, str]:
+    """
+    ``(Ex, Ey, V)`` at the points ``(px, py)``, with every sum taken exactly:
+    in ``mpmath`` when it is installed and the problem is small, otherwise
+    with float64 terms added by :func:`math.fsum`. Coincident points get no
+    contribution, as in :func:`~fieldsim.kernel.superpose`.
+    """
+    if len(charges) * px.size <= MPMATH_LIMIT:
+        try:
+            return _reference_mpmath(charges, px, py), "mpmath"
+        except ImportError:
+            pass
+    Ex, Ey, V = (np.empty(px.size) for _ in range(3))
+    for i, (x, y) in enumerate(zip(px.ravel(), py.ravel())):
+        dx = x - charges[:, 0]
+        dy = y - charges[:, 1]
+        r2 = dx * dx + dy * dy
+        keep = r2 > 0
+        kq_r = K * charges[keep, 2] / np.sqrt(r2[keep])
+        kq_r3 = kq_r / r2[keep]
+        Ex[i] = math.fsum(kq_r3 * dx[keep])
+        Ey[i] = math.fsum(kq_r3 * dy[keep])
+        V[i] = math.fsum(kq_r)
+    return (Ex.reshape(px.shape), Ey.reshape(px.shape), V.reshape(px.shape)), "fsum"
+
+
+def _reference_mpmath(
+    charges: npt.NDArray[np.float64], px: npt.NDArray[np.float64], py: npt.NDArray[np.float64]
+) -> Arrays:
+    import mpmath
+
+    out = np.empty((3, px.size))
+    with mpmath.workdps(MPMATH_DIGITS):
+        sources = [tuple(mpmath.mpf(float(v)) for v in row) for row in charges]
+        for i, (x, y) in enumerate(zip(px.ravel().tolist(), py.ravel().tolist())):
+            ex = ey = v = mpmath.mpf(0)
+            for cx, cy, q in sources:
+                dx, dy = x - cx, y - cy
+                r2 = dx * dx + dy * dy
+                if r2 == 0:
+                    continue
+                kq_r = K * q / mpmath.sqrt(r2)
+                ex += kq_r * dx / r2
+                ey += kq_r * dy / r2
+                v += kq_r
+            out[:, i] = float(ex), float(ey), float(v)
+    return tuple(a.reshape(px.shape) for a in out)
+
+
+def reference_forces(
+    charges: npt.NDArray[np.float64],
+) -> tuple[Arrays, str]:
+    """
+    Forces and potentials at every charge due to all the others, from
+    :func:`reference_field` at the charges themselves.
+    """
+    (Ex, Ey, V), method = reference_field(charges, charges[:, 0], charges[:, 1])
+    q = charges[:, 2]
+    return (np.column_stack((q * Ex, q * Ey)), V), method
+
+
+def relative_errors(
+    approx: npt.NDArray[np.float64], exact: npt.NDArray[np.float64], vector: bool = False
+) -> npt.NDArray[np.float64]:
+    """
+    Per point ``|approx - exact| / |exact|``, taking norms over the last axis
+    for ``vector`` values. Points where either side is missing, or the exact
+    value is zero, are left out.
+    """
+    if vector:
+        err = np.linalg.norm(approx - exact, axis=-1)
+        size = np.linalg.norm(exact, axis=-1)
+    else:
+        err = np.abs(approx - exact)
+        size = np.abs(exact)
+    valid = np.isfinite(err) & np.isfinite(size) & (size > 0)
+    return err[valid] / size[valid]
+
+
+@dataclass
+class Measurement:
+    solver: str
+    scenario: str
+    charges: int
+    reference: str
+    e_max: float
+    e_rms: float
+    v_max: float
+    v_rms: float
+    # Fraction of points the solver answered for.
+    coverage: float
+    seconds: float
+    peak_bytes: int
+
+
+def _summary(rel: npt.NDArray[np.float64]) -> tuple[float, float]:
+    if rel.size == 0:
+        return math.nan, math.nan
+    return float(rel.max()), float(np.sqrt(np.mean(rel * rel)))
+
+
+def _profile(run: Callable[[], Arrays], repeats: int) -> tuple[Arrays, float, int]:
+    seconds = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - start)
+    # A separate run for memory, as tracing allocations slows things down.
+    tracemalloc.start()
+    try:
+        result = run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def measure(
+    charges: Sequence[int] = CHARGE_COUNTS,
+    scenarios: Sequence[str] = SCENARIOS,
+    seed: int = 0,
+    repeats: int = REPEATS,
+) -> Iterator[Measurement]:
+    """
+    Run every solver on every scenario and size, yielding how far each is
+    from the reference, how long it took and how much memory it needed.
+    """
+    for scenario in scenarios:
+        for n in charges:
+            sources = scenario_charges(scenario, n, seed)
+            x, y = probe_grid(sources)
+            if n * x.size <= REFERENCE_LIMIT:
+                (rEx, rEy, rV), method = reference_field(sources, x, y)
+                exact_E = np.stack((rEx, rEy), axis=-1)
+                for name, solver in FIELD_SOLVERS.items():
+                    (Ex, Ey, V), seconds, peak = _profile(lambda: solver(sources, x, y), repeats)
+                    e = relative_errors(np.stack((Ex, Ey), axis=-1), exact_E, vector=True)
+                    v = relative_errors(np.asarray(V, dtype=np.float64), rV)
+                    coverage = float(np.isfinite(Ex).mean())
+                    yield Measurement(
+                        name, scenario, n, method, *_summary(e), *_summary(v), coverage, seconds, peak
+                    )
+
+            if n * n > REFERENCE_LIMIT:
+                continue
+            (rF, rP), method = reference_forces(sources)
+            pos = np.ascontiguousarray(sources[:, :2])
+            q = sources[:, 2].copy()
+            for name, force_solver in FORCE_SOLVERS.items():
+                (F, P), seconds, peak = _profile(lambda: force_solver(pos, q), repeats)
+                e = relative_errors(F, rF, vector=True)
+                v = relative_errors(P, rP)
+                yield Measurement(
+                    name, scenario, n, method, *_summary(e), *_summary(v), 1.0, seconds, peak
+                )
+
+
+def to_json(measurements: Sequence[Measurement]) -> dict[str, Any]:
+    return {"machine": machine_info(), "results": [asdict(m) for m in measurements]}
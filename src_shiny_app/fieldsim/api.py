@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import io
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from ._validation import check_limit, is_number
+from .charges import Config, parse_config
+from .engine import RESOLUTION, FieldResult, compute_field, grid_extent, make_grid
+
+# Requests are computed on this many threads; up to API_QUEUE_LIMIT more wait
+# for a free one and anything beyond that is turned away with 503.
+API_WORKERS = 2
+API_QUEUE_LIMIT = 8
+# Grids up to this many points are answered with JSON unless asked otherwise.
+JSON_MAX_POINTS = 10_000
+MAX_GRID_POINTS = 2**20
+GZIP_LEVEL = 1
+FORMATS = ("json", "npy", "binary")
+
+
+class FieldAPI:
+    """
+    HTTP endpoint computing ``Ex``, ``Ey`` and ``V`` on a grid.
+
+    POST a JSON object with either ``"charges"`` (a list of ``[x, y, q]``) or
+    ``"config"`` (a string in the app's input syntax), and optionally
+    ``"grid": {"x": [x0, x1, n], "y": [y0, y1, m]}`` and ``"format"``.
+
+    ``"json"`` answers with nested lists. ``"npy"`` answers with one gzipped
+    little-endian float32 ``.npy`` array of shape ``(3, m, n)`` holding ``Ex``,
+    ``Ey`` and ``V``; ``"binary"`` sends the same values without the ``.npy``
+    header, described by ``X-Field-Shape`` and ``X-Field-Extent`` headers.
+    Without a format, grids of up to :data:`JSON_MAX_POINTS` points get JSON
+    and larger ones ``.npy``.
+
+    Computations run on a private thread pool, so API traffic never runs on
+    the event loop that serves interactive sessions.
+    """
+
+    def __init__(self, workers: int = API_WORKERS, queue_limit: int = API_QUEUE_LIMIT) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Only touched from the event loop, so no lock is needed.
+        self._pending = 0
+
+    def routes(self, path: str = "/api/field") -> list[Route]:
+        return [Route(path, self.endpoint, methods=["POST"])]
+
+    async def endpoint(self, request: Request) -> Response:
+        try:
+            body = await request.json()
+            config, grid, fmt = parse_request(body)
+        except json.JSONDecodeError:
+            return _error(400, "Тело запроса должно быть JSON-объектом.")
+        except ValueError as e:
+            return _error(400, str(e))
+
+        if self._pending >= self.workers + self.queue_limit:
+            return _error(503, "Сервер занят, повторите запрос позже.", {"Retry-After": "1"})
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="fieldsim-api")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, respond, config, grid, fmt)
+        finally:
+            self._pending -= 1
+
+
+def parse_request(
+    body: Any,
+) -> tuple[Config, tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]], Optional[str]]:
+    if not isinstance(body, dict):
+        raise ValueError("Тело запроса должно быть JSON-объектом.")
+
+    if isinstance(body.get("config"), str):
+        config = parse_config(body["config"])
+    elif isinstance(body.get("charges"), list) and body["charges"]:
+        rows = body["charges"]
+        if not all(
+            isinstance(row, list) and len(row) == 3 and all(is_number(v) for v in row)
+            for row in rows
+        ):
+            raise ValueError("Поле charges должно быть списком троек [x, y, заряд].")
+        for row in rows:
+            check_limit(*row)
+        config = Config(np.array(rows, dtype=np.float64))
+    else:
+        raise ValueError("Нужно передать поле charges или config.")
+
+    spec = body.get("grid")
+    if spec is None:
+        # The app's grid, coarsened if the charges are spread too far apart.
+        x1, x2, y1, y2 = grid_extent(config)
+        resolution = min(RESOLUTION, 0.9 * np.sqrt(MAX_GRID_POINTS / ((x2 - x1) * (y2 - y1))))
+        grid = make_grid(config, resolution=resolution)
+    else:
+        grid = _parse_grid(spec)
+
+    fmt = body.get("format")
+    if fmt is not None and fmt not in FORMATS:
+        raise ValueError("Поле format должно быть одним из: " + ", ".join(FORMATS) + ".")
+    return config, grid, fmt
+
+
+def _parse_grid(spec: Any) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    axes = []
+    for key in ("x", "y"):
+        axis = spec.get(key) if isinstance(spec, dict) else None
+        if (
+            not isinstance(axis, list)
+            or len(axis) != 3
+            or not all(is_number(v) for v in axis)
+            or not isinstance(axis[2], int)
+            or axis[2] < 2
+            or not axis[0] < axis[1]
+        ):
+            raise ValueError(
+                'Поле grid должно иметь вид {"x": [x0, x1, n], "y": [y0, y1, m]}, '
+                "где x0 < x1, y0 < y1, а n, m — целые числа не меньше 2."
+            )
+        check_limit(axis[0], axis[1])
+        axes.append(axis)
+    if axes[0][2] * axes[1][2] > MAX_GRID_POINTS:
+        raise ValueError(f"Сетка не может содержать больше {MAX_GRID_POINTS} точек.")
+    (x0, x1, n), (y0, y1, m) = axes
+    return np.meshgrid(np.linspace(x0, x1, n), np.linspace(y0, y1, m))
+
+
+def respond(
+    config: Config,
+    grid: tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]],
+    fmt: Optional[str],
+) -> Response:
+    """
+    Compute the field and encode the response; runs on a worker thread.
+    """
+    field = compute_field(config, grid)
+    if fmt is None:
+        fmt = "json" if field.x.size <= JSON_MAX_POINTS else "npy"
+    if fmt == "json":
+        return JSONResponse(
+            {
+                "shape": list(field.x.shape),
+                "x": field.x[0].tolist(),
+                "y": field.y[:, 0].tolist(),
+                "Ex": _json_array(field.Ex),
+                "Ey": _json_array(field.Ey),
+                "V": _json_array(field.V),
+            }
+        )
+
+    values = np.stack((field.Ex, field.Ey, field.V)).astype("<f4")
+    if fmt == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, values)
+        data = buffer.getvalue()
+    else:
+        data = values.tobytes()
+    return Response(
+        gzip.compress(data, compresslevel=GZIP_LEVEL),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Encoding": "gzip",
+            "X-Field-Shape": ",".join(str(s) for s in values.shape),
+            "X-Field-Extent": ",".join(repr(float(v)) for v in _extent(field)),
+        },
+    )
+
+
+def _json_array(values: npt.NDArray[np.float64]) -> list[list[Optional[float]]]:
+    # JSON has no NaN or infinity; singular points become null.
+    return [[v if math.isfinite(v) else None for v in row] for row in values.tolist()]
+
+
+def _extent(field: FieldResult) -> tuple[float, float, float, float]:
+    return field.x[0, 0], field.x[0, -1], field.y[0, 0], field.y[-1, 0]
+
+
+def _error(status: int, message: str, headers: Optional[dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Literal, Optional
+
+from matplotlib.figure import Figure
+
+from .charges import parse_config
+from .engine import compute_field, engine_hash
+from .plotting import draw_field
+
+ImageFormat = Literal["png", "svg"]
+
+# Bump when the drawing changes, so that unchanged configurations are redrawn;
+# changes to the fields themselves bump ENGINE_VERSION in fieldsim.engine.
+RENDER_VERSION = 1
+MANIFEST_NAME = ".fieldsim-batch.json"
+CONFIG_SUFFIXES = (".txt", ".py")
+
+
+@dataclass
+class Job:
+    """
+    One configuration to render: ``text`` is in the app's input syntax.
+    """
+
+    name: str
+    text: str
+    output: Path
+    fmt: ImageFormat
+    dpi: int
+
+    def digest(self) -> str:
+        key = json.dumps([engine_hash(), RENDER_VERSION, self.text.strip(), self.fmt, self.dpi])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+@dataclass
+class Outcome:
+    name: str
+    digest: str
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchReport:
+    rendered: int
+    skipped: int
+    failed: list[Outcome]
+    seconds: float
+
+    def describe(self) -> str:
+        rate = self.rendered / self.seconds if self.seconds > 0 else 0.0
+        return "{} rendered, {} unchanged, {} failed in {:.2f} s ({:.1f} images/s)".format(
+            self.rendered, self.skipped, len(self.failed), self.seconds, rate
+        )
+
+
+def read_configs(source: Path) -> Iterable[tuple[str, str]]:
+    """
+    Yield ``(name, text)`` pairs from a directory of configuration files or a
+    JSONL file.
+
+    Directory entries with a suffix in :data:`CONFIG_SUFFIXES` are read whole
+    and named after their stem. JSONL lines are objects with a ``"config"``
+    string and an optional ``"name"``, or bare strings; unnamed lines are
+    numbered.
+    """
+    if source.is_dir():
+        for path in sorted(source.iterdir()):
+            if path.suffix in CONFIG_SUFFIXES and path.is_file():
+                yield path.stem, path.read_text(encoding="utf-8")
+        return
+
+    with source.open(encoding="utf-8") as f:
+        for i, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                yield "config-{:04d}".format(i), entry
+            else:
+                yield str(entry.get("name", "config-{:04d}".format(i))), entry["config"]
+
+
+def render_job(job: Job) -> Outcome:
+    """
+    Compute and draw one configuration; errors are reported, not raised.
+    """
+    start = time.perf_counter()
+    try:
+        field = compute_field(parse_config(job.text))
+        fig = Figure()
+        draw_field(fig.add_subplot(), field)
+        # Write next to the target and rename, so an interrupted run never
+        # leaves a truncated image that looks up to date.
+        tmp = job.output.with_name(job.output.name + ".tmp")
+        fig.savefig(tmp, format=job.fmt, dpi=job.dpi)
+        os.replace(tmp, job.output)
+    except Exception as e:
+        return Outcome(job.name, job.digest(), time.perf_counter() - start, str(e))
+    return Outcome(job.name, job.digest(), time.perf_counter() - start)
+
+
+def render_batch(
+    source: Path,
+    dest: Path,
+    fmt: ImageFormat = "png",
+    dpi: int = 100,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> BatchReport:
+    """
+    Render every configuration in ``source`` into ``dest`` with a process pool.
+
+    A manifest in ``dest`` records the content hash of each rendered image;
+    images whose configuration and settings have not changed are skipped
+    unless ``force`` is set.
+    """
+    start = time.perf_counter()
+    dest.mkdir(parents=True, exist_ok=True)
+    manifest_path = dest / MANIFEST_NAME
+    manifest: dict[str, str] = {}
+    if manifest_path.exists() and not force:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    jobs = []
+    skipped = 0
+    for name, text in read_configs(source):
+        job = Job(name, text, dest / "{}.{}".format(name, fmt), fmt, dpi)
+        if manifest.get(job.output.name) == job.digest() and job.output.exists():
+            skipped += 1
+        else:
+            jobs.append(job)
+
+    failed = []
+    if jobs:
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        chunksize = max(1, len(jobs) // (4 * workers))
+        with ProcessPoolExecutor(workers) as pool:
+            for job, outcome in zip(jobs, pool.map(render_job, jobs, chunksize=chunksize)):
+                if outcome.error is None:
+                    manifest[job.output.name] = outcome.digest
+                else:
+                    manifest.pop(job.output.name, None)
+                    failed.append(outcome)
+
+    tmp = manifest_path.with_name(MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    return BatchReport(len(jobs) - len(failed), skipped, failed, time.perf_counter() - start)
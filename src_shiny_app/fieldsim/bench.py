@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+from matplotlib.figure import Figure
+
+from .charges import Config, parse_config
+from .dynamics import LEAF_SIZE, direct_forces, tree_forces
+from .engine import FieldResult, compute_field
+from .kernel import superpose
+from .plotting import draw_field
+from .raster import heatmap_png
+from .transport import encode_field
+
+CHARGE_COUNTS = (4, 100, 1_000, 10_000, 100_000)
+GRID_SIDES = (100, 500, 1_000, 2_000, 4_000)
+# Cases estimated to take more than this many pair interactions are skipped.
+MAX_WORK = 2 * 10**9
+REPEATS = 5
+# A case stops repeating once it has used this many seconds.
+CASE_BUDGET = 10.0
+# Relative slowdown of the best time that counts as a regression.
+THRESHOLD = 0.1
+# Differences below this many seconds are noise, whatever the ratio.
+NOISE_FLOOR = 1e-3
+# Half the side of the square the random charges are scattered over.
+EXTENT = 5.0
+RESULTS_VERSION = 1
+APP_FILE = Path(__file__).parent.parent / "app.py"
+
+Setup = Callable[[ExitStack], Callable[[], object]]
+
+
+@dataclass(frozen=True)
+class Case:
+    """
+    One benchmark: ``setup`` prepares the inputs, outside the timing, and
+    returns the function that is timed. It may register cleanups on the stack.
+    """
+
+    name: str
+    params: dict[str, int]
+    work: int
+    setup: Setup
+
+    @property
+    def key(self) -> str:
+        return "{}[{}]".format(self.name, ",".join(f"{k}={v}" for k, v in self.params.items()))
+
+
+@dataclass
+class Result:
+    name: str
+    params: dict[str, int]
+    key: str
+    work: int
+    times: list[float]
+
+    @property
+    def best(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+
+@dataclass
+class Comparison:
+    key: str
+    baseline: Optional[float]
+    current: Optional[float]
+    status: str
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if self.baseline is None or self.current is None or self.baseline == 0:
+            return None
+        return self.current / self.baseline
+
+
+@dataclass
+class Report:
+    machine: dict[str, Any]
+    results: list[Result] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "version": RESULTS_VERSION,
+            "machine": self.machine,
+            "results": [
+                {**asdict(r), "best": r.best, "median": r.median} for r in self.results
+            ],
+            "skipped": self.skipped,
+        }
+
+
+def machine_info() -> dict[str, Any]:
+    import matplotlib
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def random_charges(n: int, seed: int = 0) -> npt.NDArray[np.float64]:
+    rng = np.random.default_rng(seed)
+    charges = rng.uniform(-EXTENT, EXTENT, (n, 3))
+    charges[:, 2] = rng.choice([-3.0, -1.0, 1.0, 2.0], n)
+    return charges
+
+
+def symmetric_charges(n: int, seed: int = 0) -> npt.NDArray[np.float64]:
+    """
+    About ``n`` charges mirrored in both axes, for the symmetry-aware path.
+    """
+    quarter = random_charges(max(1, n // 4), seed)
+    quarter[:, :2] = np.abs(quarter[:, :2]) + 0.01
+    mirrors = [quarter * [sx, sy, 1] for sx in (1, -1) for sy in (1, -1)]
+    return np.concatenate(mirrors)
+
+
+def square_grid(side: int) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    axis = np.linspace(-EXTENT, EXTENT, side)
+    return np.meshgrid(axis, axis)
+
+
+def config_text(charges: npt.NDArray[np.float64]) -> str:
+    return str([(round(x, 3), round(y, 3), q) for x, y, q in charges.tolist()])
+
+
+def _small_field(side: int) -> FieldResult:
+    charges = np.array([[0, 1, -2], [-1, 2, 3], [4, -1, 7], [0, 0, -1]], dtype=np.float64)
+    return compute_field(Config(charges), square_grid(side))
+
+
+def _parse(n: int) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        text = config_text(random_charges(n))
+        return lambda: parse_config(text)
+
+    return setup
+
+
+def _field_direct(n: int, side: int) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        charges = random_charges(n)
+        x, y = square_grid(side)
+        return lambda: superpose(charges, x, y)
+
+    return setup
+
+
+def _field_symmetric(n: int, side: int) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        config = Config(symmetric_charges(n))
+        grid = square_grid(side)
+        return lambda: compute_field(config, grid)
+
+    return setup
+
+
+def _forces(n: int, forces: Callable[..., object]) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        charges = random_charges(n)
+        pos = np.ascontiguousarray(charges[:, :2])
+        q = charges[:, 2].copy()
+        return lambda: forces(pos, q)
+
+    return setup
+
+
+def _trace(side: int) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        result = _small_field(side)
+
+        def run() -> None:
+            draw_field(Figure().add_subplot(), result)
+
+        return run
+
+    return setup
+
+
+def _encode_png(side: int) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        fig = Figure()
+        draw_field(fig.add_subplot(), _small_field(side))
+
+        def run() -> None:
+            fig.savefig(io.BytesIO(), format="png", dpi=100)
+
+        return run
+
+    return setup
+
+
+def _encode_heatmap(side: int) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        result = _small_field(side)
+        return lambda: heatmap_png(result, 800, 600)
+
+    return setup
+
+
+def _encode_canvas(side: int) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        result = _small_field(side)
+        return lambda: encode_field(result)
+
+    return setup
+
+
+def _session(n: int, app_file: Path) -> Setup:
+    def setup(stack: ExitStack) -> Callable[[], object]:
+        session = SessionDriver(app_file)
+        stack.callback(session.close)
+        session.start()
+        # Alternate between two configurations, as an unchanged input would not
+        # invalidate anything.
+        texts = [config_text(random_charges(n, seed)) for seed in (1, 2)]
+        turn = itertools.cycle(texts)
+        return lambda: session.update({"charge_input": next(turn)})
+
+    return setup
+
+
+def cases(
+    charges: Sequence[int] = CHARGE_COUNTS,
+    sides: Sequence[int] = GRID_SIDES,
+    app_file: Path = APP_FILE,
+) -> Iterator[Case]:
+    """
+    The scaling matrix: every stage over the charge counts and grid sides it
+    depends on.
+    """
+    for n in charges:
+        yield Case("parse", {"charges": n}, n, _parse(n))
+    for n in charges:
+        for side in sides:
+            params = {"charges": n, "grid": side}
+            yield Case("field/direct", params, n * side * side, _field_direct(n, side))
+            yield Case("field/symmetric", params, n * side * side, _field_symmetric(n, side))
+    for n in charges:
+        yield Case("forces/direct", {"charges": n}, n * n, _forces(n, direct_forces))
+        tree_work = n * LEAF_SIZE * max(1, int(np.log2(n))) * 8
+        yield Case("forces/tree", {"charges": n}, tree_work, _forces(n, tree_forces))
+    for side in sides:
+        params = {"grid": side}
+        yield Case("trace/streamplot", params, side * side, _trace(side))
+        yield Case("encode/png", params, side * side, _encode_png(side))
+        yield Case("encode/heatmap", params, side * side, _encode_heatmap(side))
+        yield Case("encode/canvas", params, side * side, _encode_canvas(side))
+    # The app sizes its grid from the charges; scattered over EXTENT that is
+    # about 120 x 120 points.
+    for n in charges:
+        yield Case("session/update", {"charges": n}, n * 120 * 120, _session(n, app_file))
+
+
+class SessionDriver:
+    """
+    A whole app session (see :class:`~fieldsim.load.MockSession`) driven
+    message by message on a private event loop.
+
+    Only the field views (plot, heatmap and canvas) are visible, so a round
+    trip is: new charges in, every field output recomputed, rendered and
+    serialized, and the session back to idle.
+    """
+
+    def __init__(self, app_file: Path = APP_FILE) -> None:
+        from .load import MockSession, load_app
+
+        self.loop = asyncio.new_event_loop()
+        self.session = MockSession(load_app(app_file))
+
+    def start(self) -> None:
+        from .load import init_data
+
+        self.loop.run_until_complete(self.session.open(init_data()))
+
+    def update(self, data: dict[str, object]) -> None:
+        self.loop.run_until_complete(self.session.update(data))
+
+    def close(self) -> None:
+        self.loop.run_until_complete(self.session.close())
+        self.loop.close()
+
+
+def run_case(case: Case, repeats: int = REPEATS, budget: float = CASE_BUDGET) -> Result:
+    times = []
+    with ExitStack() as stack:
+        fn = case.setup(stack)
+        # The first call warms caches and lazy imports and is not recorded.
+        fn()
+        spent = 0.0
+        while len(times) < repeats and (not times or spent < budget):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+            spent += times[-1]
+    return Result(case.name, case.params, case.key, case.work, times)
+
+
+def run_benchmarks(
+    selected: Sequence[Case],
+    max_work: int = MAX_WORK,
+    repeats: int = REPEATS,
+    progress: Optional[Callable[[Case, Optional[Result]], None]] = None,
+) -> Report:
+    report = Report(machine_info())
+    for case in selected:
+        if case.work > max_work:
+            report.skipped.append(case.key)
+            result = None
+        else:
+            result = run_case(case, repeats)
+            report.results.append(result)
+        if progress is not None:
+            progress(case, result)
+    return report
+
+
+def select(all_cases: Sequence[Case], patterns: Sequence[str]) -> list[Case]:
+    """
+    Cases whose name matches one of the shell-style ``patterns``, or whose key
+    equals one (keys contain brackets, which globs would read as sets).
+    """
+    if not patterns:
+        return list(all_cases)
+    return [
+        case
+        for case in all_cases
+        if any(fnmatchcase(case.name, p) or case.key == p for p in patterns)
+    ]
+
+
+def load_results(path: Path) -> dict[str, Any]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path}: unsupported results version {data.get('version')!r}")
+    return data
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    threshold: float = THRESHOLD,
+    noise_floor: float = NOISE_FLOOR,
+) -> list[Comparison]:
+    """
+    Match the cases of two result files by key and classify each as
+    ``slower``, ``faster``, ``same``, ``new`` or ``missing``, by best time.
+    """
+    before = {r["key"]: r["best"] for r in baseline["results"]}
+    after = {r["key"]: r["best"] for r in current["results"]}
+    comparisons = []
+    for key in [*before, *(k for k in after if k not in before)]:
+        old, new = before.get(key), after.get(key)
+        if old is None:
+            status = "new"
+        elif new is None:
+            status = "missing"
+        elif abs(new - old) < noise_floor:
+            status = "same"
+        elif new > old * (1 + threshold):
+            status = "slower"
+        elif new < old / (1 + threshold):
+            status = "faster"
+        else:
+            status = "same"
+        comparisons.append(Comparison(key, old, new, status))
+    return comparisons
+
+
+def machine_differences(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """
+    Metadata that differs between two result files and may explain a change.
+    """
+    ignored = {"timestamp"}
+    a, b = baseline["machine"], current["machine"]
+    return [
+        "{}: {} -> {}".format(k, a.get(k), b.get(k))
+        for k in sorted(set(a) | set(b))
+        if k not in ignored and a.get(k) != b.get(k)
+    ]
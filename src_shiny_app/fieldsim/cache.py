@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from .charges import Config, config_key
+from .engine import FieldResult, compute_field, engine_hash, make_grid
+
+# Setting this environment variable turns the cache on for the app.
+CACHE_DIR_ENV = "FIELDSIM_CACHE_DIR"
+CACHE_MAX_BYTES_ENV = "FIELDSIM_CACHE_MAX_BYTES"
+CACHE_MAX_BYTES = 512 * 2**20
+# Bump when the layout of the stored files changes; entries computed by another
+# version of the engine (see fieldsim.engine.ENGINE_VERSION) are never reused.
+CACHE_VERSION = 2
+
+
+class DiskCache:
+    """
+    Fields stored as ``(3, m, n)`` ``.npy`` files of ``Ex``, ``Ey`` and ``V``,
+    one per configuration.
+
+    Hits are memory-mapped read-only. Files are written to a temporary name and
+    renamed into place, so several processes can share one directory. Whenever
+    the directory grows beyond ``max_bytes`` the least recently used files are
+    deleted; a hit refreshes a file's modification time, which serves as its
+    access time even on ``noatime`` mounts.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(config: Config) -> str:
+        params = "{}:{}:{}".format(CACHE_VERSION, engine_hash(), config_key(config))
+        return hashlib.sha256(params.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / (key + ".npy")
+
+    def load(self, key: str) -> Optional[npt.NDArray[np.float64]]:
+        path = self.path(key)
+        try:
+            values = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # Missing, evicted meanwhile, or left truncated by a crashed writer.
+            return None
+        return values
+
+    def store(self, key: str, values: npt.NDArray[np.float64]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, values)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Delete least recently used entries until the cache fits ``max_bytes``.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self.directory.glob("*.npy"))
+
+    def compute_field(self, config: Config) -> FieldResult:
+        """
+        :func:`~fieldsim.engine.compute_field`, served from the cache when possible.
+        """
+        key = self.key(config)
+        x, y = make_grid(config)
+        values = self.load(key)
+        if values is None or values.shape != (3, *x.shape):
+            field = compute_field(config, (x, y))
+            self.store(key, np.stack((field.Ex, field.Ey, field.V)))
+            return field
+        return FieldResult(x, y, values[0], values[1], values[2], config)
+
+
+def default_cache() -> Optional[DiskCache]:
+    """
+    The cache configured through :data:`CACHE_DIR_ENV`, or ``None``.
+    """
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None
+    max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV, CACHE_MAX_BYTES))
+    return DiskCache(directory, max_bytes)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from ._validation import check_limit, is_number
+from .conductors import CONDUCTORS, Conductor
+from .distributions import DISTRIBUTIONS, Distribution
+from .dynamics import Particles
+from .tracing import timed
+
+
+@dataclass
+class Config:
+    """
+    A parsed simulator configuration.
+
+    ``charges`` is an ``(N, 3)`` float64 array of ``(x, y, q)`` rows; everything
+    else the user typed (conductors, continuous distributions) lives in its own
+    list.
+    """
+
+    charges: npt.NDArray[np.float64]
+    conductors: list[Conductor] = field(default_factory=list)
+    distributions: list[Distribution] = field(default_factory=list)
+
+
+def config_key(config: Config) -> str:
+    """
+    A hash identifying ``config`` regardless of the order its parts were typed in.
+    """
+    # Adding 0.0 turns -0.0 into 0.0, which would otherwise hash differently.
+    charges = config.charges + 0.0
+    charges = charges[np.lexsort(charges.T[::-1])]
+    shapes = sorted(repr(shape) for shape in [*config.conductors, *config.distributions])
+    digest = hashlib.sha256(np.ascontiguousarray(charges, dtype="<f8").tobytes())
+    digest.update("\n".join(shapes).encode())
+    return digest.hexdigest()
+
+
+@timed("parse")
+def parse_config(text: str) -> Config:
+    """
+    Parse the contents of the charge input box.
+
+    The input is a Python literal list. Plain ``(x, y, q)`` tuples are point
+    charges; tuples starting with a string tag are geometry primitives, either
+    grounded conductors (``("plane", ...)``, ``("sphere", ...)``) or continuous
+    charge distributions (``("segment", ...)``, ``("arc", ...)``, ...).
+    """
+    items = _literal_list(text)
+
+    charges: list[tuple[float, float, float]] = []
+    conductors: list[Conductor] = []
+    distributions: list[Distribution] = []
+    for item in items:
+        if not isinstance(item, tuple) or len(item) == 0:
+            raise ValueError(
+                "Неверный формат заряда. Ожидается список кортежей в формате [(x, y, заряд), ...]"
+            )
+        if isinstance(item[0], str) and item[0] in DISTRIBUTIONS:
+            distributions.append(DISTRIBUTIONS[item[0]].from_args(item[1:]))
+        elif isinstance(item[0], str):
+            conductors.append(_parse_conductor(item))
+        else:
+            charges.append(_parse_charge(item))
+
+    if not charges and not distributions:
+        raise ValueError("Нужно задать хотя бы один заряд.")
+
+    config = Config(
+        np.array(charges, dtype=np.float64).reshape(-1, 3), conductors, distributions
+    )
+    for conductor in conductors:
+        conductor.check_outside(config.charges)
+        for distribution in distributions:
+            conductor.check_outside(distribution.nodes())
+    return config
+
+
+def parse_particles(text: str) -> Particles:
+    """
+    Parse moving charges given as ``(x, y, q[, m[, vx, vy]])`` tuples.
+
+    The mass defaults to 1 and the velocity to zero.
+    """
+    rows = []
+    for item in _literal_list(text):
+        if (
+            not isinstance(item, tuple)
+            or len(item) not in (3, 4, 6)
+            or not all(is_number(v) for v in item)
+        ):
+            raise ValueError(
+                "Неверный формат частицы. Ожидается список кортежей (x, y, заряд[, масса[, vx, vy]])."
+            )
+        check_limit(*item)
+        # Missing trailing values default to unit mass and zero velocity.
+        row = [*item, *(1.0, 0.0, 0.0)[len(item) - 3 :]]
+        if row[3] <= 0:
+            raise ValueError("Масса частицы должна быть положительной.")
+        rows.append(row)
+    if not rows:
+        raise ValueError("Нужно задать хотя бы одну частицу.")
+
+    data = np.array(rows, dtype=np.float64)
+    return Particles(pos=data[:, 0:2], vel=data[:, 4:6], q=data[:, 2], m=data[:, 3])
+
+
+def parse_probes(text: str) -> npt.NDArray[np.float64]:
+    """
+    Parse test-particle launch conditions given as ``(x, y, vx, vy)`` tuples.
+
+    Returns the ``(P, 4)`` state array taken by :func:`fieldsim.trajectories.trace`.
+    """
+    rows = []
+    for item in _literal_list(text):
+        if not isinstance(item, tuple) or len(item) != 4 or not all(is_number(v) for v in item):
+            raise ValueError("Неверный формат пробного заряда. Ожидается список кортежей (x, y, vx, vy).")
+        check_limit(*item)
+        rows.append(item)
+    if not rows:
+        raise ValueError("Нужно задать хотя бы один пробный заряд.")
+
+    return np.array(rows, dtype=np.float64)
+
+
+def _literal_list(text: str) -> list[Any]:
+    try:
+        items = ast.literal_eval(text)
+    except (ValueError, SyntaxError) as e:
+        raise ValueError("Не удалось разобрать ввод: ожидается список кортежей.") from e
+    if not isinstance(items, (list, tuple)):
+        raise ValueError("Ожидается список кортежей.")
+    return list(items)
+
+
+def _parse_charge(item: tuple[Any, ...]) -> tuple[float, float, float]:
+    if len(item) != 3 or not all(is_number(v) for v in item):
+        raise ValueError(
+            "Неверный формат заряда. Ожидается список кортежей в формате [(x, y, заряд), ...]"
+        )
+    check_limit(*item)
+    return (float(item[0]), float(item[1]), float(item[2]))
+
+
+def _parse_conductor(item: tuple[Any, ...]) -> Conductor:
+    tag, args = item[0], item[1:]
+    cls = CONDUCTORS.get(tag)
+    if cls is None:
+        raise ValueError(f"Неизвестный тип объекта: {tag!r}.")
+    if len(args) != cls.nargs or not all(is_number(v) for v in args):
+        raise ValueError(f"Объект {tag!r} ожидает {cls.nargs} числовых параметров.")
+    check_limit(*args)
+    return cls(*(float(v) for v in args))
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import ClassVar
+
+import numpy as np
+import numpy.typing as npt
+
+# How many generations of images-of-images to generate when several conductors
+# are present. With a single conductor the method of images is exact after one.
+IMAGE_ORDER = 4
+# Images of one charge closer than this, relative to the size of the
+# configuration, are the same image.
+IMAGE_TOL = 1e-9
+
+
+class Conductor(ABC):
+    """
+    A grounded conductor whose influence is represented by image charges.
+    """
+
+    nargs: ClassVar[int]
+
+    @abstractmethod
+    def contains(
+        self, x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+    ) -> npt.NDArray[np.bool_]:
+        """Mask of the points that lie inside the conductor."""
+
+    @abstractmethod
+    def reflect(self, charges: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """Image charges (``(N, 3)`` array) for ``charges`` lying outside."""
+
+    @abstractmethod
+    def bounds(self) -> tuple[float, float, float, float]:
+        """``(xmin, xmax, ymin, ymax)`` that the plotting grid should cover."""
+
+    def check_outside(self, charges: npt.NDArray[np.float64]) -> None:
+        if self.contains(charges[:, 0], charges[:, 1]).any():
+            raise ValueError("Заряды не могут находиться внутри проводника.")
+
+
+@dataclass(frozen=True)
+class GroundedPlane(Conductor):
+    """
+    A grounded plane through ``(x0, y0)``; ``(nx, ny)`` points into the half
+    space where the charges are.
+    """
+
+    nargs: ClassVar[int] = 4
+
+    x0: float
+    y0: float
+    nx: float
+    ny: float
+
+    def __post_init__(self) -> None:
+        norm = np.hypot(self.nx, self.ny)
+        if norm == 0:
+            raise ValueError("Нормаль плоскости не может быть нулевой.")
+        object.__setattr__(self, "nx", self.nx / norm)
+        object.__setattr__(self, "ny", self.ny / norm)
+
+    def _offset(self, x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]):
+        return (x - self.x0) * self.nx + (y - self.y0) * self.ny
+
+    def contains(self, x, y):
+        return self._offset(x, y) <= 0
+
+    def reflect(self, charges):
+        s = 2 * self._offset(charges[:, 0], charges[:, 1])
+        return np.column_stack(
+            (charges[:, 0] - s * self.nx, charges[:, 1] - s * self.ny, -charges[:, 2])
+        )
+
+    def bounds(self):
+        return (self.x0, self.x0, self.y0, self.y0)
+
+
+@dataclass(frozen=True)
+class GroundedSphere(Conductor):
+    """
+    A grounded sphere centred in the plane of the charges.
+    """
+
+    nargs: ClassVar[int] = 3
+
+    cx: float
+    cy: float
+    radius: float
+
+    def __post_init__(self) -> None:
+        if self.radius <= 0:
+            raise ValueError("Радиус сферы должен быть положительным.")
+
+    def contains(self, x, y):
+        return (x - self.cx) ** 2 + (y - self.cy) ** 2 <= self.radius**2
+
+    def reflect(self, charges):
+        dx = charges[:, 0] - self.cx
+        dy = charges[:, 1] - self.cy
+        ratio = self.radius**2 / (dx**2 + dy**2)
+        return np.column_stack(
+            (
+                self.cx + ratio * dx,
+                self.cy + ratio * dy,
+                -charges[:, 2] * np.sqrt(ratio),
+            )
+        )
+
+    def bounds(self):
+        r = self.radius
+        return (self.cx - r, self.cx + r, self.cy - r, self.cy + r)
+
+
+CONDUCTORS: dict[str, type[Conductor]] = {
+    "plane": GroundedPlane,
+    "sphere": GroundedSphere,
+}
+
+
+def image_charges(
+    charges: npt.NDArray[np.float64],
+    conductors: list[Conductor],
+    order: int = IMAGE_ORDER,
+) -> npt.NDArray[np.float64]:
+    """
+    Return ``charges`` together with the image charges induced by ``conductors``.
+
+    Images produced by one conductor are reflected in every *other* conductor,
+    up to ``order`` generations deep. Different sequences of reflections can
+    lead to the same image, e.g. for two planes at right angles; each image of
+    a charge is kept once.
+    """
+    if not conductors:
+        return charges
+
+    scale = max(float(np.abs(charges[:, :2]).max(initial=0.0)), 1.0) * IMAGE_TOL
+    seen: set[tuple[int, float, float]] = set()
+
+    def new(images: npt.NDArray[np.float64], roots: npt.NDArray[np.intp]):
+        # An image is identified by the charge it descends from and its position.
+        fresh = np.zeros(len(images), dtype=bool)
+        for k, key in enumerate(zip(roots, *np.round(images[:, :2] / scale).T)):
+            if key not in seen:
+                seen.add(key)
+                fresh[k] = True
+        return images[fresh], roots[fresh]
+
+    roots = np.arange(len(charges))
+    new(charges, roots)
+    parts = [charges]
+    generation = [(charges, roots, -1)]
+    for _ in range(order):
+        next_generation = []
+        for sources, source_roots, origin in generation:
+            for i, conductor in enumerate(conductors):
+                if i == origin:
+                    continue
+                outside = ~conductor.contains(sources[:, 0], sources[:, 1])
+                if outside.any():
+                    images, image_roots = new(
+                        conductor.reflect(sources[outside]), source_roots[outside]
+                    )
+                    if len(images):
+                        next_generation.append((images, image_roots, i))
+        if not next_generation:
+            break
+        parts.extend(images for images, _, _ in next_generation)
+        generation = next_generation
+    return np.concatenate(parts)
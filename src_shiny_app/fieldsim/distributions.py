@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from ._validation import check_limit, is_number
+from .kernel import K, superpose
+
+# Gauss-Legendre nodes per panel, and the adaptive refinement settings used for
+# shapes without a closed-form field.
+QUAD_ORDER = 8
+QUAD_TOL = 1e-6
+QUAD_MAX_LEVEL = 5
+# Refinement evaluates at most this many (node, point) pairs at once.
+QUAD_MAX_PAIRS = 2**22
+# Arithmetic-geometric mean iterations for the elliptic integrals of discs;
+# convergence is quadratic, so this is enough for double precision.
+AGM_STEPS = 8
+
+FieldArrays = tuple[
+    npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]
+]
+
+
+class Distribution(ABC):
+    """
+    A continuous charge distribution in the plane of the point charges.
+    """
+
+    @classmethod
+    @abstractmethod
+    def from_args(cls, args: tuple[Any, ...]) -> Distribution:
+        """Build the distribution from the arguments following its tag."""
+
+    @abstractmethod
+    def field(
+        self, x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+    ) -> FieldArrays:
+        """``(Ex, Ey, V)`` at the points ``(x, y)``."""
+
+    @abstractmethod
+    def nodes(self) -> npt.NDArray[np.float64]:
+        """A point-charge approximation (``(M, 3)`` array) of the distribution."""
+
+    @abstractmethod
+    def outline(self) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Polyline ``(xs, ys)`` tracing the distribution, for drawing and bounds."""
+
+    def bounds(self) -> tuple[float, float, float, float]:
+        xs, ys = self.outline()
+        return (xs.min(), xs.max(), ys.min(), ys.max())
+
+
+@dataclass(frozen=True)
+class Segment(Distribution):
+    """
+    A straight segment whose linear density goes linearly from ``lam1`` to ``lam2``.
+    """
+
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    lam1: float
+    lam2: float
+
+    def __post_init__(self) -> None:
+        if self.x1 == self.x2 and self.y1 == self.y2:
+            raise ValueError("Концы отрезка не должны совпадать.")
+
+    @classmethod
+    def from_args(cls, args):
+        _check_numbers(args, "segment", (5, 6))
+        if len(args) == 5:
+            args = (*args, args[4])
+        return cls(*(float(v) for v in args))
+
+    def field(self, x, y):
+        return segment_field(
+            self.x1, self.y1, self.x2, self.y2, self.lam1, self.lam2, x, y
+        )
+
+    def nodes(self):
+        t, w = gauss_panels(0.0, 1.0, 4)
+        length = np.hypot(self.x2 - self.x1, self.y2 - self.y1)
+        lam = self.lam1 + (self.lam2 - self.lam1) * t
+        return np.column_stack(
+            (
+                self.x1 + (self.x2 - self.x1) * t,
+                self.y1 + (self.y2 - self.y1) * t,
+                lam * length * w,
+            )
+        )
+
+    def outline(self):
+        return np.array([self.x1, self.x2]), np.array([self.y1, self.y2])
+
+
+@dataclass(frozen=True)
+class Polygon(Distribution):
+    """
+    A closed polygon whose linear density goes linearly along its perimeter,
+    from ``lam1`` at the first vertex round to ``lam2`` on getting back to it.
+    """
+
+    vertices: tuple[tuple[float, float], ...]
+    lam1: float
+    lam2: float
+
+    @classmethod
+    def from_args(cls, args):
+        if (
+            len(args) not in (2, 3)
+            or not isinstance(args[0], (list, tuple))
+            or len(args[0]) < 2
+            or not all(
+                isinstance(p, tuple) and len(p) == 2 and all(is_number(v) for v in p)
+                for p in args[0]
+            )
+            or not all(is_number(v) for v in args[1:])
+        ):
+            raise ValueError(
+                "Объект 'polygon' ожидает список вершин [(x, y), ...] и одну или две "
+                "плотности заряда."
+            )
+        check_limit(*(v for p in args[0] for v in p), *args[1:])
+        vertices = tuple((float(px), float(py)) for px, py in args[0])
+        lam1 = float(args[1])
+        lam2 = float(args[2]) if len(args) == 3 else lam1
+        return cls(vertices, lam1, lam2)
+
+    def edges(self) -> list[Segment]:
+        closed = np.array(self.vertices + self.vertices[:1])
+        lengths = np.hypot(*np.diff(closed, axis=0).T)
+        # Fraction of the perimeter walked at each vertex.
+        walked = np.concatenate(([0.0], np.cumsum(lengths))) / (lengths.sum() or 1.0)
+        lam = self.lam1 + (self.lam2 - self.lam1) * walked
+        return [
+            Segment(x1, y1, x2, y2, lam[i], lam[i + 1])
+            for i, ((x1, y1), (x2, y2)) in enumerate(zip(closed[:-1], closed[1:]))
+            if (x1, y1) != (x2, y2)
+        ]
+
+    def field(self, x, y):
+        Ex, Ey, V = np.zeros(x.shape), np.zeros(x.shape), np.zeros(x.shape)
+        for edge in self.edges():
+            ex, ey, v = edge.field(x, y)
+            Ex += ex
+            Ey += ey
+            V += v
+        return Ex, Ey, V
+
+    def nodes(self):
+        return np.concatenate([edge.nodes() for edge in self.edges()])
+
+    def outline(self):
+        closed = np.array(self.vertices + self.vertices[:1])
+        return closed[:, 0], closed[:, 1]
+
+
+@dataclass(frozen=True)
+class Arc(Distribution):
+    """
+    A circular arc from ``start`` to ``end`` (degrees, counter-clockwise) whose
+    linear density goes linearly in angle from ``lam1`` to ``lam2``.
+    """
+
+    cx: float
+    cy: float
+    radius: float
+    start: float
+    end: float
+    lam1: float
+    lam2: float
+
+    def __post_init__(self) -> None:
+        if self.radius <= 0:
+            raise ValueError("Радиус дуги должен быть положительным.")
+        if self.start == self.end:
+            raise ValueError("Начальный и конечный углы дуги не должны совпадать.")
+
+    @classmethod
+    def from_args(cls, args):
+        _check_numbers(args, "arc", (6, 7))
+        if len(args) == 6:
+            args = (*args, args[5])
+        return cls(*(float(v) for v in args))
+
+    def _nodes(self, panels: int) -> npt.NDArray[np.float64]:
+        t0, t1 = np.radians(self.start), np.radians(self.end)
+        t, w = gauss_panels(t0, t1, panels)
+        lam = self.lam1 + (self.lam2 - self.lam1) * (t - t0) / (t1 - t0)
+        return np.column_stack(
+            (
+                self.cx + self.radius * np.cos(t),
+                self.cy + self.radius * np.sin(t),
+                lam * self.radius * np.abs(w),
+            )
+        )
+
+    def field(self, x, y):
+        return adaptive_field(self._nodes, x, y)
+
+    def nodes(self):
+        return self._nodes(4)
+
+    def outline(self):
+        t = np.radians(np.linspace(self.start, self.end, 65))
+        return self.cx + self.radius * np.cos(t), self.cy + self.radius * np.sin(t)
+
+
+@dataclass(frozen=True)
+class Disc(Distribution):
+    """
+    A disc with uniform surface density ``sigma``.
+    """
+
+    cx: float
+    cy: float
+    radius: float
+    sigma: float
+
+    def __post_init__(self) -> None:
+        if self.radius <= 0:
+            raise ValueError("Радиус диска должен быть положительным.")
+
+    @classmethod
+    def from_args(cls, args):
+        _check_numbers(args, "disc", (4,))
+        return cls(*(float(v) for v in args))
+
+    def _nodes(self, panels: int) -> npt.NDArray[np.float64]:
+        # Gauss-Legendre in radius; the trapezoidal rule is already spectrally
+        # accurate for the periodic angular integrand. Only used as the
+        # point-charge approximation, the field has a closed form.
+        r, wr = gauss_panels(0.0, self.radius, panels)
+        count = 2 * QUAD_ORDER * panels
+        t = np.arange(count) * (2 * np.pi / count)
+        r, t = np.meshgrid(r, t)
+        w = wr * r * (2 * np.pi / count)
+        return np.column_stack(
+            (
+                (self.cx + r * np.cos(t)).ravel(),
+                (self.cy + r * np.sin(t)).ravel(),
+                (self.sigma * w).ravel(),
+            )
+        )
+
+    def field(self, x, y):
+        return disc_field(self.cx, self.cy, self.radius, self.sigma, x, y)
+
+    def nodes(self):
+        return self._nodes(2)
+
+    def outline(self):
+        t = np.linspace(0, 2 * np.pi, 65)
+        return self.cx + self.radius * np.cos(t), self.cy + self.radius * np.sin(t)
+
+
+DISTRIBUTIONS: dict[str, type[Distribution]] = {
+    "segment": Segment,
+    "polygon": Polygon,
+    "arc": Arc,
+    "disc": Disc,
+}
+
+
+def segment_field(
+    x1: float,
+    y1: float,
+    x2: float,
+    y2: float,
+    lam1: float,
+    lam2: float,
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+) -> FieldArrays:
+    """
+    Closed-form ``(Ex, Ey, V)`` of a segment with linearly varying density.
+
+    Integrals are taken along the segment in coordinates centred on the
+    projection of each field point, ``s`` running from ``a`` to ``b`` at
+    distance ``h`` from the line. Points on the segment itself get zero.
+    """
+    length = np.hypot(x2 - x1, y2 - y1)
+    ux, uy = (x2 - x1) / length, (y2 - y1) / length
+    rx, ry = x - x1, y - y1
+    s0 = rx * ux + ry * uy
+    h = ry * ux - rx * uy
+    a, b = -s0, length - s0
+    ra, rb = np.hypot(a, h), np.hypot(b, h)
+
+    beta = (lam2 - lam1) / length
+    alpha = lam1 + beta * s0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_ratio = np.where(
+            a >= 0,
+            np.log((b + rb) / (a + ra)),
+            np.where(
+                b <= 0,
+                np.log((-a + ra) / (-b + rb)),
+                np.log((b + rb) * (-a + ra) / (h * h)),
+            ),
+        )
+        sin_diff = b / rb - a / ra
+        perp = np.where(h != 0, alpha * sin_diff / h, 0.0) + beta * h * (1 / ra - 1 / rb)
+        par = alpha * (1 / rb - 1 / ra) - beta * (log_ratio - sin_diff)
+        V = K * (alpha * log_ratio + beta * (rb - ra))
+
+    on_segment = (ra == 0) | (rb == 0) | ((h == 0) & (a < 0) & (b > 0))
+    Ex = np.where(on_segment, 0.0, K * (par * ux - perp * uy))
+    Ey = np.where(on_segment, 0.0, K * (par * uy + perp * ux))
+    V = np.where(on_segment, 0.0, V)
+    return Ex, Ey, V
+
+
+def disc_field(
+    cx: float,
+    cy: float,
+    radius: float,
+    sigma: float,
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+) -> FieldArrays:
+    """
+    Closed-form ``(Ex, Ey, V)`` of a uniform disc, in its own plane.
+
+    With ``k = rho / radius`` inside and ``k = radius / rho`` outside, and the
+    complete elliptic integrals ``K(k)`` and ``E(k)``, the potential is
+    ``4 K sigma radius E(k)`` inside and ``4 K sigma rho (E(k) - (1 - k**2) K(k))``
+    outside; the radial field is ``4 K sigma (K(k) - E(k)) / k`` inside and
+    ``4 K sigma (K(k) - E(k))`` outside. The field diverges on the rim, where
+    points get zero, and points at the centre get no field by symmetry.
+    """
+    rx, ry = x - cx, y - cy
+    rho = np.hypot(rx, ry)
+    inside = rho <= radius
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.where(inside, rho / radius, radius / rho)
+        ek, ee = _elliptic_ke(k)
+        V = 4 * K * sigma * np.where(inside, radius * ee, rho * (ee - (1 - k * k) * ek))
+        E = 4 * K * sigma * np.where(inside, (ek - ee) / k, ek - ee)
+        E = np.where((rho == 0) | (rho == radius), 0.0, E)
+        Ex = np.where(rho > 0, E * rx / rho, 0.0)
+        Ey = np.where(rho > 0, E * ry / rho, 0.0)
+    return Ex, Ey, V
+
+
+def _elliptic_ke(
+    k: npt.NDArray[np.float64],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Complete elliptic integrals ``K(k)`` and ``E(k)`` of modulus ``k`` in
+    ``[0, 1]``, by the arithmetic-geometric mean; ``K(1)`` is infinite.
+    """
+    a = np.ones_like(k)
+    b = np.sqrt(1 - k * k)
+    c = k.copy()
+    total = c * c / 2
+    scale = 0.5
+    for _ in range(AGM_STEPS):
+        a, b, c = (a + b) / 2, np.sqrt(a * b), (a - b) / 2
+        scale *= 2
+        total += scale * c * c
+    with np.errstate(divide="ignore"):
+        ek = np.pi / (2 * a)
+    return ek, np.where(k < 1, ek * (1 - total), 1.0)
+
+
+def gauss_panels(
+    t0: float, t1: float, panels: int
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Nodes and weights of composite Gauss-Legendre quadrature on ``[t0, t1]``.
+    """
+    g, w = np.polynomial.legendre.leggauss(QUAD_ORDER)
+    edges = np.linspace(t0, t1, panels + 1)
+    mid = (edges[:-1] + edges[1:]) / 2
+    half = np.diff(edges) / 2
+    return (mid[:, None] + half[:, None] * g).ravel(), (half[:, None] * w).ravel()
+
+
+def adaptive_field(
+    make_nodes,
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+) -> FieldArrays:
+    """
+    Field of the quadrature nodes ``make_nodes(panels)``, refined per point.
+
+    Every level doubles the number of panels but is only evaluated at the
+    points that have not converged yet, in batched superpositions of at most
+    ``QUAD_MAX_PAIRS`` (node, point) pairs. Points on the distribution may
+    never converge; ``QUAD_MAX_LEVEL`` caps the work spent on them.
+    """
+    px, py = x.ravel(), y.ravel()
+    panels = 1
+    Ex, Ey, V = superpose(make_nodes(panels), px, py)
+    todo = np.arange(px.size)
+    for _ in range(QUAD_MAX_LEVEL):
+        panels *= 2
+        nodes = make_nodes(panels)
+        step = max(QUAD_MAX_PAIRS // len(nodes), 1)
+        converged = np.zeros(todo.size, dtype=bool)
+        for start in range(0, todo.size, step):
+            chunk = todo[start : start + step]
+            ex, ey, v = superpose(nodes, px[chunk], py[chunk])
+            error = np.hypot(ex - Ex[chunk], ey - Ey[chunk])
+            converged[start : start + step] = error <= QUAD_TOL * np.hypot(ex, ey)
+            Ex[chunk], Ey[chunk], V[chunk] = ex, ey, v
+        todo = todo[~converged]
+        if not todo.size:
+            break
+    return Ex.reshape(x.shape), Ey.reshape(x.shape), V.reshape(x.shape)
+
+
+def _check_numbers(args: tuple[Any, ...], tag: str, counts: tuple[int, ...]) -> None:
+    if len(args) not in counts or not all(is_number(v) for v in args):
+        expected = " или ".join(str(c) for c in counts)
+        raise ValueError(f"Объект {tag!r} ожидает {expected} числовых параметров.")
+    check_limit(*args)
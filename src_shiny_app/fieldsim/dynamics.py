@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Iterator, Literal, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from .kernel import CHUNK_ELEMENTS, K, superpose
+
+# Above this many moving particles forces come from the tree code.
+TREE_THRESHOLD = 2048
+# Barnes-Hut opening angle and the largest number of particles in a leaf.
+TREE_THETA = 0.5
+LEAF_SIZE = 16
+MAX_DEPTH = 32
+# Plummer softening length and the accuracy parameter of the adaptive time step.
+SOFTENING = 0.02
+ETA = 0.02
+
+Integrator = Literal["verlet", "leapfrog"]
+
+
+@dataclass
+class Particles:
+    """
+    Moving charges: positions and velocities are ``(N, 2)``, the rest ``(N,)``.
+    """
+
+    pos: npt.NDArray[np.float64]
+    vel: npt.NDArray[np.float64]
+    q: npt.NDArray[np.float64]
+    m: npt.NDArray[np.float64]
+
+
+@dataclass
+class Frame:
+    """
+    A snapshot handed to the UI.
+    """
+
+    t: float
+    pos: npt.NDArray[np.float64]
+    energy: float
+    drift: float
+    steps: int
+
+
+def direct_forces(
+    pos: npt.NDArray[np.float64],
+    q: npt.NDArray[np.float64],
+    softening: float = SOFTENING,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Softened pairwise Coulomb forces and the potential at every particle due
+    to all the others.
+
+    ``O(N**2)``, processed in blocks of rows to bound the temporaries.
+    """
+    n = len(pos)
+    forces = np.zeros((n, 2))
+    potential = np.zeros(n)
+    step = max(1, CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, n, step):
+        rows = np.arange(start, min(start + step, n))
+        d = pos[rows, None, :] - pos[None, :, :]
+        r2 = (d * d).sum(axis=-1) + softening * softening
+        # Self-pairs stay finite without softening and are zeroed below.
+        r2[np.arange(len(rows)), rows] = 1.0
+        inv_r = 1 / np.sqrt(r2)
+        inv_r[np.arange(len(rows)), rows] = 0.0
+        kq_r = K * q[None, :] * inv_r
+        potential[rows] = kq_r.sum(axis=1)
+        forces[rows] = q[rows, None] * ((kq_r * inv_r * inv_r)[..., None] * d).sum(axis=1)
+    return forces, potential
+
+
+@dataclass
+class _Tree:
+    order: npt.NDArray[np.intp]
+    start: npt.NDArray[np.intp]
+    end: npt.NDArray[np.intp]
+    lo: npt.NDArray[np.float64]
+    size: npt.NDArray[np.float64]
+    center: npt.NDArray[np.float64]
+    charge: npt.NDArray[np.float64]
+    dipole: npt.NDArray[np.float64]
+    children: npt.NDArray[np.intp]
+    leaf: npt.NDArray[np.bool_]
+
+
+def build_tree(
+    pos: npt.NDArray[np.float64],
+    q: npt.NDArray[np.float64],
+    leaf_size: int = LEAF_SIZE,
+) -> _Tree:
+    """
+    Quadtree with a monopole and dipole moment per node.
+
+    Multipoles are taken about the centre of ``|q|`` so mixed-sign nodes still
+    have a well defined expansion point. Each node owns the contiguous range
+    ``order[start:end]`` of particle indices.
+    """
+    n = len(pos)
+    order = np.arange(n)
+    lo_all = pos.min(axis=0)
+    size0 = float((pos.max(axis=0) - lo_all).max()) * (1 + 1e-9) or 1.0
+
+    start, end, lo, size, children = [], [], [], [], []
+    stack = [(0, n, lo_all, size0, 0, -1, 0)]
+    while stack:
+        s, e, box, side, depth, parent, slot = stack.pop()
+        node = len(start)
+        start.append(s)
+        end.append(e)
+        lo.append(box)
+        size.append(side)
+        children.append([-1, -1, -1, -1])
+        if parent >= 0:
+            children[parent][slot] = node
+        if e - s <= leaf_size or depth >= MAX_DEPTH:
+            continue
+        idx = order[s:e]
+        half = side / 2
+        quad = (pos[idx, 0] >= box[0] + half) + 2 * (pos[idx, 1] >= box[1] + half)
+        sorted_ = np.argsort(quad, kind="stable")
+        order[s:e] = idx[sorted_]
+        bounds = s + np.concatenate(([0], np.cumsum(np.bincount(quad, minlength=4))))
+        for k in range(4):
+            if bounds[k + 1] > bounds[k]:
+                corner = box + half * np.array([k % 2, k // 2])
+                stack.append((bounds[k], bounds[k + 1], corner, half, depth + 1, node, k))
+
+    start_arr = np.array(start)
+    end_arr = np.array(end)
+    children_arr = np.array(children)
+    lo_arr = np.array(lo)
+    size_arr = np.array(size)
+
+    # Moments, accumulated per node from its particle range via prefix sums.
+    qo = q[order]
+    po = pos[order]
+    w = np.abs(qo)
+    csum = lambda a: np.concatenate((np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)))
+    cw, cq = csum(w), csum(qo)
+    cwp, cqp = csum(w[:, None] * po), csum(qo[:, None] * po)
+    total_w = cw[end_arr] - cw[start_arr]
+    charge = cq[end_arr] - cq[start_arr]
+    box_center = lo_arr + size_arr[:, None] / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        center = np.where(
+            total_w[:, None] > 0,
+            (cwp[end_arr] - cwp[start_arr]) / total_w[:, None],
+            box_center,
+        )
+    dipole = (cqp[end_arr] - cqp[start_arr]) - charge[:, None] * center
+
+    return _Tree(
+        order=order,
+        start=start_arr,
+        end=end_arr,
+        lo=lo_arr,
+        size=size_arr,
+        center=center,
+        charge=charge,
+        dipole=dipole,
+        children=children_arr,
+        leaf=(children_arr < 0).all(axis=1),
+    )
+
+
+def tree_forces(
+    pos: npt.NDArray[np.float64],
+    q: npt.NDArray[np.float64],
+    softening: float = SOFTENING,
+    theta: float = TREE_THETA,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Barnes-Hut approximation of :func:`direct_forces`.
+
+    All particles walk the tree together: every round handles the current
+    (particle, node) pairs at once, either accepting the node's multipole,
+    interacting directly with a leaf's particles, or opening the node.
+    """
+    tree = build_tree(pos, q)
+    n = len(pos)
+    field = np.zeros((n, 2))
+    potential = np.zeros(n)
+    eps2 = softening * softening
+
+    ti = np.arange(n)
+    tn = np.zeros(n, dtype=np.intp)
+    while ti.size:
+        p = pos[ti]
+        lo = tree.lo[tn]
+        size = tree.size[tn]
+        d = p - tree.center[tn]
+        r2 = (d * d).sum(axis=1)
+        inside = ((p >= lo) & (p <= lo + size[:, None])).all(axis=1)
+        far = ~inside & (size * size < theta * theta * r2)
+
+        if far.any():
+            df, nf = d[far], tn[far]
+            inv_r = 1 / np.sqrt(r2[far] + eps2)
+            inv_r3 = inv_r**3
+            dip = tree.dipole[nf]
+            dd = (dip * df).sum(axis=1)
+            qn = tree.charge[nf]
+            e = K * (
+                (qn * inv_r3 + 3 * dd * inv_r3 * inv_r * inv_r)[:, None] * df
+                - inv_r3[:, None] * dip
+            )
+            _scatter_add(field, ti[far], e)
+            potential += np.bincount(
+                ti[far], K * (qn * inv_r + dd * inv_r3), minlength=n
+            )
+
+        near = ~far
+        at_leaf = near & tree.leaf[tn]
+        if at_leaf.any():
+            li, ln = ti[at_leaf], tn[at_leaf]
+            counts = tree.end[ln] - tree.start[ln]
+            targets = np.repeat(li, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            sources = tree.order[np.repeat(tree.start[ln], counts) + offsets]
+            keep = sources != targets
+            targets, sources = targets[keep], sources[keep]
+            ds = pos[targets] - pos[sources]
+            inv_r = 1 / np.sqrt((ds * ds).sum(axis=1) + eps2)
+            kq_r = K * q[sources] * inv_r
+            _scatter_add(field, targets, (kq_r * inv_r * inv_r)[:, None] * ds)
+            potential += np.bincount(targets, kq_r, minlength=n)
+
+        opened = near & ~tree.leaf[tn]
+        children = tree.children[tn[opened]].ravel()
+        valid = children >= 0
+        ti = np.repeat(ti[opened], 4)[valid]
+        tn = children[valid]
+
+    return q[:, None] * field, potential
+
+
+def _scatter_add(
+    out: npt.NDArray[np.float64], index: npt.NDArray[np.intp], values: npt.NDArray[np.float64]
+) -> None:
+    for c in range(out.shape[1]):
+        out[:, c] += np.bincount(index, values[:, c], minlength=len(out))
+
+
+class Simulation:
+    """
+    Charges moving under their mutual Coulomb forces and the field of fixed
+    charges, integrated with an adaptive time step.
+
+    Parameters
+    ----------
+    particles
+        The moving charges; copied, never modified in place.
+    fixed
+        ``(F, 3)`` array of fixed ``(x, y, q)`` charges.
+    integrator
+        ``"verlet"`` (kick-drift-kick) or ``"leapfrog"`` (drift-kick-drift).
+    softening
+        Plummer softening length for every interaction.
+    eta
+        Accuracy parameter: the time step is ``eta`` times the time scale of the
+        closest encounter.
+    tree_threshold
+        Particle count from which the Barnes-Hut tree replaces direct summation.
+    """
+
+    def __init__(
+        self,
+        particles: Particles,
+        fixed: Optional[npt.NDArray[np.float64]] = None,
+        *,
+        integrator: Integrator = "verlet",
+        softening: float = SOFTENING,
+        eta: float = ETA,
+        tree_threshold: int = TREE_THRESHOLD,
+    ) -> None:
+        self.particles = replace(
+            particles, pos=particles.pos.astype(np.float64), vel=particles.vel.astype(np.float64)
+        )
+        self.fixed = np.empty((0, 3)) if fixed is None else np.asarray(fixed, np.float64)
+        self.integrator = integrator
+        self.softening = softening
+        self.eta = eta
+        self.tree_threshold = tree_threshold
+        self.t = 0.0
+        self.steps = 0
+        self._acc, self._energy = self._accelerations(self.particles.pos)
+        self.initial_energy = self.energy()
+
+    def forces(
+        self, pos: npt.NDArray[np.float64]
+    ) -> tuple[npt.NDArray[np.float64], float]:
+        """
+        Total force on every particle and the total potential energy at ``pos``.
+        """
+        q = self.particles.q
+        if len(pos) >= self.tree_threshold:
+            forces, potential = tree_forces(pos, q, self.softening)
+        else:
+            forces, potential = direct_forces(pos, q, self.softening)
+        energy = 0.5 * float((q * potential).sum())
+        if len(self.fixed):
+            Ex, Ey, V = superpose(self.fixed, pos[:, 0], pos[:, 1], self.softening)
+            forces = forces + q[:, None] * np.column_stack((Ex, Ey))
+            energy += float((q * V).sum())
+        return forces, energy
+
+    def _accelerations(
+        self, pos: npt.NDArray[np.float64]
+    ) -> tuple[npt.NDArray[np.float64], float]:
+        forces, energy = self.forces(pos)
+        return forces / self.particles.m[:, None], energy
+
+    def time_step(self) -> float:
+        """
+        ``eta`` times the shorter of the acceleration and crossing time scales
+        over the softening length, so steps shrink during close encounters.
+        """
+        a_max = np.sqrt((self._acc**2).sum(axis=1)).max(initial=0.0)
+        v_max = np.sqrt((self.particles.vel**2).sum(axis=1)).max(initial=0.0)
+        scales = [np.inf]
+        if a_max > 0:
+            scales.append(np.sqrt(self.softening / a_max))
+        if v_max > 0:
+            scales.append(self.softening / v_max)
+        dt = self.eta * min(scales)
+        return dt if np.isfinite(dt) else 1.0
+
+    def step(self, dt: Optional[float] = None) -> float:
+        """
+        Advance by one step (``dt`` or :meth:`time_step`) and return its length.
+        """
+        if dt is None:
+            dt = self.time_step()
+        p = self.particles
+        if self.integrator == "verlet":
+            p.vel += 0.5 * dt * self._acc
+            p.pos += dt * p.vel
+            self._acc, self._energy = self._accelerations(p.pos)
+            p.vel += 0.5 * dt * self._acc
+        else:
+            p.pos += 0.5 * dt * p.vel
+            self._acc, _ = self._accelerations(p.pos)
+            p.vel += dt * self._acc
+            p.pos += 0.5 * dt * p.vel
+            self._energy = None
+        self.t += dt
+        self.steps += 1
+        return dt
+
+    def advance(self, duration: float, max_steps: Optional[int] = None) -> None:
+        """
+        Integrate for ``duration``, landing exactly on ``t + duration`` unless
+        ``max_steps`` runs out first.
+        """
+        target = self.t + duration
+        taken = 0
+        while self.t < target and (max_steps is None or taken < max_steps):
+            self.step(min(self.time_step(), target - self.t))
+            taken += 1
+
+    def kinetic_energy(self) -> float:
+        p = self.particles
+        return float(0.5 * (p.m * (p.vel**2).sum(axis=1)).sum())
+
+    def potential_energy(self) -> float:
+        if self._energy is None:
+            _, self._energy = self.forces(self.particles.pos)
+        return self._energy
+
+    def energy(self) -> float:
+        return self.kinetic_energy() + self.potential_energy()
+
+    def energy_drift(self) -> float:
+        """
+        Relative change of the total energy since the start.
+        """
+        scale = abs(self.initial_energy) or 1.0
+        return (self.energy() - self.initial_energy) / scale
+
+    def frame(self) -> Frame:
+        return Frame(
+            t=self.t,
+            pos=self.particles.pos.copy(),
+            energy=self.energy(),
+            drift=self.energy_drift(),
+            steps=self.steps,
+        )
+
+    def frames(
+        self, frame_time: float, max_steps_per_frame: Optional[int] = None
+    ) -> Iterator[Frame]:
+        """
+        Endless stream of frames ``frame_time`` apart in simulated time.
+        """
+        yield self.frame()
+        while True:
+            self.advance(frame_time, max_steps_per_frame)
+            yield self.frame()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from .conductors import image_charges
+from .kernel import superpose
+from .symmetry import symmetric_superpose
+from .tracing import timed
+
+if TYPE_CHECKING:
+    from .charges import Config
+
+PADDING = 1
+# Grid points per unit of length.
+RESOLUTION = 10
+# Bump whenever a change to the engine changes the fields it computes, so that
+# fields stored by earlier versions (presets, cache entries, batch images) are
+# recomputed rather than reused.
+ENGINE_VERSION = 1
+
+
+@dataclass
+class FieldResult:
+    """
+    Field sampled on a regular grid, together with the configuration it came from.
+    """
+
+    x: npt.NDArray[np.float64]
+    y: npt.NDArray[np.float64]
+    Ex: npt.NDArray[np.float64]
+    Ey: npt.NDArray[np.float64]
+    V: npt.NDArray[np.float64]
+    config: Config
+
+
+def engine_hash() -> str:
+    """
+    Identifies the fields this version of the engine computes on the default
+    grid: a hash of :data:`ENGINE_VERSION`, :data:`PADDING` and :data:`RESOLUTION`.
+    """
+    key = "{}:{}:{}".format(ENGINE_VERSION, PADDING, RESOLUTION)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def grid_extent(config: Config, padding: float = PADDING) -> tuple[float, float, float, float]:
+    """
+    ``(xmin, xmax, ymin, ymax)`` of the default grid of ``config``.
+    """
+    xs = list(config.charges[:, 0])
+    ys = list(config.charges[:, 1])
+    for shape in [*config.conductors, *config.distributions]:
+        xmin, xmax, ymin, ymax = shape.bounds()
+        xs += [xmin, xmax]
+        ys += [ymin, ymax]
+    return min(xs) - padding, max(xs) + padding, min(ys) - padding, max(ys) + padding
+
+
+def make_grid(
+    config: Config, padding: float = PADDING, resolution: float = RESOLUTION
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Build the ``meshgrid`` covering every charge, conductor and distribution
+    plus ``padding``.
+    """
+    x1, x2, y1, y2 = grid_extent(config, padding)
+    m = max(int(round(resolution * (y2 - y1))), 2)
+    n = max(int(round(resolution * (x2 - x1))), 2)
+    return np.meshgrid(np.linspace(x1, x2, n), np.linspace(y1, y2, m))
+
+
+def field_at(
+    config: Config,
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    ``(Ex, Ey, V)`` of everything in ``config`` at arbitrary points ``(x, y)``.
+
+    Points inside a conductor get zero field.
+    """
+    Ex, Ey, V = superpose(image_charges(config.charges, config.conductors), x, y)
+    for distribution in config.distributions:
+        ex, ey, v = distribution.field(x, y)
+        Ex += ex
+        Ey += ey
+        V += v
+        if config.conductors:
+            # Images of a continuous distribution use its point-charge nodes.
+            nodes = distribution.nodes()
+            images = image_charges(nodes, config.conductors)[len(nodes) :]
+            ex, ey, v = superpose(images, x, y)
+            Ex += ex
+            Ey += ey
+            V += v
+    for conductor in config.conductors:
+        inside = conductor.contains(x, y)
+        Ex[inside] = Ey[inside] = V[inside] = 0.0
+    return Ex, Ey, V
+
+
+@timed("compute")
+def compute_field(
+    config: Config,
+    grid: Optional[tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]] = None,
+) -> FieldResult:
+    """
+    Sample the field of ``config`` on ``grid`` (a ``meshgrid`` pair), by default
+    the one from :func:`make_grid`.
+
+    Configurations made only of point charges go through
+    :func:`~fieldsim.symmetry.symmetric_superpose`.
+    """
+    x, y = make_grid(config) if grid is None else grid
+    if not config.conductors and not config.distributions:
+        Ex, Ey, V = symmetric_superpose(config.charges, x, y)
+    else:
+        Ex, Ey, V = field_at(config, x, y)
+    return FieldResult(x, y, Ex, Ey, V, config)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import sys
+import zipfile
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator
+
+import numpy as np
+
+from .engine import FieldResult
+
+# Size, in bytes of field values, of the chunks the writers yield.
+CHUNK_BYTES = 2**20
+ZIP_LEVEL = 1
+CSV_FORMAT = "%.9g"
+# Pyodide has no threads, so there chunks are encoded inline.
+INLINE = sys.platform == "emscripten"
+
+
+def _row_blocks(field: FieldResult, row_bytes: int) -> Iterator[slice]:
+    rows = max(1, CHUNK_BYTES // max(row_bytes, 1))
+    m = field.x.shape[0]
+    for start in range(0, m, rows):
+        yield slice(start, min(start + rows, m))
+
+
+class _Sink:
+    """
+    Write-only file collecting what is written until it is drained.
+    """
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def npz_chunks(field: FieldResult) -> Iterator[bytes]:
+    """
+    The field as a compressed ``.npz`` archive, like :func:`numpy.savez_compressed`
+    would write it: the axes ``x`` (``n``) and ``y`` (``m``), and ``Ex``, ``Ey``
+    and ``V`` (``m``, ``n``).
+
+    The archive is written to a non-seekable sink, so :mod:`zipfile` puts each
+    member's sizes in a trailing data descriptor and nothing has to be rewound.
+    """
+    sink = _Sink()
+    arrays = {
+        "x": field.x[0],
+        "y": field.y[:, 0],
+        "Ex": field.Ex,
+        "Ey": field.Ey,
+        "V": field.V,
+    }
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL) as archive:
+        for name, values in arrays.items():
+            values = np.asarray(values)
+            force_zip64 = values.nbytes >= zipfile.ZIP64_LIMIT
+            with archive.open(name + ".npy", "w", force_zip64=force_zip64) as member:
+                np.lib.format.write_array_header_1_0(
+                    member, np.lib.format.header_data_from_array_1_0(values)
+                )
+                if values.ndim == 1:
+                    member.write(values.tobytes())
+                else:
+                    for rows in _row_blocks(field, values[0].nbytes):
+                        member.write(np.ascontiguousarray(values[rows]).tobytes())
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def csv_chunks(field: FieldResult) -> Iterator[bytes]:
+    """
+    The field as CSV with one ``x,y,Ex,Ey,V`` line per grid point, a block of
+    grid rows at a time.
+    """
+    yield b"x,y,Ex,Ey,V\n"
+    for rows in _row_blocks(field, 5 * field.x[0].nbytes):
+        block = np.column_stack(
+            [a[rows].ravel() for a in (field.x, field.y, field.Ex, field.Ey, field.V)]
+        )
+        buffer = io.BytesIO()
+        np.savetxt(buffer, block, fmt=CSV_FORMAT, delimiter=",")
+        yield buffer.getvalue()
+
+
+def vtk_chunks(field: FieldResult) -> Iterator[bytes]:
+    """
+    The field as a legacy VTK ``STRUCTURED_POINTS`` file, as read by ParaView:
+    ``V`` as point scalars and ``E`` as point vectors, big-endian float32.
+    """
+    m, n = field.x.shape
+    x0, y0 = float(field.x[0, 0]), float(field.y[0, 0])
+    dx, dy = float(field.x[0, 1]) - x0, float(field.y[1, 0]) - y0
+    yield (
+        "# vtk DataFile Version 3.0\n"
+        "fieldsim\n"
+        "BINARY\n"
+        "DATASET STRUCTURED_POINTS\n"
+        f"DIMENSIONS {n} {m} 1\n"
+        f"ORIGIN {x0!r} {y0!r} 0\n"
+        f"SPACING {dx!r} {dy!r} 1\n"
+        f"POINT_DATA {m * n}\n"
+        "SCALARS V float 1\n"
+        "LOOKUP_TABLE default\n"
+    ).encode("ascii")
+    # VTK runs through x first, then y, which is the C order of the (m, n) arrays.
+    for rows in _row_blocks(field, field.x[0].nbytes):
+        yield field.V[rows].astype(">f4").tobytes()
+    yield b"\nVECTORS E float\n"
+    for rows in _row_blocks(field, 3 * field.x[0].nbytes):
+        vectors = np.zeros((*field.x[rows].shape, 3), dtype=">f4")
+        vectors[..., 0] = field.Ex[rows]
+        vectors[..., 1] = field.Ey[rows]
+        yield vectors.tobytes()
+    yield b"\n"
+
+
+@dataclass(frozen=True)
+class Export:
+    label: str
+    filename: str
+    media_type: str
+    chunks: Callable[[FieldResult], Iterator[bytes]]
+
+
+EXPORTS = {
+    "npz": Export("NumPy (.npz)", "field.npz", "application/zip", npz_chunks),
+    "csv": Export("CSV", "field.csv", "text/csv", csv_chunks),
+    "vtk": Export("VTK для ParaView", "field.vtk", "application/octet-stream", vtk_chunks),
+}
+
+
+async def aiter_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Drive a writer on a worker thread one chunk at a time, so that encoding a
+    large field never blocks the event loop. Empty chunks are dropped.
+    """
+    while True:
+        if INLINE:
+            chunk = next(chunks, None)
+        else:
+            chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            return
+        if chunk:
+            yield chunk
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from .cache import default_cache
+from .charges import Config, config_key
+from .engine import FieldResult, compute_field
+
+T = TypeVar("T")
+
+FLIGHT_WORKERS = 4
+# Pyodide has no threads, so there computations run inline.
+INLINE = sys.platform == "emscripten"
+
+
+@dataclass
+class FlightStats:
+    """
+    Counters of a :class:`SingleFlight`.
+
+    ``computed`` counts computations started and ``shared`` the requests that
+    joined one already in flight, i.e. computations saved. ``cancelled`` counts
+    waiters that left early and ``abandoned`` the computations dropped before
+    they started because every waiter left.
+    """
+
+    computed: int = 0
+    shared: int = 0
+    cancelled: int = 0
+    abandoned: int = 0
+    failed: int = 0
+
+
+class _Flight(Generic[T]):
+    def __init__(self, future: Future[T]) -> None:
+        self.future = future
+        self.result = asyncio.wrap_future(future)
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Run at most one computation per key at a time; concurrent callers with the
+    same key await the same result.
+
+    A caller that is cancelled stops waiting without disturbing the others. When
+    the last waiter leaves, a computation that has not started yet is dropped;
+    one already running on a thread cannot be interrupted and is left to finish,
+    so that callers arriving meanwhile can still join it.
+
+    Parameters
+    ----------
+    executor
+        Where computations run; by default a pool of :data:`FLIGHT_WORKERS`
+        threads created on first use.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None) -> None:
+        self.executor = executor
+        self.stats = FlightStats()
+        self._flights: dict[Hashable, _Flight[T]] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def snapshot(self) -> FlightStats:
+        return replace(self.stats)
+
+    async def run(self, key: Hashable, fn: Callable[..., T], *args: object) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(self._submit(fn, *args))
+            self._flights[key] = flight
+            flight.result.add_done_callback(lambda _: self._land(key, flight))
+            self.stats.computed += 1
+        else:
+            self.stats.shared += 1
+
+        flight.waiters += 1
+        try:
+            # shield() keeps one waiter's cancellation from cancelling the
+            # shared future the others are awaiting.
+            return await asyncio.shield(flight.result)
+        except asyncio.CancelledError:
+            if not flight.result.done():
+                self.stats.cancelled += 1
+                if flight.waiters == 1 and flight.future.cancel():
+                    self.stats.abandoned += 1
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _submit(self, fn: Callable[..., T], *args: object) -> Future[T]:
+        if INLINE:
+            future: Future[T] = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(FLIGHT_WORKERS, thread_name_prefix="fieldsim-flight")
+        return self.executor.submit(fn, *args)
+
+    def _land(self, key: Hashable, flight: _Flight[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.result.cancelled() and flight.result.exception() is not None:
+            self.stats.failed += 1
+
+
+field_flights: SingleFlight[FieldResult] = SingleFlight()
+field_cache = default_cache()
+
+
+async def compute_field_shared(config: Config) -> FieldResult:
+    """
+    :func:`~fieldsim.engine.compute_field` on a worker thread, shared between
+    all concurrent callers (for instance sessions) asking for the same
+    configuration. Results go through the disk cache when one is configured.
+    """
+    compute = compute_field if field_cache is None else field_cache.compute_field
+    return await field_flights.run(config_key(config), compute, config)
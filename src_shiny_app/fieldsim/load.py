@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, Protocol, Sequence
+
+import numpy as np
+
+from .bench import APP_FILE, config_text, random_charges
+from .monitor import heartbeat
+
+if TYPE_CHECKING:
+    from shiny import App
+
+# Outputs a simulated browser shows; the rest of the app stays hidden.
+VISIBLE = ("plot", "heatmap", "canvas")
+SESSIONS = 20
+UPDATES = 10
+# Mean pause, in seconds, between a session's edits.
+THINK_TIME = 2.0
+# Sessions are opened evenly over this many seconds.
+RAMP_UP = 5.0
+UPDATE_TIMEOUT = 120.0
+SCRIPT_LENGTH = 20
+SCRIPT_CHARGES = 6
+PERCENTILES = (50, 95, 99)
+
+
+def init_data(text: Optional[str] = None) -> dict[str, object]:
+    """
+    The inputs a browser sends when it opens the app with only :data:`VISIBLE`
+    shown, and ``text`` in the charge box.
+    """
+    data: dict[str, object] = {".clientdata_pixelratio": 1}
+    if text is not None:
+        data["charge_input"] = text
+    for name in VISIBLE:
+        data[f".clientdata_output_{name}_hidden"] = False
+        data[f".clientdata_output_{name}_width"] = 600
+        data[f".clientdata_output_{name}_height"] = 400
+    return data
+
+
+def load_app(app_file: Path = APP_FILE) -> App:
+    from shiny.express._run import wrap_express_app
+
+    return wrap_express_app(app_file)
+
+
+class Session(Protocol):
+    async def open(self, data: dict[str, object]) -> float: ...
+
+    async def update(self, data: dict[str, object]) -> float: ...
+
+    async def close(self) -> None: ...
+
+
+def _is_settled(message: str, pending: set[str]) -> bool:
+    """
+    Follow a message from the server: ``pending`` holds the outputs that have
+    started recalculating and not finished, such as those waiting for an
+    extended task, which runs after the session has gone idle. Returns whether
+    the session is now idle with none of them left.
+    """
+    if message.startswith('{"recalculating"'):
+        output = json.loads(message)["recalculating"]
+        if output["status"] == "recalculating":
+            pending.add(output["name"])
+        else:
+            pending.discard(output["name"])
+        return False
+    return (
+        message.startswith('{"busy"')
+        and json.loads(message)["busy"] == "idle"
+        and not pending
+    )
+
+
+class MockSession:
+    """
+    A session of ``app`` in this process, over a
+    :class:`~shiny._connection.MockConnection`.
+
+    :meth:`open` and :meth:`update` return the round trip in seconds: from the
+    message being received to the session going idle with every affected
+    output recomputed, rendered and serialized, including those that waited
+    for the field computation.
+    """
+
+    def __init__(self, app: App) -> None:
+        from shiny._connection import MockConnection
+
+        idle = self._idle = asyncio.Event()
+        pending: set[str] = set()
+
+        class Connection(MockConnection):
+            async def send(self, message: str) -> None:
+                if _is_settled(message, pending):
+                    idle.set()
+
+        self.app = app
+        self.conn = Connection()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def open(self, data: dict[str, object]) -> float:
+        session = self.app._create_session(self.conn)
+        self._task = asyncio.create_task(session._run())
+        return await self._round_trip("init", data)
+
+    async def update(self, data: dict[str, object]) -> float:
+        return await self._round_trip("update", data)
+
+    async def _round_trip(self, method: str, data: dict[str, object]) -> float:
+        self._idle.clear()
+        start = time.perf_counter()
+        self.conn.cause_receive(json.dumps({"method": method, "data": data}))
+        await self._idle.wait()
+        return time.perf_counter() - start
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self.conn.cause_disconnect()
+            await self._task
+
+
+class WebSocketSession:
+    """
+    A session of a running server, e.g. ``ws://127.0.0.1:8000/websocket/``,
+    timed the same way as :class:`MockSession`.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._idle = asyncio.Event()
+        self._pending: set[str] = set()
+        self._ws: Any = None
+        self._reader: Optional[asyncio.Task[None]] = None
+
+    async def open(self, data: dict[str, object]) -> float:
+        import websockets
+
+        self._ws = await websockets.connect(self.url, max_size=None)
+        self._reader = asyncio.create_task(self._read())
+        return await self._round_trip("init", data)
+
+    async def update(self, data: dict[str, object]) -> float:
+        return await self._round_trip("update", data)
+
+    async def _read(self) -> None:
+        async for message in self._ws:
+            if isinstance(message, str) and _is_settled(message, self._pending):
+                self._idle.set()
+
+    async def _round_trip(self, method: str, data: dict[str, object]) -> float:
+        self._idle.clear()
+        start = time.perf_counter()
+        await self._ws.send(json.dumps({"method": method, "data": data}))
+        await self._idle.wait()
+        return time.perf_counter() - start
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+def default_script(length: int = SCRIPT_LENGTH, charges: int = SCRIPT_CHARGES) -> list[str]:
+    """
+    ``length`` different random configurations of ``charges`` point charges.
+    """
+    return [config_text(random_charges(charges, seed)) for seed in range(length)]
+
+
+@dataclass
+class LoadReport:
+    target: str
+    sessions: int
+    seconds: float
+    # Round trips of every edit, in seconds.
+    latencies: list[float] = field(default_factory=list)
+    opens: list[float] = field(default_factory=list)
+    # How late each heartbeat woke up, in seconds; in-process runs only.
+    lag: list[float] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    cpu_seconds: Optional[float] = None
+
+    def percentiles(self, values: Sequence[float]) -> dict[str, float]:
+        if not values:
+            return {}
+        points = np.percentile(values, PERCENTILES)
+        return {f"p{p}": float(v) for p, v in zip(PERCENTILES, points)}
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "target": self.target,
+            "sessions": self.sessions,
+            "seconds": self.seconds,
+            "updates": len(self.latencies),
+            "errors": self.errors,
+            "latency": {
+                **self.percentiles(self.latencies),
+                "max": max(self.latencies, default=0.0),
+            },
+            "open": self.percentiles(self.opens),
+            "lag": {**self.percentiles(self.lag), "max": max(self.lag, default=0.0)},
+            "cpu_seconds": self.cpu_seconds,
+            "cpu_per_session": (
+                None if self.cpu_seconds is None else self.cpu_seconds / self.sessions
+            ),
+            "latencies": self.latencies,
+        }
+
+    def describe(self) -> str:
+        def ms(stats: dict[str, float]) -> str:
+            return ", ".join("{} {:.0f} ms".format(k, v * 1e3) for k, v in stats.items()) or "-"
+
+        data = self.to_json()
+        lines = [
+            "{} sessions against {} for {:.1f} s: {} updates, {} errors".format(
+                self.sessions, self.target, self.seconds, len(self.latencies), len(self.errors)
+            ),
+            "update latency: " + ms(data["latency"]),
+            "session open:   " + ms(data["open"]),
+        ]
+        if self.lag:
+            lines.append("event-loop lag: " + ms(data["lag"]))
+        if self.cpu_seconds is not None:
+            lines.append(
+                "CPU: {:.2f} s, {:.3f} s per session".format(
+                    self.cpu_seconds, data["cpu_per_session"]
+                )
+            )
+        return "\n".join(lines)
+
+
+def cpu_seconds(pid: Optional[int] = None) -> float:
+    """
+    CPU time used so far by this process, or by process ``pid`` (Linux only).
+    """
+    if pid is None:
+        return time.process_time()
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    utime, stime = int(fields[11]), int(fields[12])
+    return (utime + stime) / os.sysconf("SC_CLK_TCK")
+
+
+async def _user(
+    k: int,
+    session: Session,
+    script: Sequence[str],
+    updates: int,
+    think_time: float,
+    delay: float,
+    report: LoadReport,
+) -> None:
+    rng = np.random.default_rng(k)
+    await asyncio.sleep(delay)
+    try:
+        first = init_data(script[k % len(script)])
+        report.opens.append(await asyncio.wait_for(session.open(first), UPDATE_TIMEOUT))
+        for step in range(updates):
+            await asyncio.sleep(rng.exponential(think_time))
+            text = script[(k + step + 1) % len(script)]
+            latency = await asyncio.wait_for(session.update({"charge_input": text}), UPDATE_TIMEOUT)
+            report.latencies.append(latency)
+    except Exception as e:
+        report.errors.append("session {}: {!r}".format(k, e))
+    finally:
+        try:
+            await session.close()
+        except Exception:
+            pass
+
+
+async def run_load(
+    sessions: int = SESSIONS,
+    updates: int = UPDATES,
+    think_time: float = THINK_TIME,
+    ramp_up: float = RAMP_UP,
+    script: Optional[Sequence[str]] = None,
+    url: Optional[str] = None,
+    server_pid: Optional[int] = None,
+    app_file: Path = APP_FILE,
+) -> LoadReport:
+    """
+    Open ``sessions`` sessions, each replaying ``updates`` edits of the charge
+    box from ``script`` after pauses drawn around ``think_time``.
+
+    Without ``url`` the app runs in this process and the event-loop lag and
+    CPU time are measured here; with it, a running server is driven over
+    websockets and CPU time is read from ``server_pid`` if given.
+    """
+    script = list(script or default_script())
+    if len(set(script)) < 2:
+        # Re-sending the same configuration would not make the session busy.
+        raise ValueError("the script needs at least two different configurations")
+
+    factory: Callable[[], Session]
+    if url is None:
+        app = load_app(app_file)
+        factory = lambda: MockSession(app)  # noqa: E731
+        target = "in-process " + app_file.name
+    else:
+        factory = lambda: WebSocketSession(url)  # noqa: E731
+        target = url
+
+    report = LoadReport(target, sessions, 0.0)
+    beat = asyncio.create_task(heartbeat(report.lag.append)) if url is None else None
+    measure_cpu = url is None or server_pid is not None
+    cpu_start = cpu_seconds(server_pid) if measure_cpu else 0.0
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(
+                _user(k, factory(), script, updates, think_time, ramp_up * k / sessions, report)
+                for k in range(sessions)
+            )
+        )
+    finally:
+        if beat is not None:
+            beat.cancel()
+    report.seconds = time.perf_counter() - start
+    if measure_cpu:
+        report.cpu_seconds = cpu_seconds(server_pid) - cpu_start
+    return report
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Coroutine, Generator, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from starlette.routing import Route
+
+logger = logging.getLogger("fieldsim.monitor")
+
+# Setting this environment variable to 1 turns the monitor on for the app.
+MONITOR_ENV = "FIELDSIM_LOOP_MONITOR"
+# Overrides SLOW_CALLBACK, in seconds.
+SLOW_CALLBACK_ENV = "FIELDSIM_SLOW_CALLBACK"
+# Period, in seconds, of the heartbeat measuring event-loop lag.
+LAG_INTERVAL = 0.05
+# Callbacks holding the event loop for longer than this many seconds are logged.
+SLOW_CALLBACK = 0.1
+# Lag samples kept for percentiles: a minute's worth at the default interval.
+LAG_SAMPLES = 1200
+RECENT_SLOW = 200
+PERCENTILES = (50, 95, 99)
+
+
+async def heartbeat(on_lag: Callable[[float], None], interval: float = LAG_INTERVAL) -> None:
+    """
+    Sleep ``interval`` seconds over and over, passing how late each wake-up
+    was to ``on_lag``. Anything holding the event loop shows up as lag.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        on_lag(max(0.0, loop.time() - start - interval))
+
+
+class _Steps:
+    """
+    Await ``coro`` while timing each of its steps, i.e. each stretch during
+    which it holds the event loop, and report the longest to ``done``.
+    """
+
+    __slots__ = ("coro", "done", "longest")
+
+    def __init__(self, coro: Coroutine[Any, Any, Any], done: Callable[[float], None]) -> None:
+        self.coro = coro
+        self.done = done
+        self.longest = 0.0
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        value: Any = None
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    if error is None:
+                        signal = self.coro.send(value)
+                    else:
+                        signal = self.coro.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    self.longest = max(self.longest, time.perf_counter() - start)
+                try:
+                    value, error = (yield signal), None
+                except BaseException as e:
+                    value, error = None, e
+        finally:
+            self.done(self.longest)
+
+
+@dataclass
+class CallbackStats:
+    kind: str
+    label: str
+    runs: int = 0
+    slow: int = 0
+    # Longest single hold of the event loop, and the sum of those per run.
+    max_held: float = 0.0
+    total_held: float = 0.0
+
+
+@dataclass
+class SlowCallback:
+    kind: str
+    label: str
+    session: Optional[str]
+    held: float
+    at: float
+
+
+class LoopMonitor:
+    """
+    Event-loop lag and the reactive callbacks responsible for it.
+
+    A heartbeat task measures the lag. Every run of a Shiny effect (outputs
+    included) and calc is timed step by step; a run that holds the loop for
+    longer than ``threshold`` seconds in one go is logged with its output id
+    or function name and session id. :meth:`snapshot` aggregates both, and
+    :meth:`routes` serves it, to tell which renders belong in an
+    ``ExtendedTask`` or on a thread.
+    """
+
+    def __init__(
+        self, enabled: bool = False, threshold: float = SLOW_CALLBACK, interval: float = LAG_INTERVAL
+    ) -> None:
+        self.enabled = enabled
+        self.threshold = threshold
+        self.interval = interval
+        self.lag: deque[float] = deque(maxlen=LAG_SAMPLES)
+        self.max_lag = 0.0
+        self.beats = 0
+        self.callbacks: dict[tuple[str, str], CallbackStats] = {}
+        self.recent: deque[SlowCallback] = deque(maxlen=RECENT_SLOW)
+        self._heartbeat: Optional[asyncio.Task[None]] = None
+
+    def record_lag(self, lag: float) -> None:
+        self.lag.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        self.beats += 1
+
+    def ensure_heartbeat(self) -> None:
+        """
+        Start the heartbeat on the running loop unless it is already there.
+        """
+        loop = asyncio.get_running_loop()
+        if self._heartbeat is None or self._heartbeat.done() or self._heartbeat.get_loop() is not loop:
+            self._heartbeat = loop.create_task(heartbeat(self.record_lag, self.interval))
+
+    def record_callback(self, kind: str, label: str, session: Optional[str], held: float) -> None:
+        stats = self.callbacks.get((kind, label))
+        if stats is None:
+            stats = self.callbacks[(kind, label)] = CallbackStats(kind, label)
+        stats.runs += 1
+        stats.total_held += held
+        stats.max_held = max(stats.max_held, held)
+        if held > self.threshold:
+            stats.slow += 1
+            self.recent.append(SlowCallback(kind, label, session, held, time.time()))
+            logger.warning(
+                "%s %s held the event loop for %.0f ms (session %s)",
+                kind,
+                label,
+                held * 1e3,
+                session,
+            )
+
+    def timed(
+        self, kind: str, label: Callable[[], str], session: Optional[str], coro: Coroutine[Any, Any, Any]
+    ) -> Awaitable[Any]:
+        def done(held: float) -> None:
+            self.record_callback(kind, label(), session, held)
+
+        return _Steps(coro, done)
+
+    def snapshot(self) -> dict[str, Any]:
+        lag = list(self.lag)
+        points = np.percentile(lag, PERCENTILES) if lag else []
+        return {
+            "threshold": self.threshold,
+            "lag": {
+                "interval": self.interval,
+                "beats": self.beats,
+                "max": self.max_lag,
+                **{f"p{p}": float(v) for p, v in zip(PERCENTILES, points)},
+            },
+            "callbacks": [
+                asdict(s) for s in sorted(self.callbacks.values(), key=lambda s: -s.max_held)
+            ],
+            "slow": [asdict(s) for s in reversed(self.recent)],
+        }
+
+    def routes(self, path: str = "/admin/loop") -> list[Route]:
+        # Imported here so that the monitor does not depend on Starlette.
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse, Response
+        from starlette.routing import Route
+
+        async def endpoint(request: Request) -> Response:
+            return JSONResponse(self.snapshot())
+
+        return [Route(path, endpoint)]
+
+
+def _session_id(reactive: Any) -> Optional[str]:
+    session = reactive._session
+    return None if session is None else session.id
+
+
+def _effect_label(effect: Any) -> str:
+    # Outputs are effects all named output_obs; name them by their output id.
+    session = effect._session
+    outputs = getattr(getattr(session, "output", None), "_outputs", {})
+    for name, info in outputs.items():
+        if info.effect is effect:
+            return "output " + name
+    return effect.__name__
+
+
+monitor = LoopMonitor(
+    enabled=os.environ.get(MONITOR_ENV) == "1",
+    threshold=float(os.environ.get(SLOW_CALLBACK_ENV, SLOW_CALLBACK)),
+)
+
+
+def instrument_shiny(monitor: LoopMonitor = monitor) -> None:
+    """
+    Time every run of Shiny's effects (which include outputs) and calcs, and
+    start the heartbeat with the first of them. Only call this when
+    monitoring, so the disabled path stays untouched; calling it again does
+    nothing.
+    """
+    from shiny.reactive._reactives import Calc_, Effect_
+
+    if getattr(Effect_._run, "_fieldsim_monitored", False):
+        return
+    run_effect = Effect_._run
+    update_calc = Calc_.update_value
+
+    @functools.wraps(run_effect)
+    async def _run(self: Effect_) -> None:
+        monitor.ensure_heartbeat()
+        await monitor.timed("effect", lambda: _effect_label(self), _session_id(self), run_effect(self))
+
+    @functools.wraps(update_calc)
+    async def update_value(self: Calc_[Any]) -> None:
+        await monitor.timed("calc", lambda: self.__name__, _session_id(self), update_calc(self))
+
+    _run._fieldsim_monitored = True  # type: ignore[attr-defined]
+    Effect_._run = _run  # type: ignore[method-assign]
+    Calc_.update_value = update_value  # type: ignore[method-assign]
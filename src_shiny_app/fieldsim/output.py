@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+from htmltools import HTMLDependency, Tag, css, tags
+from shiny.render.renderer import Jsonifiable, Renderer, ValueFn
+
+from .engine import FieldResult
+from .transport import FIELD_MAX_SIDE, encode_field
+
+_WWW = Path(__file__).parent / "www"
+
+
+def field_canvas_dependency() -> HTMLDependency:
+    return HTMLDependency(
+        "fieldsim-canvas",
+        "1.0.0",
+        source={"subdir": str(_WWW)},
+        script={"src": "field-canvas.js"},
+    )
+
+
+def output_field_canvas(id: str, width: str = "100%", height: str = "400px") -> Tag:
+    """
+    Container for a :class:`field_canvas` output.
+
+    The colour map and field lines are drawn in the browser, and the small
+    toolbar switches between them without a round trip to the server.
+    """
+    return tags.div(
+        field_canvas_dependency(),
+        id=id,
+        class_="fieldsim-canvas-output",
+        style=css(width=width, height=height, position="relative"),
+    )
+
+
+class field_canvas(Renderer[FieldResult]):
+    """
+    Send a :class:`~fieldsim.engine.FieldResult` to the browser as compact
+    quantized arrays to be drawn on a ``<canvas>``.
+
+    Parameters
+    ----------
+    max_side
+        The field is downsampled so that no side of the grid sent exceeds this.
+    """
+
+    def auto_output_ui(self) -> Tag:
+        return output_field_canvas(self.output_id)
+
+    def __init__(
+        self,
+        _fn: Optional[ValueFn[FieldResult]] = None,
+        *,
+        max_side: int = FIELD_MAX_SIDE,
+    ) -> None:
+        super().__init__(_fn)
+        self.max_side = max_side
+
+    async def transform(self, value: FieldResult) -> Jsonifiable:
+        return encode_field(value, self.max_side)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from matplotlib.axes import Axes
+from matplotlib.patches import Circle
+
+from .conductors import GroundedPlane, GroundedSphere
+from .distributions import Disc
+from .engine import FieldResult
+from .tracing import span
+
+
+def draw_field(ax: Axes, field: FieldResult) -> None:
+    """
+    Draw charges, conductors, distributions and field lines of ``field`` onto ``ax``.
+    """
+    charges = field.config.charges
+    ax.set_aspect("equal")
+    ax.scatter(charges[:, 0], charges[:, 1], c="red", s=abs(charges[:, 2]) * 50, zorder=1)
+    for xq, yq, q in charges:
+        ax.text(xq + 0.1, yq - 0.3, "{:g}".format(q), color="black", zorder=2)
+    for conductor in field.config.conductors:
+        if isinstance(conductor, GroundedSphere):
+            ax.add_patch(
+                Circle((conductor.cx, conductor.cy), conductor.radius, color="gray", zorder=1)
+            )
+        elif isinstance(conductor, GroundedPlane):
+            ax.axline(
+                (conductor.x0, conductor.y0),
+                (conductor.x0 - conductor.ny, conductor.y0 + conductor.nx),
+                color="gray",
+                linewidth=3,
+                zorder=1,
+            )
+    for distribution in field.config.distributions:
+        if isinstance(distribution, Disc):
+            ax.add_patch(
+                Circle(
+                    (distribution.cx, distribution.cy),
+                    distribution.radius,
+                    color="red",
+                    alpha=0.3,
+                    zorder=1,
+                )
+            )
+        else:
+            ax.plot(*distribution.outline(), color="red", linewidth=3, zorder=1)
+    with span("trace"):
+        ax.streamplot(field.x, field.y, field.Ex, field.Ey, linewidth=1, density=1.5, zorder=0)
+    ax.set_title("Симуляция электростатического поля")
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from .charges import Config, config_key, parse_config
+from .engine import FieldResult, compute_field, engine_hash, make_grid
+from .plotting import draw_field
+
+INDEX_NAME = "index.json"
+
+
+@dataclass(frozen=True)
+class Preset:
+    label: str
+    text: str
+
+
+def _lattice(size: int) -> str:
+    half = size // 2
+    return str(
+        [
+            (x, y, 1 if (x + y) % 2 == 0 else -1)
+            for x in range(-half, size - half)
+            for y in range(-half, size - half)
+        ]
+    )
+
+
+PRESETS = {
+    "dipole": Preset("Диполь", "[(-1, 0, 1), (1, 0, -1)]"),
+    "quadrupole": Preset("Квадруполь", "[(-1, -1, 1), (1, 1, 1), (-1, 1, -1), (1, -1, -1)]"),
+    "capacitor": Preset(
+        "Плоский конденсатор",
+        "[('segment', -2, 1, 2, 1, 1), ('segment', -2, -1, 2, -1, -1)]",
+    ),
+    "ring": Preset("Заряженное кольцо", "[('arc', 0, 0, 2, 0, 360, 1)]"),
+    "lattice": Preset("Решётка зарядов", _lattice(5)),
+}
+
+
+def build_presets(dest: Path, dpi: int = 100) -> dict[str, str]:
+    """
+    Compute and draw every preset into ``dest``: ``<name>.npy`` holds ``Ex``,
+    ``Ey`` and ``V`` stacked as ``(3, m, n)``, ``<name>.png`` the plot, and
+    ``index.json`` records the :func:`~fieldsim.engine.engine_hash` they were
+    built with and
+    maps each name to the hash of its configuration, which is returned.
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    index = {}
+    for name, preset in PRESETS.items():
+        config = parse_config(preset.text)
+        field = compute_field(config)
+        np.save(dest / (name + ".npy"), np.stack((field.Ex, field.Ey, field.V)))
+        fig = Figure()
+        draw_field(fig.add_subplot(), field)
+        fig.savefig(dest / (name + ".png"), dpi=dpi)
+        index[name] = config_key(config)
+    (dest / INDEX_NAME).write_text(
+        json.dumps({"engine": engine_hash(), "presets": index}, indent=1, sort_keys=True),
+        encoding="utf-8",
+    )
+    return index
+
+
+class PresetStore:
+    """
+    Precomputed presets written by :func:`build_presets` into ``directory``.
+
+    A configuration counts as a preset when its :func:`~fieldsim.charges.config_key`
+    matches one in the index, whichever way it was typed. A missing directory
+    matches nothing, and so does one built by another version of the engine
+    (see :func:`~fieldsim.engine.engine_hash`), whose fields could differ from
+    computed ones.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._fields: dict[str, FieldResult] = {}
+        try:
+            index = json.loads((directory / INDEX_NAME).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            index = {}
+        if index.get("engine") != engine_hash():
+            index = {}
+        presets = index.get("presets", {})
+        self._names = {key: name for name, key in presets.items() if name in PRESETS}
+
+    def match(self, config: Config) -> Optional[str]:
+        return self._names.get(config_key(config))
+
+    def field(self, name: str, config: Config) -> FieldResult:
+        if name not in self._fields:
+            x, y = make_grid(config)
+            values = np.load(self.directory / (name + ".npy"), mmap_mode="r")
+            self._fields[name] = FieldResult(x, y, values[0], values[1], values[2], config)
+        return self._fields[name]
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import struct
+import tempfile
+import zlib
+from typing import Literal
+
+import numpy as np
+import numpy.typing as npt
+
+from .engine import FieldResult
+from .tracing import timed
+
+Quantity = Literal["magnitude", "potential"]
+
+# Colours of matplotlib's viridis and RdBu_r at nine evenly spaced stops.
+_VIRIDIS = [
+    (68, 1, 84), (71, 45, 123), (59, 82, 139), (44, 114, 142), (33, 145, 140),
+    (40, 174, 128), (94, 201, 98), (173, 220, 48), (253, 231, 37),
+]  # fmt: skip
+_RDBU_R = [
+    (5, 48, 97), (42, 113, 178), (107, 172, 209), (194, 221, 236), (247, 246, 246),
+    (251, 204, 180), (228, 128, 102), (186, 40, 50), (103, 0, 31),
+]  # fmt: skip
+
+# The images are palette PNGs: the colormap takes the first LEVELS entries and the
+# last two are reserved for the charge markers.
+LEVELS = 254
+MARKER_FILL = 254
+MARKER_EDGE = 255
+PNG_COMPRESSION = 1
+# Percentiles of the log-scaled field used as the ends of the colour scale.
+CLIP_PERCENTILES = (1, 99)
+
+
+def _build_palette(stops: list[tuple[int, int, int]]) -> npt.NDArray[np.uint8]:
+    stops_arr = np.array(stops, dtype=np.float64)
+    at = np.linspace(0, 1, len(stops))
+    t = np.linspace(0, 1, LEVELS)
+    lut = np.column_stack([np.interp(t, at, stops_arr[:, c]) for c in range(3)])
+    markers = [(255, 0, 0), (0, 0, 0)]
+    return np.vstack((np.round(lut), markers)).astype(np.uint8)
+
+
+PALETTES: dict[str, npt.NDArray[np.uint8]] = {
+    "magnitude": _build_palette(_VIRIDIS),
+    "potential": _build_palette(_RDBU_R),
+}
+
+
+@timed("encode")
+def heatmap_png(
+    field: FieldResult,
+    width: int,
+    height: int,
+    quantity: Quantity = "magnitude",
+    markers: bool = True,
+) -> tuple[bytes, int, int]:
+    """
+    Render ``|E|`` or the potential of ``field`` straight to PNG bytes.
+
+    The image is fitted into ``width`` x ``height`` keeping the grid's aspect
+    ratio; the actual pixel size is returned along with the bytes.
+    """
+    w, h = fit_size(field, width, height)
+    values = scale_magnitude(field) if quantity == "magnitude" else scale_potential(field)
+    # Grid row 0 is the bottom of the plot but the top of the image.
+    index = to_levels(resample(values[::-1], h, w))
+    if markers:
+        draw_markers(index, field)
+    return encode_png(index, PALETTES[quantity]), w, h
+
+
+def png_file(png: bytes) -> str:
+    """
+    Write ``png`` to a temporary file and return its path, for a
+    ``render.image(delete_file=True)`` output to send and remove.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
+        f.write(png)
+    return f.name
+
+
+def fit_size(field: FieldResult, width: int, height: int) -> tuple[int, int]:
+    span_x = field.x[0, -1] - field.x[0, 0]
+    span_y = field.y[-1, 0] - field.y[0, 0]
+    scale = min(width / span_x, height / span_y)
+    return max(int(span_x * scale), 1), max(int(span_y * scale), 1)
+
+
+def scale_magnitude(field: FieldResult) -> npt.NDArray[np.float64]:
+    """
+    ``log10 |E|`` mapped onto ``[0, 1]``.
+    """
+    with np.errstate(divide="ignore"):
+        values = np.log10(np.hypot(field.Ex, field.Ey))
+    return _normalize(values, signed=False)
+
+
+def scale_potential(field: FieldResult) -> npt.NDArray[np.float64]:
+    """
+    Signed logarithm of ``V`` mapped onto ``[0, 1]``, with zero at 0.5.
+    """
+    V = field.V
+    nonzero = np.abs(V[V != 0])
+    reference = np.median(nonzero) if nonzero.size else 1.0
+    return _normalize(np.sign(V) * np.log1p(np.abs(V) / reference), signed=True)
+
+
+def _normalize(values: npt.NDArray[np.float64], signed: bool) -> npt.NDArray[np.float64]:
+    finite = values[np.isfinite(values)]
+    if not finite.size:
+        return np.zeros(values.shape)
+    if signed:
+        hi = np.percentile(np.abs(finite), CLIP_PERCENTILES[1]) or 1.0
+        lo = -hi
+    else:
+        lo, hi = np.percentile(finite, CLIP_PERCENTILES)
+        if hi <= lo:
+            hi = lo + 1
+    values = np.nan_to_num(values, nan=lo, neginf=lo, posinf=hi)
+    return np.clip((values - lo) / (hi - lo), 0, 1)
+
+
+def resample(
+    values: npt.NDArray[np.float64], height: int, width: int
+) -> npt.NDArray[np.float32]:
+    """
+    Bilinear resampling of ``values`` onto a ``height`` x ``width`` raster.
+    """
+    values = values.astype(np.float32)
+    rows = _interp_axis(values.shape[0], height)
+    cols = _interp_axis(values.shape[1], width)
+    r0, r1, wr = rows
+    values = values[r0] * (1 - wr)[:, None] + values[r1] * wr[:, None]
+    c0, c1, wc = cols
+    return values[:, c0] * (1 - wc) + values[:, c1] * wc
+
+
+def _interp_axis(size: int, target: int):
+    pos = np.linspace(0, size - 1, target, dtype=np.float32)
+    lo = np.minimum(pos.astype(np.intp), size - 2) if size > 1 else np.zeros(target, np.intp)
+    hi = np.minimum(lo + 1, size - 1)
+    return lo, hi, pos - lo
+
+
+def to_levels(values: npt.NDArray[np.float32]) -> npt.NDArray[np.uint8]:
+    return (values * (LEVELS - 1) + 0.5).astype(np.uint8)
+
+
+def draw_markers(index: npt.NDArray[np.uint8], field: FieldResult) -> None:
+    """
+    Paint the point charges of ``field`` into the palette image ``index``.
+    """
+    h, w = index.shape
+    x0, x1 = field.x[0, 0], field.x[0, -1]
+    y0, y1 = field.y[0, 0], field.y[-1, 0]
+    for xq, yq, q in field.config.charges:
+        cx = (xq - x0) / (x1 - x0) * (w - 1)
+        cy = (y1 - yq) / (y1 - y0) * (h - 1)
+        radius = 2 + 2 * np.sqrt(abs(q)) * min(w, h) / 500
+        top, bottom = max(int(cy - radius - 1), 0), min(int(cy + radius + 2), h)
+        left, right = max(int(cx - radius - 1), 0), min(int(cx + radius + 2), w)
+        if top >= bottom or left >= right:
+            continue
+        yy, xx = np.ogrid[top:bottom, left:right]
+        d2 = (xx - cx) ** 2 + (yy - cy) ** 2
+        patch = index[top:bottom, left:right]
+        patch[d2 <= (radius + 1) ** 2] = MARKER_EDGE
+        patch[d2 <= radius**2] = MARKER_FILL
+
+
+def encode_png(index: npt.NDArray[np.uint8], palette: npt.NDArray[np.uint8]) -> bytes:
+    """
+    Encode an 8-bit palette image as PNG without going through any imaging library.
+    """
+    h, w = index.shape
+    raw = np.zeros((h, w + 1), dtype=np.uint8)  # filter byte 0 starts every row
+    raw[:, 1:] = index
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 3, 0, 0, 0)),
+            _png_chunk(b"PLTE", palette.tobytes()),
+            _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), PNG_COMPRESSION)),
+            _png_chunk(b"IEND", b""),
+        )
+    )
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
+
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .api import FieldAPI
+from .bench import APP_FILE
+from .monitor import monitor
+from .tracing import tracer
+
+if TYPE_CHECKING:
+    from shiny import App
+
+
+class WithRoutes:
+    """
+    ``app`` with extra Starlette ``routes`` in front of it. Requests that match
+    none of them, and the lifespan events, go to ``app`` unchanged, so the Shiny
+    app needs no hook for serving them.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence[BaseRoute]) -> None:
+        self.app = app
+        self.routes = list(routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            for route in self.routes:
+                match, child_scope = route.matches(scope)
+                if match == Match.FULL:
+                    await route.handle({**scope, **child_scope}, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+def create_app(app_file: Path = APP_FILE) -> WithRoutes:
+    """
+    The express app in ``app_file`` together with the field API, and the
+    tracing and loop-monitor endpoints when those are enabled.
+    """
+    from shiny.express._run import wrap_express_app
+
+    routes: list[BaseRoute] = [*FieldAPI().routes()]
+    if tracer.enabled:
+        routes += tracer.routes()
+    if monitor.enabled:
+        routes += monitor.routes()
+    shiny_app: App = wrap_express_app(app_file)
+    return WithRoutes(shiny_app, routes)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+
+from .conductors import image_charges
+from .dynamics import TREE_THRESHOLD, direct_forces, tree_forces
+from .engine import field_at
+from .kernel import superpose
+
+if TYPE_CHECKING:
+    from .charges import Config
+
+
+@dataclass
+class Summary:
+    """
+    Forces and energies of the point charges of a configuration.
+
+    ``forces`` is ``(N, 2)`` and ``energies`` holds each charge's potential
+    energy in the field of everything else. ``quadrupole`` is
+    ``(Qxx, Qyy, Qxy)`` of the traceless moment taken about the origin, as is
+    ``dipole``.
+    """
+
+    charges: npt.NDArray[np.float64]
+    forces: npt.NDArray[np.float64]
+    energies: npt.NDArray[np.float64]
+    total_energy: float
+    dipole: npt.NDArray[np.float64]
+    quadrupole: npt.NDArray[np.float64]
+
+
+def summarize(config: Config, tree_threshold: int = TREE_THRESHOLD) -> Summary:
+    """
+    Compute the :class:`Summary` of ``config``.
+
+    Interactions between the point charges are summed pairwise, or with the
+    Barnes-Hut tree from ``tree_threshold`` charges on. Image charges and
+    continuous distributions act as external sources; the total energy leaves
+    out the self-energy of the distributions. Multipole moments include the
+    distributions through their point-charge nodes.
+    """
+    charges = config.charges
+    pos, q = charges[:, :2], charges[:, 2]
+    if len(charges) >= tree_threshold:
+        forces, potential = tree_forces(pos, q, softening=0.0)
+    else:
+        forces, potential = direct_forces(pos, q, softening=0.0)
+
+    x, y = pos[:, 0], pos[:, 1]
+    # The energy of charges next to grounded conductors is half their
+    # interaction with the images, as the induced charge scales with them.
+    images = image_charges(charges, config.conductors)[len(charges) :]
+    Ex, Ey, V_images = superpose(images, x, y)
+    forces = forces + q[:, None] * np.column_stack((Ex, Ey))
+    Ex, Ey, V_external = field_at(replace(config, charges=np.empty((0, 3))), x, y)
+    forces += q[:, None] * np.column_stack((Ex, Ey))
+
+    energies = q * (potential + V_images + V_external)
+    total_energy = float((q * (0.5 * potential + 0.5 * V_images + V_external)).sum())
+
+    sources = np.concatenate([charges, *(d.nodes() for d in config.distributions)])
+    sx, sy, sq = sources[:, 0], sources[:, 1], sources[:, 2]
+    dipole = np.array([(sq * sx).sum(), (sq * sy).sum()])
+    quadrupole = np.array(
+        [
+            (sq * (2 * sx * sx - sy * sy)).sum(),
+            (sq * (2 * sy * sy - sx * sx)).sum(),
+            (3 * sq * sx * sy).sum(),
+        ]
+    )
+    return Summary(charges, forces, energies, total_energy, dipole, quadrupole)
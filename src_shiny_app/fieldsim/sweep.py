@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import struct
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Callable, Iterable, Iterator, Literal, Optional
+
+import numpy as np
+import numpy.typing as npt
+from matplotlib.figure import Figure
+
+from .charges import Config
+from .conductors import image_charges
+from .engine import FieldResult, field_at, make_grid
+from .kernel import superpose
+from .plotting import draw_field
+
+Parameter = Literal["x", "y", "q"]
+FrameFormat = Literal["gif", "png"]
+
+PARAMETERS: dict[str, int] = {"x": 0, "y": 1, "q": 2}
+MAX_FRAMES = 200
+FRAME_DPI = 80
+# Seconds per frame of the animation.
+FRAME_DELAY = 0.1
+GIF_TRAILER = b"\x3b"
+# Frames being rendered or waiting to be consumed, per worker process.
+FRAMES_IN_FLIGHT = 2
+# Worker processes of the pool that all of the app's downloads share.
+SWEEP_WORKERS = min(4, os.cpu_count() or 1)
+# Pyodide cannot start processes, so there frames are rendered inline.
+INLINE = sys.platform == "emscripten"
+
+
+@dataclass(frozen=True)
+class Sweep:
+    """
+    Charge ``index`` of ``config`` with ``parameter`` going linearly from
+    ``start`` to ``end`` over ``frames`` frames.
+    """
+
+    config: Config
+    index: int
+    parameter: Parameter
+    start: float
+    end: float
+    frames: int
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.index < len(self.config.charges):
+            raise ValueError("Нет заряда с таким номером.")
+        if self.parameter not in PARAMETERS:
+            raise ValueError("Изменять можно только x, y или заряд.")
+        if not 2 <= self.frames <= MAX_FRAMES:
+            raise ValueError(f"Число кадров должно быть от 2 до {MAX_FRAMES}.")
+
+    def values(self) -> npt.NDArray[np.float64]:
+        return np.linspace(self.start, self.end, self.frames)
+
+    def moving(self, k: int) -> npt.NDArray[np.float64]:
+        charge = self.config.charges[self.index].copy()
+        charge[PARAMETERS[self.parameter]] = self.values()[k]
+        return charge
+
+    def frame_config(self, k: int) -> Config:
+        charges = self.config.charges.copy()
+        charges[self.index] = self.moving(k)
+        return replace(self.config, charges=charges)
+
+    def grid(self) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        # One grid for the whole animation, covering both ends of the path.
+        ends = np.array([self.moving(0), self.moving(self.frames - 1)])
+        return make_grid(replace(self.config, charges=np.vstack((self.config.charges, ends))))
+
+
+class SweepRenderer:
+    """
+    Draws the frames of a :class:`Sweep`.
+
+    The field of everything but the moving charge is computed once; each frame
+    adds the moving charge and its images on top.
+    """
+
+    def __init__(self, sweep: Sweep, fmt: FrameFormat = "gif", dpi: int = FRAME_DPI) -> None:
+        self.sweep = sweep
+        self.fmt = fmt
+        self.dpi = dpi
+        self.x, self.y = sweep.grid()
+        fixed = np.delete(sweep.config.charges, sweep.index, axis=0)
+        self.fixed = field_at(replace(sweep.config, charges=fixed), self.x, self.y)
+        self.inside = np.zeros(self.x.shape, dtype=bool)
+        for conductor in sweep.config.conductors:
+            self.inside |= conductor.contains(self.x, self.y)
+
+    def field(self, k: int) -> FieldResult:
+        moving = self.sweep.moving(k)[None, :]
+        Ex, Ey, V = superpose(image_charges(moving, self.sweep.config.conductors), self.x, self.y)
+        Ex, Ey, V = (a + b for a, b in zip(self.fixed, (Ex, Ey, V)))
+        Ex[self.inside] = Ey[self.inside] = V[self.inside] = 0.0
+        return FieldResult(self.x, self.y, Ex, Ey, V, self.sweep.frame_config(k))
+
+    def render(self, k: int) -> bytes:
+        """
+        Frame ``k`` as a PNG, or as a single-frame GIF for :func:`gif_stream`.
+        """
+        fig = Figure()
+        ax = fig.add_subplot()
+        draw_field(ax, self.field(k))
+        ax.set_title("{} = {:.3g}".format(self.sweep.parameter, self.sweep.values()[k]))
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=self.dpi)
+        if self.fmt == "png":
+            return buffer.getvalue()
+
+        from PIL import Image
+
+        buffer.seek(0)
+        image = Image.open(buffer).convert("RGB").quantize(256, dither=Image.Dither.NONE)
+        out = io.BytesIO()
+        image.save(out, format="GIF")
+        return out.getvalue()
+
+
+_worker: Optional[SweepRenderer] = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _init_worker(renderer: SweepRenderer) -> None:
+    global _worker
+    _worker = renderer
+
+
+def _render_frame(k: int, renderer: Optional[SweepRenderer] = None) -> bytes:
+    renderer = renderer or _worker
+    assert renderer is not None
+    return renderer.render(k)
+
+
+def _shared_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(SWEEP_WORKERS)
+    return _pool
+
+
+def _submit_frames(
+    submit: Callable[[int], Future[bytes]], frames: int, window: int
+) -> Iterator[Future[bytes]]:
+    # Only ``window`` frames are ever pending, so finished frames never pile up
+    # in memory while the consumer is slow. Closing the iterator cancels the
+    # frames that have not started yet.
+    pending: deque[Future[bytes]] = deque()
+    try:
+        for k in range(frames):
+            pending.append(submit(k))
+            if len(pending) >= window:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_frames(
+    sweep: Sweep, fmt: FrameFormat = "gif", dpi: int = FRAME_DPI, workers: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Render the frames of ``sweep`` in order with a process pool of its own
+    (inline under Pyodide, which cannot start processes).
+    """
+    renderer = SweepRenderer(sweep, fmt, dpi)
+    if INLINE:
+        for k in range(sweep.frames):
+            yield renderer.render(k)
+        return
+    workers = workers or os.cpu_count() or 1
+    # The workers get the renderer, and the field it has computed, once.
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(renderer,)) as pool:
+        futures = _submit_frames(
+            lambda k: pool.submit(_render_frame, k), sweep.frames, FRAMES_IN_FLIGHT * workers
+        )
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            futures.close()
+
+
+async def aiter_frames(
+    sweep: Sweep, fmt: FrameFormat = "gif", dpi: int = FRAME_DPI
+) -> AsyncIterator[bytes]:
+    """
+    :func:`iter_frames` for the event loop: waiting for a frame never blocks it.
+
+    The frames are rendered in a pool of :data:`SWEEP_WORKERS` processes that
+    all callers share, so concurrent downloads queue for it instead of each
+    starting processes. Stopping early, e.g. on cancellation, drops the frames
+    that have not started without waiting for the others.
+    """
+    if INLINE:
+        for frame in iter_frames(sweep, fmt, dpi):
+            yield frame
+        return
+    renderer = await asyncio.to_thread(SweepRenderer, sweep, fmt, dpi)
+    pool = _shared_pool()
+    futures = _submit_frames(
+        lambda k: pool.submit(_render_frame, k, renderer),
+        sweep.frames,
+        FRAMES_IN_FLIGHT * SWEEP_WORKERS,
+    )
+    try:
+        for future in futures:
+            yield await asyncio.wrap_future(future)
+    except BrokenProcessPool:
+        # A worker died; the next download starts a new pool.
+        global _pool
+        if _pool is pool:
+            _pool = None
+        raise
+    finally:
+        futures.close()
+
+
+def gif_stream(frames: Iterable[bytes], delay: float = FRAME_DELAY) -> Iterator[bytes]:
+    """
+    Join single-frame GIFs into a looping animation, one chunk per frame.
+    """
+    for k, data in enumerate(frames):
+        yield gif_frame(data, delay, first=k == 0)
+    yield GIF_TRAILER
+
+
+def gif_frame(data: bytes, delay: float = FRAME_DELAY, first: bool = False) -> bytes:
+    """
+    The animation chunk for one single-frame GIF; the first frame also carries
+    the file header. The stream ends with :data:`GIF_TRAILER`.
+
+    Each frame keeps its own palette as a local color table, so frames can be
+    written as they arrive without holding the others in memory.
+    """
+    screen, table, image = _split_gif(data)
+    chunk = b""
+    if first:
+        # Logical screen without a global color table, then loop forever.
+        chunk += b"GIF89a" + screen[:4] + bytes([screen[4] & 0x70]) + screen[5:]
+        chunk += b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00"
+    size = (len(table) // 3).bit_length() - 2
+    control = struct.pack("<4BH2B", 0x21, 0xF9, 4, 0x04, round(delay * 100), 0, 0)
+    # Keep the interlace flag, replace the color table bits.
+    descriptor = image[:8] + bytes([0x80 | (image[8] & 0x40) | size])
+    return chunk + control + b"\x2c" + descriptor + table + image[9:]
+
+
+def _split_gif(data: bytes) -> tuple[bytes, bytes, bytes]:
+    """
+    Logical screen descriptor, color table and first image (descriptor after the
+    ``0x2c`` separator, then its data) of a GIF file.
+    """
+    screen = data[6:13]
+    pos = 13
+    table = b""
+    if screen[4] & 0x80:
+        table_size = 3 << ((screen[4] & 0x07) + 1)
+        table = data[pos : pos + table_size]
+        pos += table_size
+    while data[pos] == 0x21:
+        # Skip extension blocks: label, then sub-blocks up to a zero length.
+        pos += 2
+        while data[pos]:
+            pos += data[pos] + 1
+        pos += 1
+    if data[pos] != 0x2C:
+        raise ValueError("unexpected GIF block {:#x}".format(data[pos]))
+    start = pos + 1
+    packed = data[start + 8]
+    pos = start + 9
+    if packed & 0x80:
+        # A local table takes precedence over the global one.
+        table_size = 3 << ((packed & 0x07) + 1)
+        table = data[pos : pos + table_size]
+        pos += table_size
+    image_start = pos
+    pos += 1  # LZW minimum code size
+    while data[pos]:
+        pos += data[pos] + 1
+    pos += 1
+    return screen, table, data[start : start + 9] + data[image_start:pos]
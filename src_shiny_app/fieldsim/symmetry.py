@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import numpy.typing as npt
+
+from .kernel import superpose
+
+# Relative tolerance used when matching charges against their transformed copies.
+SYMMETRY_TOL = 1e-9
+# Below this many charges the bookkeeping costs more than the saved work.
+SYMMETRY_MIN_CHARGES = 4
+
+IndexMap = Callable[
+    [npt.NDArray[np.intp], npt.NDArray[np.intp], int, int],
+    tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]],
+]
+
+
+@dataclass(frozen=True)
+class Symmetry:
+    """
+    A point-group operation about the grid centre.
+
+    ``matrix`` acts on positions relative to the centre and on field vectors;
+    ``index_map(j, i, m, n)`` is the same operation on ``(row, column)`` grid
+    indices of an ``(m, n)`` grid. ``square`` operations only map the grid onto
+    itself when it is square.
+    """
+
+    name: str
+    matrix: tuple[tuple[int, int], tuple[int, int]]
+    index_map: IndexMap
+    square: bool = False
+
+
+# (j, i) are (row, column) indices; m == n is guaranteed for the square ones.
+SYMMETRIES: tuple[Symmetry, ...] = (
+    Symmetry("mirror_x", ((-1, 0), (0, 1)), lambda j, i, m, n: (j, n - 1 - i)),
+    Symmetry("mirror_y", ((1, 0), (0, -1)), lambda j, i, m, n: (m - 1 - j, i)),
+    Symmetry("rot180", ((-1, 0), (0, -1)), lambda j, i, m, n: (m - 1 - j, n - 1 - i)),
+    Symmetry("rot90", ((0, -1), (1, 0)), lambda j, i, m, n: (i, n - 1 - j), square=True),
+    Symmetry("rot270", ((0, 1), (-1, 0)), lambda j, i, m, n: (n - 1 - i, j), square=True),
+    Symmetry("diagonal", ((0, 1), (1, 0)), lambda j, i, m, n: (i, j), square=True),
+    Symmetry(
+        "antidiagonal",
+        ((0, -1), (-1, 0)),
+        lambda j, i, m, n: (n - 1 - i, n - 1 - j),
+        square=True,
+    ),
+)
+
+
+def detect_symmetries(
+    charges: npt.NDArray[np.float64],
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+) -> list[tuple[Symmetry, int]]:
+    """
+    Return the operations in :data:`SYMMETRIES` that leave the ``meshgrid``
+    ``(x, y)`` invariant and map the charges onto themselves, each paired with
+    its parity: ``1`` if charges keep their sign, ``-1`` if every charge lands
+    on one of opposite sign (as in a dipole).
+    """
+    cx = (x[0, 0] + x[0, -1]) / 2
+    cy = (y[0, 0] + y[-1, 0]) / 2
+    width = x[0, -1] - x[0, 0]
+    height = y[-1, 0] - y[0, 0]
+    # Positions and charges are compared relative to their own scales, so that
+    # SI-scale charges (~1e-9 C) are not all equal to within the tolerance.
+    scale = np.array([max(width, height), max(width, height), np.abs(charges[:, 2]).max()])
+    scale[scale == 0] = 1.0
+    square = x.shape[0] == x.shape[1] and np.isclose(width, height, rtol=SYMMETRY_TOL)
+
+    rel = charges[:, :2] - (cx, cy)
+    reference = _canonical(charges, scale)
+    found = []
+    for symmetry in SYMMETRIES:
+        if symmetry.square and not square:
+            continue
+        moved = charges.copy()
+        moved[:, :2] = rel @ np.array(symmetry.matrix, dtype=np.float64).T + (cx, cy)
+        for parity in (1, -1):
+            moved[:, 2] = parity * charges[:, 2]
+            if np.allclose(
+                _canonical(moved, scale), reference, rtol=0, atol=SYMMETRY_TOL
+            ):
+                found.append((symmetry, parity))
+                break
+    return found
+
+
+def symmetric_superpose(
+    charges: npt.NDArray[np.float64],
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Same result as :func:`~fieldsim.kernel.superpose` on a ``meshgrid``, but
+    only the fundamental domain of the detected symmetry group is computed.
+
+    The rest of the grid is filled in by applying each operation to the
+    representatives, rotating or reflecting the field vectors with it (and
+    flipping their sign for odd parity). Falls back to a plain superposition
+    when no symmetry is found or there are too few charges for it to pay off.
+    """
+    if len(charges) < SYMMETRY_MIN_CHARGES:
+        return superpose(charges, x, y)
+    symmetries = detect_symmetries(charges, x, y)
+    if not symmetries:
+        return superpose(charges, x, y)
+
+    m, n = x.shape
+    j, i = np.indices((m, n))
+    flat = j * n + i
+    orbit_min = flat.copy()
+    targets = [flat]
+    for symmetry, _ in symmetries:
+        jj, ii = symmetry.index_map(j, i, m, n)
+        image = jj * n + ii
+        targets.append(image)
+        np.minimum(orbit_min, image, out=orbit_min)
+
+    # A point represents its orbit when it has the smallest index in it.
+    is_rep = (orbit_min == flat).ravel()
+    ex, ey, v = superpose(charges, x.ravel()[is_rep], y.ravel()[is_rep])
+
+    Ex = np.empty(m * n)
+    Ey = np.empty(m * n)
+    V = np.empty(m * n)
+    operations = [(((1, 0), (0, 1)), 1)] + [(s.matrix, p) for s, p in symmetries]
+    for target, (((a, b), (c, d)), parity) in zip(targets, operations):
+        dest = target.ravel()[is_rep]
+        Ex[dest] = parity * (a * ex + b * ey)
+        Ey[dest] = parity * (c * ex + d * ey)
+        V[dest] = parity * v
+    return Ex.reshape(m, n), Ey.reshape(m, n), V.reshape(m, n)
+
+
+def _canonical(
+    charges: npt.NDArray[np.float64], scale: npt.NDArray[np.float64]
+) -> npt.NDArray[np.float64]:
+    rows = np.round(charges / scale / SYMMETRY_TOL) * SYMMETRY_TOL
+    return rows[np.lexsort(rows.T[::-1])]
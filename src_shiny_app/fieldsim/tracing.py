@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, ContextManager, Iterator, TypeVar
+
+if TYPE_CHECKING:
+    from starlette.routing import Route
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Setting this environment variable to 1 turns instrumentation on for the app.
+TRACE_ENV = "FIELDSIM_TRACE"
+# Most recent spans kept for the trace-event export.
+TRACE_CAPACITY = 10_000
+# Upper bounds, in seconds, of the histogram buckets.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_SPAN = nullcontext()
+
+
+@dataclass
+class Histogram:
+    """
+    Durations of one stage, in seconds, counted per bucket of :data:`BUCKETS`;
+    the last count is for durations above them all.
+    """
+
+    counts: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    total: float = 0.0
+    errors: int = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, args: dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        end = time.perf_counter_ns()
+        self.tracer.record(self.name, self.start, end, self.args, exc is not None)
+
+
+class Tracer:
+    """
+    Timing spans of the stages a field goes through on its way to the browser:
+    ``parse``, ``compute``, ``trace`` (field lines), ``encode`` and ``send``.
+
+    Spans are kept in a ring buffer of ``capacity`` for :meth:`chrome_trace`
+    and summed into per-stage histograms for :meth:`prometheus`. While the
+    tracer is disabled :meth:`span` hands out a shared no-op context manager,
+    so instrumented code costs one attribute check.
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = TRACE_CAPACITY) -> None:
+        self.enabled = enabled
+        self._events: deque[tuple[str, int, int, int, dict[str, Any]]] = deque(maxlen=capacity)
+        self._histograms: dict[str, Histogram] = {}
+        # Spans end on worker threads as well as on the event loop.
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name: str, **args: Any) -> ContextManager[None]:
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def timed(self, name: str) -> Callable[[F], F]:
+        """
+        Decorator running each call of a function in a span called ``name``.
+        """
+
+        def decorator(fn: F) -> F:
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return fn(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def record(
+        self, name: str, start: int, end: int, args: dict[str, Any], failed: bool = False
+    ) -> None:
+        with self._lock:
+            self._events.append((name, start, end, threading.get_native_id(), args))
+            histogram = self._histograms.setdefault(name, Histogram())
+            histogram.observe((end - start) / 1e9)
+            histogram.errors += failed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self._histograms.clear()
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """
+        The recorded spans as Chrome trace events, for ``chrome://tracing`` or
+        Perfetto.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "cat": "fieldsim",
+                    "ph": "X",
+                    "ts": (start - self._origin) / 1e3,
+                    "dur": (end - start) / 1e3,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+                for name, start, end, tid, args in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def prometheus(self) -> str:
+        """
+        Per-stage histograms and error counters in the Prometheus text format.
+        """
+        with self._lock:
+            histograms = {
+                name: (list(h.counts), h.total, h.errors) for name, h in self._histograms.items()
+            }
+        return "".join(_prometheus_lines(histograms))
+
+    def routes(self, path: str = "/debug") -> list[Route]:
+        """
+        ``<path>/trace.json`` and ``<path>/metrics`` serving the two exports.
+        """
+        # Imported here so that instrumented modules do not depend on Starlette.
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse, PlainTextResponse, Response
+        from starlette.routing import Route
+
+        async def trace(request: Request) -> Response:
+            return JSONResponse(self.chrome_trace())
+
+        async def metrics(request: Request) -> Response:
+            return PlainTextResponse(self.prometheus(), media_type="text/plain; version=0.0.4")
+
+        return [Route(path + "/trace.json", trace), Route(path + "/metrics", metrics)]
+
+
+def _prometheus_lines(histograms: dict[str, tuple[list[int], float, int]]) -> Iterator[str]:
+    yield "# HELP fieldsim_stage_seconds Time spent in each stage of showing a field.\n"
+    yield "# TYPE fieldsim_stage_seconds histogram\n"
+    for name, (counts, total, _) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip((*BUCKETS, "+Inf"), counts):
+            cumulative += count
+            yield 'fieldsim_stage_seconds_bucket{{stage="{}",le="{}"}} {}\n'.format(
+                name, bound, cumulative
+            )
+        yield 'fieldsim_stage_seconds_sum{{stage="{}"}} {!r}\n'.format(name, total)
+        yield 'fieldsim_stage_seconds_count{{stage="{}"}} {}\n'.format(name, cumulative)
+    yield "# HELP fieldsim_stage_errors_total Stages that ended with an exception.\n"
+    yield "# TYPE fieldsim_stage_errors_total counter\n"
+    for name, (_, _, errors) in sorted(histograms.items()):
+        yield 'fieldsim_stage_errors_total{{stage="{}"}} {}\n'.format(name, errors)
+
+
+tracer = Tracer(enabled=os.environ.get(TRACE_ENV) == "1")
+span = tracer.span
+timed = tracer.timed
+
+
+def instrument_shiny(tracer: Tracer = tracer) -> None:
+    """
+    Add ``encode`` spans around Shiny's matplotlib rendering (``savefig`` and
+    base64) and ``send`` spans around serializing and sending each message to
+    the browser. Only call this when tracing, so the disabled path stays
+    untouched; calling it again does nothing.
+    """
+    from shiny.render import _render
+    from shiny.session._session import AppSession
+
+    if getattr(AppSession._send_message, "_fieldsim_traced", False):
+        return
+    render_matplotlib = _render.try_render_matplotlib
+    send_message = AppSession._send_message
+
+    @functools.wraps(render_matplotlib)
+    def try_render_matplotlib(*args: Any, **kwargs: Any) -> Any:
+        with tracer.span("encode", output="plot"):
+            return render_matplotlib(*args, **kwargs)
+
+    @functools.wraps(send_message)
+    async def _send_message(self: AppSession, message: dict[str, object]) -> None:
+        with tracer.span("send", kind=next(iter(message), "")):
+            await send_message(self, message)
+
+    _send_message._fieldsim_traced = True  # type: ignore[attr-defined]
+    _render.try_render_matplotlib = try_render_matplotlib
+    AppSession._send_message = _send_message  # type: ignore[method-assign]
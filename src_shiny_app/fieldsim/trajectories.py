@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from .charges import Config
+from .conductors import image_charges
+from .engine import FieldResult, field_at, make_grid
+
+# Status codes in Trajectories.status.
+RUNNING = 0
+COLLIDED = 1
+ESCAPED = 2
+
+MAX_STEPS = 2000
+ETA = 0.05
+COLLISION_RADIUS = 0.05
+# Particles escape once they are this many plot widths away from the plot and
+# still moving outwards.
+ESCAPE_DISTANCE = 2.0
+# Largest relative error accepted from bilinear interpolation of a cached grid.
+INTERP_TOL = 1e-2
+# Cells within this many cell sizes of a source always use direct evaluation:
+# the grid is too coarse there to estimate its own curvature.
+INTERP_MARGIN = 2
+
+
+@dataclass
+class Trajectories:
+    """
+    Recorded paths of a batch of test particles.
+
+    ``paths`` is ``(S, P, 2)``; a particle's position stays frozen once it has
+    collided or escaped. ``status`` holds :data:`RUNNING`, :data:`COLLIDED` or
+    :data:`ESCAPED` per particle.
+    """
+
+    t: npt.NDArray[np.float64]
+    paths: npt.NDArray[np.float64]
+    status: npt.NDArray[np.int8]
+    state: npt.NDArray[np.float64]
+
+
+class GridField:
+    """
+    Bilinear interpolation of a cached :class:`~fieldsim.engine.FieldResult`.
+
+    Cells where the interpolated field may be off by more than ``tol`` relative
+    to its magnitude are flagged once, up front, so that particles there fall
+    back to a direct evaluation. Bilinear interpolation errs by at most
+    ``(dx**2 |E_xx| + dy**2 |E_yy|) / 8`` within a cell, which is checked
+    against the smallest field at its corners, with both terms estimated by
+    the second differences of the grid at the corners. Cells within
+    :data:`INTERP_MARGIN` cells of a source, where those differences are no
+    estimate, are always flagged.
+    """
+
+    def __init__(self, field: FieldResult, tol: float = INTERP_TOL) -> None:
+        self.field = field
+        self.x0 = field.x[0, 0]
+        self.y0 = field.y[0, 0]
+        self.dx = field.x[0, 1] - self.x0
+        self.dy = field.y[1, 0] - self.y0
+        E = np.stack((field.Ex, field.Ey), axis=-1)
+        # The outermost rows and columns take the differences next to them.
+        exx = np.linalg.norm(E[:, 2:] - 2 * E[:, 1:-1] + E[:, :-2], axis=-1)
+        eyy = np.linalg.norm(E[2:] - 2 * E[1:-1] + E[:-2], axis=-1)
+        curvature = np.pad(exx, ((0, 0), (1, 1)), mode="edge") + np.pad(
+            eyy, ((1, 1), (0, 0)), mode="edge"
+        )
+        magnitude = np.linalg.norm(E, axis=-1)
+        error = _corners(curvature, np.maximum) / 8
+        size = _corners(magnitude, np.minimum)
+
+        h = max(self.dx, self.dy)
+        radius = (INTERP_MARGIN + 1) * h
+        sources = _sources(field.config)
+        near = np.zeros(field.x.shape, dtype=bool)
+        for start in range(0, len(sources), 256):
+            chunk = sources[start : start + 256]
+            d2 = (field.x[..., None] - chunk[:, 0]) ** 2 + (field.y[..., None] - chunk[:, 1]) ** 2
+            near |= (d2 < radius**2).any(axis=-1)
+        # Cells, (m - 1, n - 1).
+        self.accurate = (error <= tol * size) & ~_corners(near, np.logical_or)
+
+    def lookup(
+        self, x: npt.NDArray[np.float64], y: npt.NDArray[np.float64]
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.bool_]]:
+        """
+        Interpolated ``(Ex, Ey)`` and the mask of points where they can be used.
+        """
+        m, n = self.field.x.shape
+        gc = (x - self.x0) / self.dx
+        gr = (y - self.y0) / self.dy
+        inside = (gc >= 0) & (gc <= n - 1) & (gr >= 0) & (gr <= m - 1)
+        c0 = np.clip(np.floor(gc).astype(np.intp), 0, n - 2)
+        r0 = np.clip(np.floor(gr).astype(np.intp), 0, m - 2)
+        tc = np.clip(gc - c0, 0, 1)
+        tr = np.clip(gr - r0, 0, 1)
+
+        def lerp(a: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+            return (a[r0, c0] * (1 - tc) + a[r0, c0 + 1] * tc) * (1 - tr) + (
+                a[r0 + 1, c0] * (1 - tc) + a[r0 + 1, c0 + 1] * tc
+            ) * tr
+
+        usable = inside & self.accurate[r0, c0]
+        return lerp(self.field.Ex), lerp(self.field.Ey), usable
+
+
+def _corners(a: npt.NDArray, op: np.ufunc) -> npt.NDArray:
+    """``op`` reduced over the four corners of every cell of the grid ``a``."""
+    return op(op(a[:-1, :-1], a[:-1, 1:]), op(a[1:, :-1], a[1:, 1:]))
+
+
+def _sources(config: Config) -> npt.NDArray[np.float64]:
+    parts = [image_charges(config.charges, config.conductors)]
+    parts += [d.nodes() for d in config.distributions]
+    return np.concatenate(parts)
+
+
+def launch_fan(
+    x: float, y: float, speed: float, count: int, spread: float = 360.0, heading: float = 0.0
+) -> npt.NDArray[np.float64]:
+    """
+    ``(count, 4)`` launch states from one point, with directions spread evenly
+    over ``spread`` degrees around ``heading``.
+    """
+    if spread >= 360:
+        angles = heading + np.arange(count) * 360.0 / count
+    else:
+        angles = heading + np.linspace(-spread / 2, spread / 2, count)
+    rad = np.radians(angles)
+    return np.column_stack(
+        (np.full(count, x), np.full(count, y), speed * np.cos(rad), speed * np.sin(rad))
+    )
+
+
+def trace(
+    config: Config,
+    state: npt.NDArray[np.float64],
+    q: float = 1.0,
+    m: float = 1.0,
+    *,
+    field: Optional[FieldResult] = None,
+    max_steps: int = MAX_STEPS,
+    duration: Optional[float] = None,
+    eta: float = ETA,
+    collision_radius: float = COLLISION_RADIUS,
+    record_every: int = 1,
+) -> Trajectories:
+    """
+    Integrate test particles through the static field of ``config``.
+
+    Parameters
+    ----------
+    config
+        The charges whose field the particles move in; the particles do not act
+        on each other or on the charges.
+    state
+        ``(P, 4)`` array of ``(x, y, vx, vy)`` launch conditions.
+    q, m
+        Charge and mass of every test particle.
+    field
+        A cached grid field of ``config``. Where its interpolation is accurate
+        enough it is used instead of evaluating the field directly.
+    max_steps, duration
+        Stop after this many steps or this much simulated time.
+    eta
+        Accuracy parameter of the adaptive (shared) time step.
+    collision_radius
+        Particles closer than this to a point charge, or inside a conductor,
+        stop as collided.
+    record_every
+        Record positions every this many steps.
+
+    Returns
+    -------
+    :
+        The recorded paths and the final state and status of every particle.
+
+    Each step is one velocity Verlet (kick-drift-kick) update with a single
+    vectorized field evaluation for all particles still in flight.
+    """
+    state = np.array(state, dtype=np.float64).reshape(-1, 4)
+    grid = GridField(field) if field is not None else None
+    charges = config.charges
+    x0, x1, y0, y1 = _plot_box(config, field)
+    size = max(x1 - x0, y1 - y0)
+    escape_box = (
+        x0 - ESCAPE_DISTANCE * size,
+        x1 + ESCAPE_DISTANCE * size,
+        y0 - ESCAPE_DISTANCE * size,
+        y1 + ESCAPE_DISTANCE * size,
+    )
+    center = ((x0 + x1) / 2, (y0 + y1) / 2)
+
+    status = np.full(len(state), RUNNING, dtype=np.int8)
+
+    def accelerate(pos: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        x, y = pos[:, 0], pos[:, 1]
+        if grid is None:
+            Ex, Ey, _ = field_at(config, x, y)
+        else:
+            Ex, Ey, usable = grid.lookup(x, y)
+            direct = ~usable
+            if direct.any():
+                Ex[direct], Ey[direct], _ = field_at(config, x[direct], y[direct])
+        return q / m * np.column_stack((Ex, Ey))
+
+    # Particles still in flight are kept compacted in pos/vel/acc; ``active``
+    # maps them back to rows of ``state``.
+    active = np.arange(len(state))
+    pos = state[:, :2].copy()
+    vel = state[:, 2:].copy()
+    acc = accelerate(pos)
+    t = 0.0
+    times = [t]
+    paths = [state[:, :2].copy()]
+    for step in range(1, max_steps + 1):
+        if not active.size or (duration is not None and t >= duration):
+            break
+        v = np.sqrt((vel**2).sum(axis=1).max())
+        a = np.sqrt((acc**2).sum(axis=1).max())
+        dt = eta * min(
+            collision_radius / v if v > 0 else np.inf,
+            np.sqrt(collision_radius / a) if a > 0 else np.inf,
+        )
+        if not np.isfinite(dt):
+            break
+        if duration is not None:
+            dt = min(dt, duration - t)
+
+        vel += 0.5 * dt * acc
+        pos += dt * vel
+        acc = accelerate(pos)
+        vel += 0.5 * dt * acc
+        t += dt
+
+        x, y = pos[:, 0], pos[:, 1]
+        collided = np.zeros(active.size, dtype=bool)
+        if len(charges):
+            d2 = (x[:, None] - charges[:, 0]) ** 2 + (y[:, None] - charges[:, 1]) ** 2
+            collided = (d2 < collision_radius**2).any(axis=1)
+        for conductor in config.conductors:
+            collided |= conductor.contains(x, y)
+        outside = (
+            (x < escape_box[0]) | (x > escape_box[1]) | (y < escape_box[2]) | (y > escape_box[3])
+        )
+        outward = (x - center[0]) * vel[:, 0] + (y - center[1]) * vel[:, 1] > 0
+        escaped = outside & outward & ~collided
+        stopped = collided | escaped
+
+        record = step % record_every == 0
+        if stopped.any() or record:
+            state[active, :2] = pos
+            state[active, 2:] = vel
+        if stopped.any():
+            status[active[collided]] = COLLIDED
+            status[active[escaped]] = ESCAPED
+            keep = ~stopped
+            active, pos, vel, acc = active[keep], pos[keep], vel[keep], acc[keep]
+        if record or not active.size:
+            times.append(t)
+            paths.append(state[:, :2].copy())
+
+    state[active, :2] = pos
+    state[active, 2:] = vel
+    return Trajectories(
+        t=np.array(times), paths=np.stack(paths), status=status, state=state
+    )
+
+
+def _plot_box(
+    config: Config, field: Optional[FieldResult]
+) -> tuple[float, float, float, float]:
+    x, y = make_grid(config) if field is None else (field.x, field.y)
+    return x[0, 0], x[0, -1], y[0, 0], y[-1, 0]
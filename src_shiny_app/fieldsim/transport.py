@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import base64
+import math
+from dataclasses import replace
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from .engine import FieldResult
+from .raster import PALETTES, scale_magnitude, scale_potential
+from .tracing import timed
+
+# Longest side, in grid points, of the arrays sent to the browser.
+FIELD_MAX_SIDE = 200
+
+
+def downsample(field: FieldResult, max_side: int = FIELD_MAX_SIDE) -> FieldResult:
+    """
+    Take every ``step``-th grid point so that neither side exceeds ``max_side``.
+    """
+    step = max(1, math.ceil(max(field.x.shape) / max_side))
+    if step == 1:
+        return field
+    s = (slice(None, None, step), slice(None, None, step))
+    return replace(
+        field, x=field.x[s], y=field.y[s], Ex=field.Ex[s], Ey=field.Ey[s], V=field.V[s]
+    )
+
+
+def quantize_float16(values: npt.NDArray[np.float64], scale: float) -> str:
+    """
+    ``values / scale`` as little-endian float16, base64 encoded.
+    """
+    limit = np.finfo(np.float16).max
+    data = np.clip(np.nan_to_num(values / scale), -limit, limit).astype("<f2")
+    return base64.b64encode(data.tobytes()).decode("ascii")
+
+
+def dequantize_float16(
+    data: str, scale: float, shape: tuple[int, ...]
+) -> npt.NDArray[np.float64]:
+    return np.frombuffer(base64.b64decode(data), dtype="<f2").astype(np.float64).reshape(
+        shape
+    ) * scale
+
+
+def quantize_uint16(values: npt.NDArray[np.float64]) -> str:
+    """
+    ``values`` in ``[0, 1]`` as little-endian uint16, base64 encoded.
+    """
+    data = (np.clip(values, 0, 1) * 65535 + 0.5).astype("<u2")
+    return base64.b64encode(data.tobytes()).decode("ascii")
+
+
+def dequantize_uint16(data: str, shape: tuple[int, ...]) -> npt.NDArray[np.float64]:
+    return np.frombuffer(base64.b64decode(data), dtype="<u2").reshape(shape) / 65535
+
+
+@timed("encode")
+def encode_field(field: FieldResult, max_side: int = FIELD_MAX_SIDE) -> dict[str, Any]:
+    """
+    Compact JSON payload the browser needs to draw ``field`` by itself.
+
+    ``Ex``/``Ey`` share one scale, the median ``|E|``, so directions survive
+    quantization and float16 covers about nine decades around typical values.
+    The magnitude and potential are sent already mapped onto ``[0, 1]`` colour
+    scales, together with the palettes to look them up in.
+    """
+    field = downsample(field, max_side)
+    magnitude = np.hypot(field.Ex, field.Ey)
+    nonzero = magnitude[magnitude > 0]
+    scale = float(np.median(nonzero)) if nonzero.size else 1.0
+    return {
+        "shape": list(field.x.shape),
+        "extent": [
+            float(field.x[0, 0]),
+            float(field.x[0, -1]),
+            float(field.y[0, 0]),
+            float(field.y[-1, 0]),
+        ],
+        "scale": scale,
+        "ex": quantize_float16(field.Ex, scale),
+        "ey": quantize_float16(field.Ey, scale),
+        "magnitude": quantize_uint16(scale_magnitude(field)),
+        "potential": quantize_uint16(scale_potential(field)),
+        "palettes": {
+            name: base64.b64encode(palette.tobytes()).decode("ascii")
+            for name, palette in PALETTES.items()
+        },
+        "charges": field.config.charges.tolist(),
+    }
@@ -0,0 +1,269 @@
+// Output binding for fieldsim.output.field_canvas: draws the field sent by the
+// server on a <canvas>. Resizing and switching what is shown happen here only.
+(function () {
+  "use strict";
+
+  function decodeBase64(data) {
+    const binary = atob(data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return bytes;
+  }
+
+  function halfToFloat(h) {
+    const sign = h & 0x8000 ? -1 : 1;
+    const exp = (h >> 10) & 0x1f;
+    const frac = h & 0x3ff;
+    if (exp === 0) return sign * Math.pow(2, -14) * (frac / 1024);
+    if (exp === 0x1f) return frac ? NaN : sign * Infinity;
+    return sign * Math.pow(2, exp - 15) * (1 + frac / 1024);
+  }
+
+  function decodeFloat16(data) {
+    const bytes = decodeBase64(data);
+    const view = new DataView(bytes.buffer);
+    const out = new Float32Array(bytes.length / 2);
+    for (let i = 0; i < out.length; i++) out[i] = halfToFloat(view.getUint16(2 * i, true));
+    return out;
+  }
+
+  function decodeUint16(data) {
+    const bytes = decodeBase64(data);
+    const view = new DataView(bytes.buffer);
+    const out = new Uint16Array(bytes.length / 2);
+    for (let i = 0; i < out.length; i++) out[i] = view.getUint16(2 * i, true);
+    return out;
+  }
+
+  function decode(payload) {
+    const palettes = {};
+    for (const name in payload.palettes) palettes[name] = decodeBase64(payload.palettes[name]);
+    const [rows, cols] = payload.shape;
+    const [x0, x1, y0, y1] = payload.extent;
+    return {
+      rows: rows,
+      cols: cols,
+      extent: payload.extent,
+      dx: (x1 - x0) / (cols - 1),
+      dy: (y1 - y0) / (rows - 1),
+      ex: decodeFloat16(payload.ex),
+      ey: decodeFloat16(payload.ey),
+      magnitude: decodeUint16(payload.magnitude),
+      potential: decodeUint16(payload.potential),
+      palettes: palettes,
+      charges: payload.charges,
+    };
+  }
+
+  // The colormap is painted at grid resolution and scaled up by drawImage().
+  function colorLayer(field, quantity) {
+    const palette = field.palettes[quantity];
+    const values = field[quantity];
+    const levels = palette.length / 3 - 2;
+    const layer = document.createElement("canvas");
+    layer.width = field.cols;
+    layer.height = field.rows;
+    const ctx = layer.getContext("2d");
+    const image = ctx.createImageData(field.cols, field.rows);
+    for (let r = 0; r < field.rows; r++) {
+      // Grid row 0 is the bottom of the plot.
+      const src = (field.rows - 1 - r) * field.cols;
+      for (let c = 0; c < field.cols; c++) {
+        const level = Math.round((values[src + c] / 65535) * (levels - 1));
+        const o = 4 * (r * field.cols + c);
+        image.data[o] = palette[3 * level];
+        image.data[o + 1] = palette[3 * level + 1];
+        image.data[o + 2] = palette[3 * level + 2];
+        image.data[o + 3] = 255;
+      }
+    }
+    ctx.putImageData(image, 0, 0);
+    return layer;
+  }
+
+  // Unit field direction at fractional grid position (gc, gr), or null.
+  function direction(field, gc, gr) {
+    if (gc < 0 || gr < 0 || gc > field.cols - 1 || gr > field.rows - 1) return null;
+    const c0 = Math.min(Math.floor(gc), field.cols - 2);
+    const r0 = Math.min(Math.floor(gr), field.rows - 2);
+    const tc = gc - c0;
+    const tr = gr - r0;
+    const i = r0 * field.cols + c0;
+    const lerp = (a) =>
+      (a[i] * (1 - tc) + a[i + 1] * tc) * (1 - tr) +
+      (a[i + field.cols] * (1 - tc) + a[i + field.cols + 1] * tc) * tr;
+    // Grid units may differ along x and y.
+    const ex = lerp(field.ex) / field.dx;
+    const ey = lerp(field.ey) / field.dy;
+    const norm = Math.hypot(ex, ey);
+    return norm > 0 ? [ex / norm, ey / norm] : null;
+  }
+
+  // Evenly spaced streamlines: seeds on a coarse grid, integrated both ways with
+  // midpoint steps until they leave the grid or enter an already occupied cell.
+  function streamlines(field, spacing) {
+    const occRows = Math.ceil(field.rows / spacing);
+    const occCols = Math.ceil(field.cols / spacing);
+    const occupied = new Uint8Array(occRows * occCols);
+    const cell = (gc, gr) => Math.floor(gr / spacing) * occCols + Math.floor(gc / spacing);
+    const step = 0.4;
+    const maxSteps = 4 * (field.rows + field.cols);
+    const lines = [];
+
+    function trace(gc, gr, sign, own) {
+      const points = [];
+      for (let n = 0; n < maxSteps; n++) {
+        const d1 = direction(field, gc, gr);
+        if (!d1) break;
+        const d2 = direction(field, gc + 0.5 * sign * step * d1[0], gr + 0.5 * sign * step * d1[1]);
+        if (!d2) break;
+        gc += sign * step * d2[0];
+        gr += sign * step * d2[1];
+        if (gc < 0 || gr < 0 || gc > field.cols - 1 || gr > field.rows - 1) break;
+        const k = cell(gc, gr);
+        if (occupied[k] && !own.has(k)) break;
+        own.add(k);
+        points.push([gc, gr]);
+      }
+      return points;
+    }
+
+    for (let sr = spacing / 2; sr < field.rows; sr += spacing) {
+      for (let sc = spacing / 2; sc < field.cols; sc += spacing) {
+        if (occupied[cell(sc, sr)]) continue;
+        const own = new Set([cell(sc, sr)]);
+        const forward = trace(sc, sr, 1, own);
+        const backward = trace(sc, sr, -1, own);
+        own.forEach((k) => (occupied[k] = 1));
+        const line = backward.reverse().concat([[sc, sr]], forward);
+        if (line.length > 2) lines.push({ points: line, arrow: backward.length });
+      }
+    }
+    return lines;
+  }
+
+  function draw(el) {
+    const state = el._fieldsim;
+    if (!state || !state.field) return;
+    const field = state.field;
+    const canvas = state.canvas;
+    const ratio = window.devicePixelRatio || 1;
+    const width = el.clientWidth;
+    const height = el.clientHeight - state.toolbar.offsetHeight;
+    canvas.style.width = width + "px";
+    canvas.style.height = height + "px";
+    canvas.width = Math.max(1, Math.round(width * ratio));
+    canvas.height = Math.max(1, Math.round(height * ratio));
+    const ctx = canvas.getContext("2d");
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, width, height);
+
+    // Keep the plot's aspect ratio, centred in the available space.
+    const [x0, x1, y0, y1] = field.extent;
+    const scale = Math.min(width / (x1 - x0), height / (y1 - y0));
+    const w = (x1 - x0) * scale;
+    const h = (y1 - y0) * scale;
+    const left = (width - w) / 2;
+    const top = (height - h) / 2;
+    const toX = (gc) => left + (gc / (field.cols - 1)) * w;
+    const toY = (gr) => top + h - (gr / (field.rows - 1)) * h;
+
+    const quantity = state.quantity.value;
+    if (quantity !== "none") {
+      if (!state.layers[quantity]) state.layers[quantity] = colorLayer(field, quantity);
+      ctx.imageSmoothingEnabled = true;
+      ctx.drawImage(state.layers[quantity], left, top, w, h);
+    }
+
+    if (state.lines.checked) {
+      if (!state.streamlines) state.streamlines = streamlines(field, 6);
+      ctx.strokeStyle = quantity === "none" ? "#1f77b4" : "rgba(255, 255, 255, 0.8)";
+      ctx.fillStyle = ctx.strokeStyle;
+      ctx.lineWidth = 1;
+      for (const line of state.streamlines) {
+        ctx.beginPath();
+        line.points.forEach(([gc, gr], i) => (i ? ctx.lineTo(toX(gc), toY(gr)) : ctx.moveTo(toX(gc), toY(gr))));
+        ctx.stroke();
+        const i = Math.min(Math.max(line.arrow, 1), line.points.length - 1);
+        const [ac, ar] = line.points[i];
+        const [pc, pr] = line.points[i - 1];
+        const angle = Math.atan2(toY(ar) - toY(pr), toX(ac) - toX(pc));
+        ctx.save();
+        ctx.translate(toX(ac), toY(ar));
+        ctx.rotate(angle);
+        ctx.beginPath();
+        ctx.moveTo(4, 0);
+        ctx.lineTo(-3, 3);
+        ctx.lineTo(-3, -3);
+        ctx.fill();
+        ctx.restore();
+      }
+    }
+
+    for (const [xq, yq, q] of field.charges) {
+      const cx = left + ((xq - x0) / (x1 - x0)) * w;
+      const cy = top + h - ((yq - y0) / (y1 - y0)) * h;
+      ctx.beginPath();
+      ctx.arc(cx, cy, 2 + 2 * Math.sqrt(Math.abs(q)), 0, 2 * Math.PI);
+      ctx.fillStyle = "red";
+      ctx.fill();
+      ctx.strokeStyle = "black";
+      ctx.stroke();
+      ctx.fillStyle = "black";
+      ctx.fillText(String(q), cx + 6, cy + 12);
+    }
+  }
+
+  function setup(el) {
+    if (el._fieldsim) return el._fieldsim;
+    const toolbar = document.createElement("div");
+    toolbar.className = "fieldsim-canvas-toolbar";
+    const quantity = document.createElement("select");
+    for (const [value, label] of [
+      ["magnitude", "|E|"],
+      ["potential", "Потенциал"],
+      ["none", "Без заливки"],
+    ]) {
+      const option = document.createElement("option");
+      option.value = value;
+      option.textContent = label;
+      quantity.appendChild(option);
+    }
+    const lines = document.createElement("input");
+    lines.type = "checkbox";
+    lines.checked = true;
+    const linesLabel = document.createElement("label");
+    linesLabel.append(lines, " Силовые линии");
+    toolbar.append(quantity, " ", linesLabel);
+    const canvas = document.createElement("canvas");
+    canvas.style.display = "block";
+    el.append(toolbar, canvas);
+
+    const state = { toolbar, quantity, lines, canvas, field: null, layers: {}, streamlines: null };
+    el._fieldsim = state;
+    quantity.addEventListener("change", () => draw(el));
+    lines.addEventListener("change", () => draw(el));
+    new ResizeObserver(() => draw(el)).observe(el);
+    return state;
+  }
+
+  class FieldCanvasBinding extends Shiny.OutputBinding {
+    find(scope) {
+      return $(scope).find(".fieldsim-canvas-output");
+    }
+
+    renderValue(el, payload) {
+      const state = setup(el);
+      state.field = payload ? decode(payload) : null;
+      state.layers = {};
+      state.streamlines = null;
+      if (!state.field) {
+        state.canvas.getContext("2d").clearRect(0, 0, state.canvas.width, state.canvas.height);
+        return;
+      }
+      draw(el);
+    }
+  }
+
+  Shiny.outputBindings.register(new FieldCanvasBinding(), "fieldsim.fieldCanvas");
+})();
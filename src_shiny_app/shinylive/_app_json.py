@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import base64
+import csv
+import fnmatch
+import hashlib
 import json
 import os
-import shutil
 from pathlib import Path
-from typing import Literal, TypedDict
+from typing import Iterable, Literal, TypedDict
 
 from . import _utils
+from ._manifest import ExportManifest
+from ._static import rewrite_asset_references
 
 
 # This is the same as the FileContentJson type in TypeScript.
@@ -20,7 +24,11 @@ class FileContentJson(TypedDict):
 class AppInfo(TypedDict):
     appdir: str
     subdir: str
-    files: list[FileContentJson]
+    files: Iterable[FileContentJson]
+
+
+# Gitignore-style patterns of files to leave out of the app, read from the app directory.
+IGNORE_FILE = ".shinyliveignore"
 
 
 # =============================================================================
@@ -37,7 +45,25 @@ def read_app_files(appdir: Path, destdir: Path) -> list[FileContentJson]:
        Destination directory. This is used only to avoid adding shinylive assets when
        they are in a subdir of the application.
     """
-    app_files: list[FileContentJson] = []
+    return [read_app_file(appdir, name) for name in list_app_files(appdir, destdir)]
+
+
+def list_app_files(appdir: Path, destdir: Path) -> list[str]:
+    """
+    List the files of a Shiny application, relative to `appdir`, with app.py first.
+
+    Files starting with '.', __pycache__ and virtual environments are left out, and so
+    are packages installed into the app directory (for instance with
+    `pip install --target`): the files listed in the RECORD of each *.dist-info
+    directory, unless one of them was changed since, as then the app needs its own
+    copy of the package rather than the one Pyodide would load. Patterns in a
+    .shinyliveignore file leave out more files, and patterns starting with '!' bring
+    back files that would otherwise be left out, like in .gitignore.
+    """
+    rules = _read_ignore_rules(appdir / IGNORE_FILE)
+    installed = _installed_files(appdir)
+
+    app_files: list[str] = []
     # Recursively iterate over files in app directory, and collect the files into
     # app_files data structure.
     exclude_names = {"__pycache__", "venv", ".venv"}
@@ -48,9 +74,14 @@ def read_app_files(appdir: Path, destdir: Path) -> list[FileContentJson]:
             # In case destdir is inside of the appdir, don't copy those files.
             continue
 
-        dirs[:] = [d for d in dirs if not d.startswith(".")]
-        dirs[:] = set(dirs) - exclude_names
         rel_dir = root.relative_to(appdir)
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        dirs[:] = [d for d in dirs if not d.endswith(".dist-info")]
+        dirs[:] = [
+            d
+            for d in sorted(set(dirs) - exclude_names)
+            if not _is_ignored((rel_dir / d).as_posix(), True, rules, False)
+        ]
         files = [f for f in files if not f.startswith(".")]
         files = [f for f in files if f not in exclude_names]
         files.sort()
@@ -60,51 +91,173 @@ def read_app_files(appdir: Path, destdir: Path) -> list[FileContentJson]:
             app_py_idx = files.index("app.py")
             files.insert(0, files.pop(app_py_idx))
 
-        # Add the file to the app_files list.
         for filename in files:
-            if rel_dir == ".":  # pyright: ignore[reportUnnecessaryComparison]
-                output_filename = filename
-            else:
-                output_filename = str(rel_dir / filename)
+            rel_path = (rel_dir / filename).as_posix()
+            if _is_ignored(rel_path, False, rules, rel_path in installed):
+                continue
 
             if filename == "shinylive.js":
                 print(
                     f"Warning: Found shinylive.js in source directory '{appdir}/{rel_dir}'. Are you including a shinylive distribution in your app?"
                 )
 
-            type: Literal["text", "binary"] = "text"
-            try:
-                with open(root / filename, "r", encoding="utf-8") as f:
-                    file_content = f.read()
-                    type = "text"
-            except UnicodeDecodeError:
-                # If text failed, try binary.
-                with open(root / filename, "rb") as f:
-                    file_content_bin = f.read()
-                    file_content = base64.b64encode(file_content_bin).decode("utf-8")
-                    type = "binary"
-
-            app_files.append(
-                {
-                    "name": output_filename,
-                    "content": file_content,
-                    "type": type,
-                }
-            )
+            if rel_dir == ".":  # pyright: ignore[reportUnnecessaryComparison]
+                app_files.append(filename)
+            else:
+                app_files.append(str(rel_dir / filename))
 
     return app_files
 
 
+def read_app_file(appdir: Path, name: str) -> FileContentJson:
+    """
+    Load one file of a Shiny application, as text if it is UTF-8 and base64-encoded
+    otherwise.
+    """
+    type: Literal["text", "binary"] = "text"
+    try:
+        with open(appdir / name, "r", encoding="utf-8") as f:
+            file_content = f.read()
+            type = "text"
+    except UnicodeDecodeError:
+        # If text failed, try binary.
+        with open(appdir / name, "rb") as f:
+            file_content_bin = f.read()
+            file_content = base64.b64encode(file_content_bin).decode("utf-8")
+            type = "binary"
+
+    return {
+        "name": name,
+        "content": file_content,
+        "type": type,
+    }
+
+
+def _installed_files(appdir: Path) -> set[str]:
+    """
+    Return the paths, relative to `appdir`, of the files installed by the distributions
+    whose *.dist-info directories are in `appdir`. Distributions with a file that no
+    longer has the hash in their RECORD are left out.
+    """
+    installed: set[str] = set()
+    for dist_info in appdir.glob("*.dist-info"):
+        record = dist_info / "RECORD"
+        if not record.is_file():
+            continue
+        with open(record, "r", encoding="utf-8", newline="") as f:
+            rows = [row for row in csv.reader(f) if row]
+        # Scripts are recorded relative to site-packages, e.g. ../../bin/x.
+        rows = [row for row in rows if not row[0].startswith("..")]
+        # The metadata in *.dist-info is never part of the app, whatever it says.
+        if any(
+            _is_modified(appdir / row[0], *row[1:2])
+            for row in rows
+            if not row[0].startswith(f"{dist_info.name}/")
+        ):
+            print(
+                f"Note: {dist_info.name} has files that differ from its RECORD, so "
+                f"they stay in the app unless {IGNORE_FILE} leaves them out."
+            )
+            continue
+        installed.update(Path(row[0]).as_posix() for row in rows)
+    return installed
+
+
+def _is_modified(file: Path, hash: str = "") -> bool:
+    """
+    Whether `file` differs from the RECORD `hash` it was installed with, e.g.
+    "sha256=<urlsafe base64 digest>". Files without a hash, like RECORD itself and
+    .pyc files, are never modified; nor are files whose line endings were converted
+    from CRLF, as version control may do when the packages are checked in.
+    """
+    if not hash:
+        return False
+    algorithm, _, expected = hash.partition("=")
+    if algorithm not in hashlib.algorithms_guaranteed:
+        return False
+    try:
+        with open(file, "rb") as f:
+            content = f.read()
+    except FileNotFoundError:
+        # Removed files do not end up in the app either.
+        return False
+
+    def matches(content: bytes) -> bool:
+        digest = hashlib.new(algorithm, content).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii") == expected
+
+    return not (
+        matches(content)
+        or (b"\r\n" not in content and matches(content.replace(b"\n", b"\r\n")))
+    )
+
+
+def _read_ignore_rules(ignore_file: Path) -> list[tuple[str, bool, bool]]:
+    """
+    Read a .shinyliveignore file into (pattern, negated, directories_only) tuples.
+    """
+    if not ignore_file.is_file():
+        return []
+    rules: list[tuple[str, bool, bool]] = []
+    with open(ignore_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            line = line.lstrip("!")
+            dir_only = line.endswith("/")
+            rules.append((line.rstrip("/"), negated, dir_only))
+    return rules
+
+
+def _is_ignored(
+    rel_path: str,
+    is_dir: bool,
+    rules: list[tuple[str, bool, bool]],
+    ignored: bool,
+) -> bool:
+    """
+    Apply .shinyliveignore rules to a path, starting from `ignored`; the last matching
+    rule wins. A pattern containing '/' is matched against the whole path, otherwise
+    against each part of it, and a pattern also matches everything inside a matching
+    directory.
+    """
+    parts = rel_path.split("/")
+    for pattern, negated, dir_only in rules:
+        # The directories containing the path, and the path itself if it may match.
+        candidates = parts if is_dir or not dir_only else parts[:-1]
+        if "/" in pattern.lstrip("/"):
+            prefixes = ["/".join(parts[: i + 1]) for i in range(len(candidates))]
+            matched = any(fnmatch.fnmatchcase(p, pattern.lstrip("/")) for p in prefixes)
+        elif pattern.startswith("/"):
+            matched = bool(candidates) and fnmatch.fnmatchcase(candidates[0], pattern[1:])
+        else:
+            matched = any(fnmatch.fnmatchcase(p, pattern) for p in candidates)
+        if matched:
+            ignored = not negated
+    return ignored
+
+
 def write_app_json(
     app_info: AppInfo,
     destdir: Path,
     html_source_dir: Path,
     template_params: dict[str, object] | None = None,
+    manifest: ExportManifest | None = None,
+    assets_dir_name: str = "shinylive",
 ) -> None:
     """
     Write index.html, edit/index.html, and app.json for an application in the destdir.
+
+    Files whose content is unchanged are left alone; see `ExportManifest`. Without a
+    `manifest`, the one in destdir is updated. The pages refer to the Shinylive assets
+    in `assets_dir_name`, e.g. a fingerprinted directory.
     """
     app_destdir = destdir / app_info["subdir"]
+    save_manifest = manifest is None
+    if manifest is None:
+        manifest = ExportManifest(destdir)
 
     # For a subdir like a/b/c, this will be ../../../
     subdir_inverse = "/".join([".."] * _utils.path_length(app_info["subdir"]))
@@ -127,21 +280,35 @@ def write_app_json(
     template_files = list(html_source_dir.glob("**/*"))
     template_files = [f for f in template_files if f.is_file()]
 
+    def rel_path(file: Path) -> str:
+        return file.relative_to(destdir).as_posix()
+
+    copies: list[tuple[Path, str]] = []
     for template_file in template_files:
         dest_file = app_destdir / template_file.relative_to(html_source_dir)
-        dest_file.parent.mkdir(parents=True, exist_ok=True)
 
         if template_file.suffix == ".html":
-            _utils.copy_file_and_substitute(
-                src=template_file,
-                dest=dest_file,
-                data=replacements,
-            )
+            html = _utils.render_template(template_file, replacements)
+            if assets_dir_name != "shinylive":
+                html = rewrite_asset_references(html, assets_dir_name)
+            with manifest.open(rel_path(dest_file)) as f:
+                f.write(html)
         else:
-            shutil.copyfile(template_file, dest_file)
+            copies.append((template_file, rel_path(dest_file)))
+    manifest.copy_files(copies)
 
     app_json_output_file = app_destdir / "app.json"
 
     print("Writing " + str(app_json_output_file), end="")
-    json.dump(app_info["files"], open(app_json_output_file, "w"))
+    # Write one file at a time, so that only one is held in memory.
+    with manifest.open(rel_path(app_json_output_file)) as f:
+        f.write("[")
+        for i, file in enumerate(app_info["files"]):
+            if i > 0:
+                f.write(", ")
+            json.dump(file, f)
+        f.write("]")
     print(":", app_json_output_file.stat().st_size, "bytes")
+
+    if save_manifest:
+        manifest.save()
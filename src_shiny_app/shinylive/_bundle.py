@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import importlib.util
+import marshal
+import os
+import re
+import sys
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Callable, Iterable, Optional
+
+from ._assets import shinylive_assets_dir
+from ._deps import PyodideLockFile, PyodidePackageInfo, pyodide_python_version
+
+# The app's packages can be combined into one archive, which Pyodide loads with a single
+# request in place of one request per wheel. It is an ordinary pyodide-lock.json
+# package, under this name, that provides the imports of all the packages in it.
+BUNDLE_NAME = "shinylive-app-packages"
+# Changing how bundles are built must change this, so cached bundles are rebuilt.
+BUNDLE_FORMAT = 1
+FINGERPRINT_LENGTH = 12
+# A fixed time for the archive members, so that the archive only depends on its content.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_COMPRESS_LEVEL = 9
+# Where Pyodide installs packages with install_dir "site".
+SITE_PACKAGES = "/lib/python{}.{}/site-packages"
+# Flags of a hash-based .pyc file whose source is not checked on import (PEP 552). Files
+# extracted from an archive get a new modification time, so timestamp-based .pyc files
+# would always look stale; and the sources never change in the browser.
+PYC_UNCHECKED_HASH = 0b01
+
+
+def can_bundle(pkg_info: PyodidePackageInfo, wheel: Path) -> bool:
+    """
+    Whether a package can go in a bundle: a wheel installed into site-packages, which is
+    neither a shared library nor ships its own, as Pyodide looks those up by the name of
+    the file they came in.
+    """
+    if (
+        pkg_info["install_dir"] != "site"
+        or pkg_info.get("package_type", "package") != "package"
+        or pkg_info.get("shared_library", False)
+        or not wheel.name.endswith(".whl")
+    ):
+        return False
+    with zipfile.ZipFile(wheel) as zf:
+        return not any(
+            name.split("/", 1)[0].endswith(".libs") for name in zf.namelist()
+        )
+
+
+def bundle_file_name(
+    pkg_infos: Iterable[PyodidePackageInfo], python_version: Optional[tuple[int, int]]
+) -> str:
+    """
+    The file name of the bundle of the given packages, with .pyc files for
+    `python_version` or none if it is None. It changes whenever any of them does.
+    """
+    h = hashlib.sha256(f"{BUNDLE_FORMAT}\0{python_version}\n".encode("utf-8"))
+    for pkg_info in sorted(pkg_infos, key=lambda pkg_info: pkg_info["file_name"]):
+        h.update(f"{pkg_info['file_name']}\0{pkg_info['sha256']}\n".encode("utf-8"))
+    return f"{BUNDLE_NAME}-{h.hexdigest()[:FINGERPRINT_LENGTH]}.zip"
+
+
+def _compile_pyc(
+    source: bytes, path: str, python_version: tuple[int, int]
+) -> bytes | None:
+    try:
+        code = compile(
+            source,
+            SITE_PACKAGES.format(*python_version) + "/" + path,
+            "exec",
+            dont_inherit=True,
+        )
+    except (SyntaxError, ValueError):
+        # E.g. templates or test data with a .py suffix.
+        return None
+    return (
+        importlib.util.MAGIC_NUMBER
+        + PYC_UNCHECKED_HASH.to_bytes(4, "little")
+        + importlib.util.source_hash(source)
+        + marshal.dumps(code)
+    )
+
+
+def write_bundle(
+    f: IO[bytes],
+    wheels: Iterable[Path],
+    python_version: Optional[tuple[int, int]] = None,
+) -> int:
+    """
+    Write the contents of `wheels` into one zip archive, to be extracted into
+    site-packages as installing each of them would. Where two wheels have the same file,
+    the first one's is kept.
+
+    With `python_version`, which must be the version of the running interpreter, a .pyc
+    file is added for every .py file, so that Pyodide does not compile them on import.
+    Returns the number of .pyc files.
+    """
+    if python_version is not None and python_version != sys.version_info[:2]:
+        raise ValueError(
+            "The .pyc files for Python {}.{} can only be compiled by Python {}.{}, not "
+            "{}.{}.".format(*python_version, *python_version, *sys.version_info[:2])
+        )
+    cache_tag = None
+    if python_version is not None:
+        cache_tag = "cpython-{}{}".format(*python_version)
+
+    written: set[str] = set()
+    compiled = 0
+    with zipfile.ZipFile(
+        f, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL
+    ) as bundle:
+
+        def add(name: str, data: bytes) -> None:
+            if name in written:
+                return
+            written.add(name)
+            info = zipfile.ZipInfo(name, ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            bundle.writestr(info, data)
+
+        for wheel in sorted(wheels, key=lambda wheel: wheel.name):
+            with zipfile.ZipFile(wheel) as zf:
+                for name in sorted(zf.namelist()):
+                    if name.endswith("/"):
+                        continue
+                    data = zf.read(name)
+                    add(name, data)
+                    if cache_tag is None or not name.endswith(".py"):
+                        continue
+                    assert python_version is not None
+                    pyc = _compile_pyc(data, name, python_version)
+                    if pyc is not None:
+                        path = PurePosixPath(name)
+                        pyc_name = f"{path.stem}.{cache_tag}.pyc"
+                        add(str(path.parent / "__pycache__" / pyc_name), pyc)
+                        compiled += 1
+    return compiled
+
+
+def _normalize(name: str) -> str:
+    # https://peps.python.org/pep-0503/#normalized-names
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def bundled_pyodide_lock(
+    pyodide_lock: PyodideLockFile,
+    pkg_infos: Iterable[PyodidePackageInfo],
+    file_name: str,
+    sha256: str,
+) -> PyodideLockFile:
+    """
+    Return the contents of pyodide-lock.json with the given packages replaced by their
+    bundle in `file_name`. The bundle provides all of their imports, and depends on
+    what they depend on outside of it; packages that depend on any of them depend on the
+    bundle instead.
+    """
+    match = re.fullmatch(re.escape(BUNDLE_NAME) + r"-([0-9a-f]+)\.zip", file_name)
+    if match is None:
+        raise ValueError(f"{file_name} is not the file name of a package bundle.")
+    pkg_infos = list(pkg_infos)
+    names = {_normalize(pkg_info["name"]) for pkg_info in pkg_infos}
+    pyodide_lock = copy.deepcopy(pyodide_lock)
+
+    for key, pkg_info in list(pyodide_lock["packages"].items()):
+        if _normalize(pkg_info["name"]) in names:
+            del pyodide_lock["packages"][key]
+    for pkg_info in pyodide_lock["packages"].values():
+        pkg_info["depends"] = list(
+            dict.fromkeys(
+                BUNDLE_NAME if _normalize(dep_name) in names else dep_name
+                for dep_name in pkg_info["depends"]
+            )
+        )
+
+    pyodide_lock["packages"][BUNDLE_NAME] = {
+        "name": BUNDLE_NAME,
+        "version": match.group(1),
+        "file_name": file_name,
+        "install_dir": "site",
+        "sha256": sha256,
+        "package_type": "package",
+        "imports": sorted(
+            {module for pkg_info in pkg_infos for module in pkg_info["imports"]}
+        ),
+        "depends": sorted(
+            {
+                dep_name
+                for pkg_info in pkg_infos
+                for dep_name in pkg_info["depends"]
+                if _normalize(dep_name) not in names
+            }
+        ),
+        "shared_library": False,
+    }
+    return pyodide_lock
+
+
+def _is_valid_zip(path: Path) -> bool:
+    # testzip() reads every member, and returns the first one whose CRC is wrong.
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return zf.testzip() is None
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def ensure_bundle(
+    pkg_infos: list[PyodidePackageInfo],
+    verbose_print: Callable[..., None] = lambda *args: None,
+) -> Path:
+    """
+    Return the bundle of the given packages, building it in the Shinylive assets
+    directory, next to the wheels it is made of, unless it is there already and intact.
+
+    The .pyc files can only be compiled when this is the Python version that Pyodide
+    runs; otherwise the bundle has the sources only.
+    """
+    assets_dir = Path(shinylive_assets_dir())
+    python_version: Optional[tuple[int, int]] = pyodide_python_version()
+    if python_version != sys.version_info[:2]:
+        print(
+            "Warning: Pyodide runs Python {}.{}, so this Python {}.{} cannot compile "
+            ".pyc files for it; the package bundle has the sources only.".format(
+                *python_version, *sys.version_info[:2]
+            ),
+            file=sys.stderr,
+        )
+        python_version = None
+
+    bundle = assets_dir / "bundles" / bundle_file_name(pkg_infos, python_version)
+    if bundle.exists():
+        if _is_valid_zip(bundle):
+            verbose_print(f"Using package bundle {bundle}")
+            return bundle
+        print(f"Package bundle {bundle} is damaged; rebuilding it", file=sys.stderr)
+
+    print(f"Building package bundle {bundle}", file=sys.stderr)
+    bundle.parent.mkdir(parents=True, exist_ok=True)
+    wheels = [
+        assets_dir / "shinylive" / "pyodide" / pkg_info["file_name"]
+        for pkg_info in pkg_infos
+    ]
+    # Another export may be building the same bundle.
+    tmp = bundle.with_name(f".{bundle.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            compiled = write_bundle(f, wheels, python_version)
+        os.replace(tmp, bundle)
+    finally:
+        tmp.unlink(missing_ok=True)
+    verbose_print(
+        f"  {len(wheels)} packages, {compiled} .pyc files, "
+        f"{bundle.stat().st_size / 1e6:.1f} MB"
+    )
+    return bundle
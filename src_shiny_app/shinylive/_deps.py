@@ -38,6 +38,7 @@ BASE_PYODIDE_FILES = {
 # Packages that should always be included in a Shinylive deployment.
 BASE_PYODIDE_PACKAGE_NAMES = {"distutils", "micropip", "ssl"}
 AssetType = Literal["base", "python", "r"]
+ImportKind = Literal["module", "lazy", "optional"]
 
 
 # =============================================================================
@@ -52,6 +53,8 @@ class PyodidePackageInfo(TypedDict):
     sha256: str
     depends: list[str]
     imports: list[str]
+    package_type: NotRequired[str]
+    shared_library: NotRequired[bool]
     unvendored_tests: NotRequired[bool]
 
 
@@ -273,6 +276,9 @@ def shinylive_common_files(
         if rel_root == Path("."):
             dirs.remove("scripts")
             dirs.remove("export_template")
+            # Package bundles built by `shinylive export --bundle-packages`.
+            if "bundles" in dirs:
+                dirs.remove("bundles")
             if not has_base:
                 # No files to add here
                 files = []
@@ -355,21 +361,128 @@ def shinylive_app_resources(
 def find_package_deps(
     app_contents: list[FileContentJson],
     verbose_print: Callable[..., None] = lambda *args: None,
+    *,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
 ) -> list[PyodidePackageInfo]:
     """
     Find package dependencies from the contents of an app.json file. The returned data
     structure is a list of PyodidePackageInfo objects.
+
+    See `explain_package_deps()` for how the packages are chosen.
     """
+    reasons = explain_package_deps(
+        app_contents, verbose_print, include=include, exclude=exclude
+    )
+    return dep_keys_to_pyodide_pkg_infos(reasons)
 
-    imports: set[str] = _find_import_app_contents(app_contents)
-    imports = imports.union(_find_requirements_app_contents(app_contents))
 
-    verbose_print("Imports detected in app:\n ", ", ".join(sorted(imports)))
+def dep_keys_to_pyodide_pkg_infos(dep_keys: Iterable[str]) -> list[PyodidePackageInfo]:
+    """
+    Look up packages in pyodide-lock.json by their keys, such as those returned by
+    `explain_package_deps()`.
+    """
+    pyodide_lock = _pyodide_lock_data()
+    return [copy.deepcopy(pyodide_lock["packages"][key]) for key in dep_keys]
 
-    dep_names = _find_recursive_deps(imports, verbose_print)
-    pkg_infos = _dep_names_to_pyodide_pkg_infos(dep_names)
 
-    return pkg_infos
+def explain_package_deps(
+    app_contents: list[FileContentJson],
+    verbose_print: Callable[..., None] = lambda *args: None,
+    *,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+) -> dict[str, list[str]]:
+    """
+    Find the pyodide-lock.json packages an app needs, and why each one is needed.
+
+    The returned dictionary maps package keys to the reasons they are included, such as
+    "imported by app.py" or "required by shiny".
+
+    The browser loads the packages imported anywhere in the .py files at the top of the
+    app directory, so all of those count. Other .py files, for instance those of a
+    vendored library, only count when they are reachable from the top-level files
+    through imports, including imports inside functions, which run as soon as the
+    function is called. Imports under `if TYPE_CHECKING:` or guarded by
+    `except ImportError` are ignored, as the app runs without them. Packages listed in
+    requirements.txt and in `include` are added, and the dependencies of all of these
+    are followed recursively through pyodide-lock.json, except into packages listed in
+    `exclude`.
+    """
+    include_keys = _package_keys(include)
+    exclude_keys = _package_keys(exclude)
+
+    reasons: dict[str, list[str]] = {}
+
+    def add(key: str | None, reason: str) -> None:
+        if key is None:
+            return
+        if key in exclude_keys:
+            verbose_print(f"  Excluding {key} ({reason})")
+            return
+        key_reasons = reasons.setdefault(key, [])
+        if reason not in key_reasons:
+            key_reasons.append(reason)
+
+    for module, filename, kind in _find_import_graph_app_contents(app_contents):
+        key = module_to_package_key(module)
+        if kind == "lazy":
+            add(key, f"imported inside a function in {filename}")
+        else:
+            add(key, f"imported by {filename}")
+    for name in sorted(_find_requirements_app_contents(app_contents)):
+        add(dep_name_to_dep_key(name), "listed in requirements.txt")
+    for key in include_keys:
+        add(key, "included explicitly")
+
+    verbose_print("Packages used by app:\n ", ", ".join(sorted(reasons)))
+
+    pyodide_lock = _pyodide_lock_data()
+    keys = list(reasons)
+    i = 0
+    while i < len(keys):
+        pkg_info = pyodide_lock["packages"][keys[i]]
+        for dep_name in pkg_info["depends"]:
+            dep_key = dep_name_to_dep_key(dep_name)
+            if dep_key is not None and dep_key not in reasons:
+                keys.append(dep_key)
+            add(dep_key, f"required by {pkg_info['name']}")
+        i += 1
+
+    return reasons
+
+
+def pruned_pyodide_lock(exclude: Iterable[str]) -> PyodideLockFile:
+    """
+    Return the contents of pyodide-lock.json without the packages in `exclude`, and
+    without any mention of them in the dependencies of other packages, so that Pyodide
+    does not try to load them.
+    """
+    exclude_keys = _package_keys(exclude)
+    exclude_names = {
+        pkg_info["name"].lower()
+        for key, pkg_info in _pyodide_lock_data()["packages"].items()
+        if key in exclude_keys
+    }
+    pyodide_lock = copy.deepcopy(_pyodide_lock_data())
+    for key in exclude_keys:
+        del pyodide_lock["packages"][key]
+    for pkg_info in pyodide_lock["packages"].values():
+        pkg_info["depends"] = [
+            dep_name
+            for dep_name in pkg_info["depends"]
+            if dep_name.lower() not in exclude_names
+            and dep_name_to_dep_key(dep_name) not in exclude_keys
+        ]
+    return pyodide_lock
+
+
+def pyodide_python_version() -> tuple[int, int]:
+    """
+    Return the major and minor version of the Python that Pyodide runs.
+    """
+    major, minor = _pyodide_lock_data()["info"]["python"].split(".")[:2]
+    return int(major), int(minor)
 
 
 def base_package_deps_htmldepitems() -> list[HtmlDepItem]:
@@ -460,6 +573,30 @@ def dep_name_to_dep_key(name: str) -> str | None:
     return _dep_name_to_dep_key_mappings()[name]
 
 
+def _package_keys(names: Iterable[str]) -> list[str]:
+    """
+    Convert package names given by the user to keys in pyodide-lock.json, raising an
+    error for names that are not in it.
+    """
+    pyodide_lock = _pyodide_lock_data()
+    keys: list[str] = []
+    unknown: list[str] = []
+    for name in names:
+        if name in pyodide_lock["packages"]:
+            keys.append(name)
+            continue
+        dep_key = dep_name_to_dep_key(name)
+        if dep_key is None or dep_key not in pyodide_lock["packages"]:
+            unknown.append(name)
+        else:
+            keys.append(dep_key)
+    if unknown:
+        raise ValueError(
+            "Packages not found in pyodide-lock.json: " + ", ".join(unknown)
+        )
+    return keys
+
+
 @functools.lru_cache
 def _dep_name_to_dep_key_mappings() -> dict[str, str]:
     """
@@ -481,24 +618,76 @@ def _dep_name_to_dep_key_mappings() -> dict[str, str]:
     return name_to_key
 
 
-def _find_import_app_contents(app_contents: list[FileContentJson]) -> set[str]:
-    """
-    Given an app.json file, find packages that are imported.
-    """
-    imports: set[str] = set()
-    for file_content in app_contents:
-        if not file_content["name"].endswith(".py"):
-            continue
+def _find_import_graph_app_contents(
+    app_contents: list[FileContentJson],
+) -> list[tuple[str, str, ImportKind]]:
+    """
+    Given an app.json file, find the top-level names of the modules that are imported
+    by the .py files at the top of the app and by the local modules they import, as
+    (module, filename, kind) tuples. Imports of local modules are followed rather than
+    reported, except in the top-level files, whose imports are all loaded by the
+    browser and are reported with kind "module".
+    """
+    sources = {
+        file_content["name"].replace(os.sep, "/"): file_content["content"]
+        for file_content in app_contents
+        if file_content["name"].endswith(".py") and file_content["type"] == "text"
+    }
+
+    def local_module(module: str) -> str | None:
+        path = module.replace(".", "/")
+        for candidate in (path + ".py", path + "/__init__.py"):
+            if candidate in sources:
+                return candidate
+        return None
+
+    found: list[tuple[str, str, ImportKind]] = []
+    entries = [name for name in sources if "/" not in name]
+    queue = list(entries)
+    seen = set(queue)
+    i = 0
+    while i < len(queue):
+        filename = queue[i]
+        i += 1
+        is_entry = filename in entries
+        package = filename[: -len(".py")].replace("/", ".")
+        if not filename.endswith("/__init__.py"):
+            package = package.rpartition(".")[0]
+        else:
+            package = package[: -len(".__init__")]
+
+        for module, level, names, kind in _find_imports_with_kind(sources[filename]):
+            if level > 0:
+                base = package.split(".") if package else []
+                if level - 1 > len(base):
+                    continue
+                base = base[: len(base) - (level - 1)]
+                module = ".".join([*base, module] if module else base)
+            if module == "":
+                continue
 
-        imports = imports.union(_find_imports(file_content["content"]))
+            if is_entry:
+                if level == 0:
+                    found.append((module.split(".")[0], filename, "module"))
+            elif kind == "optional":
+                continue
 
-    # Note that at this point, the imports are module names, like "cv2", but these can
-    # sometimes differ from the package names, like "opencv-python". We need to map from
-    # module names to package names.
-    packages = [module_to_package_key(x) for x in imports]
-    packages = [x for x in packages if x is not None]
+            # Importing a.b.c runs a/__init__.py and a/b/__init__.py too, and
+            # `from a import b` may import the submodule a/b.py.
+            parts = module.split(".")
+            candidates = [".".join(parts[: j + 1]) for j in range(len(parts))]
+            candidates += [module + "." + name for name in names]
+            local = [local_module(c) for c in candidates]
+            if local[0] is None and level == 0:
+                if not is_entry:
+                    found.append((parts[0], filename, kind))
+                continue
+            for local_file in local:
+                if local_file is not None and local_file not in seen:
+                    seen.add(local_file)
+                    queue.append(local_file)
 
-    return set(packages)
+    return found
 
 
 def _find_requirements_app_contents(app_contents: list[FileContentJson]) -> set[str]:
@@ -605,6 +794,86 @@ def _find_imports(source: str) -> list[str]:
     return list(sorted(imports))
 
 
+class _ImportCollector(ast.NodeVisitor):
+    """
+    Collect the imports in a module as (module, level, names, kind) tuples. The kind is
+    "module" for imports that run when the module is imported, "lazy" for those inside
+    functions, and "optional" for those guarded by `except ImportError`. Imports under
+    `if TYPE_CHECKING:` never run and are skipped.
+    """
+
+    def __init__(self) -> None:
+        self.imports: list[tuple[str, int, tuple[str, ...], ImportKind]] = []
+        self.in_function = False
+        self.optional = False
+
+    @property
+    def kind(self) -> ImportKind:
+        if self.optional:
+            return "optional"
+        return "lazy" if self.in_function else "module"
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.imports.append((alias.name, 0, (), self.kind))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        names = tuple(alias.name for alias in node.names if alias.name != "*")
+        self.imports.append((node.module or "", node.level, names, self.kind))
+
+    def visit_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        in_function, self.in_function = self.in_function, True
+        self.generic_visit(node)
+        self.in_function = in_function
+
+    visit_AsyncFunctionDef = visit_FunctionDef  # pyright: ignore[reportAssignmentType]
+    visit_Lambda = visit_FunctionDef  # pyright: ignore[reportAssignmentType]
+
+    def visit_If(self, node: ast.If) -> None:
+        test = node.test
+        if (isinstance(test, ast.Name) and test.id == "TYPE_CHECKING") or (
+            isinstance(test, ast.Attribute) and test.attr == "TYPE_CHECKING"
+        ):
+            for child in node.orelse:
+                self.visit(child)
+            return
+        self.generic_visit(node)
+
+    def visit_Try(self, node: ast.Try) -> None:
+        guarded = any(_catches_import_error(h.type) for h in node.handlers)
+        optional, self.optional = self.optional, self.optional or guarded
+        for child in node.body:
+            self.visit(child)
+        self.optional = optional
+        for child in [*node.handlers, *node.orelse, *node.finalbody]:
+            self.visit(child)
+
+
+def _catches_import_error(type: ast.expr | None) -> bool:
+    if type is None:
+        return True
+    if isinstance(type, ast.Tuple):
+        return any(_catches_import_error(elt) for elt in type.elts)
+    name = type.id if isinstance(type, ast.Name) else getattr(type, "attr", None)
+    return name in ("ImportError", "ModuleNotFoundError", "Exception", "BaseException")
+
+
+def _find_imports_with_kind(
+    source: str,
+) -> list[tuple[str, int, tuple[str, ...], ImportKind]]:
+    """
+    Like `_find_imports()`, but keeping relative imports, the names imported from each
+    module, and whether each import is optional or lazy. See `_ImportCollector`.
+    """
+    try:
+        mod = ast.parse(dedent(source))
+    except SyntaxError:
+        return []
+    collector = _ImportCollector()
+    collector.visit(mod)
+    return collector.imports
+
+
 def _find_packages_in_requirements(req_txt: str) -> list[str]:
     """
     Given the contents of a requirements.txt, return list of package names.
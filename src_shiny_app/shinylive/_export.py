@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import sys
 from pathlib import Path
+from typing import Iterable
 
-from . import _deps, _utils
-from ._app_json import AppInfo, read_app_files, write_app_json
+from . import _bundle, _deps, _static, _utils
+from ._app_json import AppInfo, list_app_files, read_app_file, write_app_json
 from ._assets import shinylive_assets_dir
+from ._manifest import ExportManifest
+
+SERVICEWORKER_FILE = "shinylive-sw.js"
 
 
 def export(
@@ -18,6 +24,14 @@ def export(
     full_shinylive: bool = False,
     template_dir: str | Path | None = None,
     template_params: dict[str, object] | None = None,
+    include_packages: Iterable[str] = (),
+    exclude_packages: Iterable[str] = (),
+    size_budget: int | None = None,
+    link_assets: bool = False,
+    jobs: int | None = None,
+    fingerprint: bool = False,
+    precompress: bool = False,
+    bundle_packages: bool = False,
 ):
     def verbose_print(*args: object) -> None:
         if verbose:
@@ -44,47 +58,36 @@ def export(
         if not template_dir.exists():
             raise ValueError(f"template_dir: Directory {template_dir}/ does not exist.")
 
-    if not destdir.exists():
-        print(f"Creating {destdir}/", file=sys.stderr)
-        destdir.mkdir()
-
-    copy_fn = _utils.create_copy_fn(overwrite=False, verbose_print=verbose_print)
+    if bundle_packages and full_shinylive:
+        raise ValueError("bundle_packages cannot be combined with full_shinylive.")
 
     assets_dir = Path(shinylive_assets_dir())
-
-    # =========================================================================
-    # Copy the base dependencies for shinylive/ distribution. This does not include the
-    # Python package files.
-    # =========================================================================
-    print(
-        f"Copying base Shinylive files from {assets_dir}/ to {destdir}/",
-        file=sys.stderr,
-    )
+    exclude_packages = list(exclude_packages)
 
     base_files = _deps.shinylive_common_files(
         # Do not include r-only support files
         asset_type=("base", "python"),
     )
-    for file in base_files:
-        src_path = assets_dir / file
-        dest_path = destdir / Path(file)
-
-        if not dest_path.parent.exists():
-            os.makedirs(dest_path.parent)
-
-        copy_fn(src_path, dest_path)
+    lock_file = os.path.join("shinylive", "pyodide", "pyodide-lock.json")
 
     # =========================================================================
-    # Load each app's contents into a list[FileContentJson]
+    # List the app's files. Only the code is loaded now, to find the dependencies;
+    # the rest is read one file at a time while app.json is written.
     # =========================================================================
+    app_files = list_app_files(appdir, destdir)
+    code_files = [
+        read_app_file(appdir, name)
+        for name in app_files
+        if name.endswith(".py") or name == "requirements.txt"
+    ]
     app_info: AppInfo = {
         "appdir": str(appdir),
         "subdir": str(subdir),
-        "files": read_app_files(appdir, destdir),
+        "files": (read_app_file(appdir, name) for name in app_files),
     }
 
     # =========================================================================
-    # Copy dependencies from shinylive/pyodide/
+    # Find the dependencies in shinylive/pyodide/
     # =========================================================================
     if full_shinylive:
         package_files = _utils.listdir_recursive(assets_dir / "shinylive" / "pyodide")
@@ -96,23 +99,154 @@ def export(
         ]
 
     else:
-        deps = _deps.base_package_deps() + _deps.find_package_deps(app_info["files"])
-
+        reasons = _deps.explain_package_deps(
+            code_files,
+            verbose_print,
+            include=include_packages,
+            exclude=exclude_packages,
+        )
+        deps = _deps.base_package_deps() + _deps.dep_keys_to_pyodide_pkg_infos(reasons)
+        # The base packages may be imported by the app as well.
+        deps = list({dep["file_name"]: dep for dep in deps}.values())
         package_files: list[str] = [dep["file_name"] for dep in deps]
 
+        verbose_print("Packages included, and why:")
+        for dep in deps:
+            why = reasons.get(_deps.dep_name_to_dep_key(dep["name"]) or "", [])
+            size = (assets_dir / "shinylive" / "pyodide" / dep["file_name"]).stat()
+            verbose_print(
+                f"  {dep['name']} {dep['version']} ({size.st_size / 1e6:.1f} MB):",
+                "; ".join(why) or "always included",
+            )
+
+    # =========================================================================
+    # Combine the packages into one archive, which Pyodide fetches in one request
+    # instead of one per wheel, with precompiled .pyc files.
+    # =========================================================================
+    bundle: Path | None = None
+    bundled: list[_deps.PyodidePackageInfo] = []
+    if bundle_packages:
+        pyodide_dir = assets_dir / "shinylive" / "pyodide"
+        bundled = [
+            dep
+            for dep in deps
+            if _bundle.can_bundle(dep, pyodide_dir / dep["file_name"])
+        ]
+    if bundled:
+        bundle = _bundle.ensure_bundle(bundled, verbose_print)
+        package_files = [dep["file_name"] for dep in deps if dep not in bundled]
+        verbose_print(
+            f"Bundled {len(bundled)} packages into {bundle.name}; loading separately:",
+            ", ".join(package_files) or "none",
+        )
+
+    # =========================================================================
+    # Check the size of the export before writing anything
+    # =========================================================================
+    if size_budget is not None:
+        sizes = {
+            file: (assets_dir / file).stat().st_size
+            for file in [
+                *base_files,
+                *(os.path.join("shinylive", "pyodide", f) for f in package_files),
+            ]
+        }
+        if bundle is not None:
+            sizes[os.path.join("shinylive", "pyodide", bundle.name)] = (
+                bundle.stat().st_size
+            )
+        app_size = sum((appdir / name).stat().st_size for name in app_files)
+        total = sum(sizes.values()) + app_size
+        if total > size_budget:
+            largest = sorted(sizes.items(), key=lambda item: -item[1])[:10]
+            raise ValueError(
+                f"The export would be {total / 1e6:.1f} MB, over the budget of "
+                f"{size_budget / 1e6:.1f} MB. The app files take {app_size / 1e6:.1f} MB "
+                "and the largest assets are:\n"
+                + "\n".join(f"  {file}: {size / 1e6:.1f} MB" for file, size in largest)
+            )
         print(
-            f"Copying imported packages from {assets_dir}/shinylive/pyodide/ to {destdir}/shinylive/pyodide/",
+            f"Export size: {total / 1e6:.1f} MB of {size_budget / 1e6:.1f} MB budget",
             file=sys.stderr,
         )
-        verbose_print(" ", ", ".join(package_files))
+
+    if not destdir.exists():
+        print(f"Creating {destdir}/", file=sys.stderr)
+        destdir.mkdir()
+
+    manifest = ExportManifest(destdir, verbose_print)
+
+    # =========================================================================
+    # Copy the base dependencies for shinylive/ distribution, and the Python
+    # packages from shinylive/pyodide/, skipping those already in destdir.
+    # =========================================================================
+    print(
+        f"{'Linking' if link_assets else 'Copying'} Shinylive files and packages from {assets_dir}/ to {destdir}/",
+        file=sys.stderr,
+    )
+
+    pruned_lock: str | None = None
+    if exclude_packages or bundle is not None:
+        # Excluded packages must disappear from the lockfile too, or Pyodide would try
+        # to load them; and bundled ones are loaded through their bundle.
+        pyodide_lock = _deps.pruned_pyodide_lock(exclude_packages)
+        if bundle is not None:
+            pyodide_lock = _bundle.bundled_pyodide_lock(
+                pyodide_lock, bundled, bundle.name, manifest.source_sha256(bundle)
+            )
+        pruned_lock = json.dumps(pyodide_lock)
+
+    # With fingerprinting, the files of shinylive/ go to a directory named after
+    # their content instead, so they can be cached forever. Packages are left out of
+    # the name, because their file names are already versioned.
+    assets_dir_name = "shinylive"
+    if fingerprint:
+        assets_dir_name = _static.fingerprint_dir_name(
+            (
+                file,
+                hashlib.sha256(pruned_lock.encode("utf-8")).hexdigest()
+                if file == lock_file and pruned_lock is not None
+                else manifest.source_sha256(assets_dir / file),
+            )
+            for file in base_files
+            if Path(file).parts[0] == "shinylive"
+        )
+        verbose_print(f"Fingerprinted assets directory: {assets_dir_name}/")
+
+    def dest_path(file: str | Path) -> str:
+        parts = Path(file).parts
+        if parts[0] == "shinylive":
+            parts = (assets_dir_name, *parts[1:])
+        return "/".join(parts)
+
+    copies: list[tuple[Path, str]] = []
+    for file in base_files:
+        if file == lock_file and pruned_lock is not None:
+            with manifest.open(dest_path(file)) as f:
+                f.write(pruned_lock)
+            continue
+        if file == SERVICEWORKER_FILE and fingerprint:
+            source = (assets_dir / file).read_text(encoding="utf-8")
+            patched = _static.patch_serviceworker(source, assets_dir_name)
+            if patched is not None:
+                with manifest.open(dest_path(file)) as f:
+                    f.write(patched)
+                continue
+            print(
+                f"Warning: could not add the assets cache to {file}; "
+                "the service worker will not cache the fingerprinted assets.",
+                file=sys.stderr,
+            )
+        copies.append((assets_dir / file, dest_path(file)))
 
     for filename in package_files:
-        src_path = assets_dir / "shinylive" / "pyodide" / filename
-        dest_path = destdir / "shinylive" / "pyodide" / filename
-        if not dest_path.parent.exists():
-            os.makedirs(dest_path.parent)
+        file = Path("shinylive", "pyodide", filename)
+        copies.append((assets_dir / file, dest_path(file)))
+
+    if bundle is not None:
+        copies.append((bundle, dest_path(Path("shinylive", "pyodide", bundle.name))))
 
-        copy_fn(src_path, dest_path)
+    manifest.copy_files(copies, link=link_assets, jobs=jobs)
 
     # =========================================================================
     # For each app, write the index.html, edit/index.html, and app.json in
@@ -123,6 +257,22 @@ def export(
         destdir,
         html_source_dir=template_dir,
         template_params=template_params if template_params is not None else {},
+        manifest=manifest,
+        assets_dir_name=assets_dir_name,
+    )
+
+    if precompress:
+        print("Writing precompressed copies of the files", file=sys.stderr)
+        _static.precompress(
+            manifest, manifest.touched, jobs=jobs, verbose_print=verbose_print
+        )
+
+    removed = manifest.prune(subdir.as_posix())
+    manifest.save()
+    print(
+        f"Wrote {manifest.copied} files; {manifest.skipped} were unchanged"
+        + (f"; removed {removed} that are no longer used." if removed else "."),
+        file=sys.stderr,
     )
 
     print(
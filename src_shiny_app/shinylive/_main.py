@@ -40,7 +40,9 @@ version_txt = f"""
 # * shinylive
 #     * --version
 #     * export
-#         * Options: --subdir, --full-shinylive, --verbose
+#         * Options: --subdir, --full-shinylive, --include-package, --exclude-package,
+#                    --size-budget, --link-assets, --jobs, --fingerprint,
+#                    --precompress, --bundle-packages, --verbose
 #     * assets
 #         * download
 #             * Options: --version, --dir, --url
@@ -97,7 +99,12 @@ APPDIR is the directory containing the Shiny application.
 DESTDIR is the destination directory where the output files will be written to. This
 directory can be deployed as a static web site.
 
-This command will not include the contents of venv/ or any files that start with '.'
+This command will not include the contents of venv/, any files that start with '.',
+packages installed into APPDIR (found through their *.dist-info directories), or files
+matching the gitignore-style patterns in APPDIR/.shinyliveignore.
+
+Exporting again into the same DESTDIR only writes the files that changed, as recorded
+in DESTDIR/.shinylive-manifest.json.
 
 After writing the output files, you can serve them locally with the following command:
 
@@ -131,11 +138,57 @@ After writing the output files, you can serve them locally with the following co
     default=None,
     help="Path to the directory containing the mustache templates for the exported shinylive files.",
 )
+@click.option(
+    "--include-package",
+    multiple=True,
+    help="A Pyodide package to include even though the app does not import it, e.g. because it is imported dynamically. Can be given more than once.",
+)
+@click.option(
+    "--exclude-package",
+    multiple=True,
+    help="A Pyodide package to leave out even though the app or another package depends on it. It is also removed from the exported pyodide-lock.json. Can be given more than once.",
+)
+@click.option(
+    "--size-budget",
+    type=float,
+    default=None,
+    help="Fail, before writing anything, if the export would be larger than this many megabytes.",
+)
+@click.option(
+    "--link-assets",
+    is_flag=True,
+    default=False,
+    help="Hardlink the Shinylive assets and packages from the local cache instead of copying them, where the file system allows it.",
+)
+@click.option(
+    "--jobs",
+    type=int,
+    default=None,
+    help="How many files to copy at a time. Defaults to a number based on the CPU count.",
+)
+@click.option(
+    "--fingerprint",
+    is_flag=True,
+    default=False,
+    help="Put the Shinylive assets in a directory named after a hash of their content, which can be served with immutable caching and which the service worker caches across deploys. index.html, app.json and shinylive-sw.js keep their names and must be revalidated.",
+)
+@click.option(
+    "--precompress",
+    is_flag=True,
+    default=False,
+    help="Write .gz copies of the compressible files, and .br copies if the brotli package is installed, for hosts that serve precompressed files.",
+)
+@click.option(
+    "--bundle-packages",
+    is_flag=True,
+    default=False,
+    help="Combine the packages the app needs into one archive, which Pyodide loads in a single request while it starts. The archive has precompiled .pyc files when this Python is the version Pyodide runs. It is built once, in the Shinylive assets cache.",
+)
 @click.option(
     "--verbose",
     is_flag=True,
     default=False,
-    help="Print debugging information when copying files.",
+    help="Print debugging information when copying files, and why each package is included.",
     show_default=True,
 )
 def export(
@@ -146,6 +199,14 @@ def export(
     full_shinylive: bool,
     template_dir: str | None,
     template_params: str | None,
+    include_package: tuple[str, ...],
+    exclude_package: tuple[str, ...],
+    size_budget: float | None,
+    link_assets: bool,
+    jobs: int | None,
+    fingerprint: bool,
+    precompress: bool,
+    bundle_packages: bool,
 ) -> None:
     template_params_dict = None
     if template_params is not None:
@@ -163,6 +224,14 @@ def export(
         full_shinylive=full_shinylive,
         template_dir=template_dir,
         template_params=template_params_dict,
+        include_packages=include_package,
+        exclude_packages=exclude_package,
+        size_budget=None if size_budget is None else int(size_budget * 1e6),
+        link_assets=link_assets,
+        jobs=jobs,
+        fingerprint=fingerprint,
+        precompress=precompress,
+        bundle_packages=bundle_packages,
     )
 
 
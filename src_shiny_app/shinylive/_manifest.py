@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator, Optional, TypedDict
+
+# Records what an export wrote to its destination directory, so the next export can
+# skip the files that have not changed.
+MANIFEST_FILE = ".shinylive-manifest.json"
+MANIFEST_VERSION = 2
+HASH_BLOCK_SIZE = 2**20
+
+# Generated files get the permissions of any new file, rather than those of mkstemp().
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class ManifestEntry(TypedDict):
+    sha256: str
+    # Size and modification time of the file in the destination directory when it was
+    # written, to tell whether it has been touched since.
+    size: int
+    mtime_ns: int
+    # The same for the file it was copied from, if any, to avoid hashing it again.
+    source: Optional[str]
+    source_size: int
+    source_mtime_ns: int
+
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ExportManifest:
+    """
+    The files of an export directory, by content hash.
+
+    Files are only copied or written when their content differs from what is already
+    in the directory. Unchanged files are recognized without reading them when neither
+    the destination nor the source has changed size or modification time since the
+    last export. Changed files are replaced rather than written in place, so a file
+    hardlinked to the Shinylive cache is never modified through the link.
+
+    Several apps can be exported into the same directory and share its assets, so the
+    manifest records which files the last export of each app wrote; `prune()` removes
+    those that no app uses any more, such as an outdated fingerprinted assets
+    directory.
+    """
+
+    def __init__(
+        self,
+        destdir: str | Path,
+        verbose_print: Callable[..., None] = lambda *args: None,
+    ) -> None:
+        self.destdir = Path(destdir)
+        self.verbose_print = verbose_print
+        self.entries: dict[str, ManifestEntry] = {}
+        # The files of each app, by the subdirectory it was exported to.
+        self.apps: dict[str, list[str]] = {}
+        self.copied = 0
+        self.skipped = 0
+        # The files this export copied or wrote, changed or not.
+        self.touched: set[str] = set()
+
+        manifest_file = self.destdir / MANIFEST_FILE
+        if manifest_file.exists():
+            try:
+                with open(manifest_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data["files"]
+                    self.apps = data["apps"]
+            except (OSError, ValueError, KeyError):
+                self.verbose_print(f"Ignoring unreadable {manifest_file}")
+
+    def save(self) -> None:
+        with open(self.destdir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "apps": dict(sorted(self.apps.items())),
+                    "files": dict(sorted(self.entries.items())),
+                },
+                f,
+                indent=1,
+            )
+
+    def prune(self, app: str) -> int:
+        """
+        Record the files this export copied or wrote as those of `app`, and delete the
+        files that no app exported into the directory uses any more. Files changed since
+        they were written are left alone, and only dropped from the manifest. Returns
+        the number of files deleted.
+        """
+        self.apps[app] = sorted(self.touched)
+        used = {rel_path for files in self.apps.values() for rel_path in files}
+        removed = 0
+        for rel_path in sorted(set(self.entries) - used):
+            entry = self.entries.pop(rel_path)
+            dest = self.destdir / rel_path
+            try:
+                stat = dest.stat()
+            except FileNotFoundError:
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+                continue
+            dest.unlink()
+            removed += 1
+            self.verbose_print(f"Removed {rel_path}")
+            # And the directories this leaves empty, e.g. an old shinylive-<hash>/.
+            parent = dest.parent
+            while parent != self.destdir:
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+        return removed
+
+    def source_sha256(self, src: Path) -> str:
+        """
+        The hash of a source file, from the manifest if an earlier export copied it and
+        it has not changed since.
+        """
+        stat = src.stat()
+        for entry in self.entries.values():
+            if entry["source"] == str(src) and (
+                entry["source_size"],
+                entry["source_mtime_ns"],
+            ) == (stat.st_size, stat.st_mtime_ns):
+                return entry["sha256"]
+        return file_sha256(src)
+
+    def is_current(self, rel_path: str, source: Path) -> bool:
+        """
+        Whether a file derived from `source`, e.g. a compressed copy, was written from
+        it as it is now and has not been touched since.
+        """
+        entry = self.entries.get(rel_path)
+        if entry is None or entry["source"] != str(source):
+            return False
+        try:
+            stat = (self.destdir / rel_path).stat()
+            source_stat = source.stat()
+        except FileNotFoundError:
+            return False
+        return (
+            entry["size"],
+            entry["mtime_ns"],
+            entry["source_size"],
+            entry["source_mtime_ns"],
+        ) == (stat.st_size, stat.st_mtime_ns, source_stat.st_size, source_stat.st_mtime_ns)
+
+    def keep(self, rel_path: str) -> None:
+        """
+        Count a file that is already up to date, per `is_current()`, as one this
+        export wrote, so that `prune()` keeps it.
+        """
+        self.touched.add(rel_path)
+        self.skipped += 1
+        self.verbose_print(f"Unchanged {rel_path}")
+
+    def _dest_sha256(self, rel_path: str) -> str | None:
+        """
+        The hash of a file in the destination directory, from the manifest if the file
+        is as it was written, or None if it does not exist.
+        """
+        dest = self.destdir / rel_path
+        try:
+            stat = dest.stat()
+        except FileNotFoundError:
+            return None
+        entry = self.entries.get(rel_path)
+        if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return entry["sha256"]
+        return file_sha256(dest)
+
+    def _record(
+        self, rel_path: str, sha256: str, source: Path | None = None
+    ) -> ManifestEntry:
+        stat = (self.destdir / rel_path).stat()
+        source_stat = source.stat() if source is not None else None
+        return {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "source": str(source) if source is not None else None,
+            "source_size": source_stat.st_size if source_stat else 0,
+            "source_mtime_ns": source_stat.st_mtime_ns if source_stat else 0,
+        }
+
+    def _sync_file(
+        self, src: Path, rel_path: str, link: bool
+    ) -> tuple[str, ManifestEntry, bool]:
+        entry = self.entries.get(rel_path)
+        src_stat = src.stat()
+        if (
+            entry is not None
+            and entry["source"] == str(src)
+            and (entry["source_size"], entry["source_mtime_ns"])
+            == (src_stat.st_size, src_stat.st_mtime_ns)
+        ):
+            sha256 = entry["sha256"]
+        else:
+            sha256 = file_sha256(src)
+
+        if self._dest_sha256(rel_path) == sha256:
+            return rel_path, self._record(rel_path, sha256, src), False
+
+        dest = self.destdir / rel_path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.tmp")
+        tmp.unlink(missing_ok=True)
+        if link:
+            try:
+                os.link(src, tmp)
+            except OSError:
+                # E.g. the cache is on another file system.
+                shutil.copy2(src, tmp)
+        else:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+        return rel_path, self._record(rel_path, sha256, src), True
+
+    def copy_files(
+        self,
+        files: list[tuple[Path, str]],
+        *,
+        link: bool = False,
+        jobs: int | None = None,
+    ) -> None:
+        """
+        Copy `(source, relative destination)` pairs into the destination directory,
+        skipping those whose content is already there. With `link`, files are
+        hardlinked instead of copied when possible. Up to `jobs` files are hashed and
+        copied at a time.
+        """
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(lambda f: self._sync_file(f[0], f[1], link), files)
+            for rel_path, entry, changed in results:
+                self.entries[rel_path] = entry
+                self.touched.add(rel_path)
+                if changed:
+                    self.copied += 1
+                    self.verbose_print(f"{'Linked' if link else 'Copied'} {rel_path}")
+                else:
+                    self.skipped += 1
+                    self.verbose_print(f"Unchanged {rel_path}")
+
+    @contextmanager
+    def open(
+        self, rel_path: str, mode: str = "w", source: Path | None = None
+    ) -> Iterator[IO[Any]]:
+        """
+        Write a generated file into the destination directory. The file is written to a
+        temporary file first, and only replaces the existing one if its content differs.
+        `source` is the file it is derived from, if any; see `is_current()`.
+        """
+        dest = self.destdir / rel_path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.")
+        try:
+            with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+                yield f
+            sha256 = file_sha256(tmp)
+            if self._dest_sha256(rel_path) == sha256:
+                self.skipped += 1
+                self.verbose_print(f"Unchanged {rel_path}")
+            else:
+                os.chmod(tmp, 0o666 & ~_UMASK)
+                os.replace(tmp, dest)
+                self.copied += 1
+            self.entries[rel_path] = self._record(rel_path, sha256, source)
+            self.touched.add(rel_path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable
+
+from ._manifest import ExportManifest
+
+# File types worth sending compressed. Wheels and zip files are compressed already.
+COMPRESSIBLE_SUFFIXES = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".map",
+    ".mjs",
+    ".svg",
+    ".txt",
+    ".wasm",
+}
+# Smaller files are not worth a compressed copy.
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+FINGERPRINT_LENGTH = 12
+
+
+def fingerprint_dir_name(files: Iterable[tuple[str, str]]) -> str:
+    """
+    The name of the directory for Shinylive assets with the given (path, sha256)
+    contents: shinylive-<hash>, which changes whenever any of them does.
+    """
+    h = hashlib.sha256()
+    for path, sha256 in sorted(files):
+        h.update(f"{path}\0{sha256}\n".encode("utf-8"))
+    return "shinylive-" + h.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def rewrite_asset_references(html: str, assets_dir_name: str) -> str:
+    """
+    Point the shinylive/ URLs in an HTML page, like "./shinylive/shinylive.js", to the
+    fingerprinted assets directory instead.
+    """
+    return re.sub(r"""(?<=["'/])shinylive/""", assets_dir_name + "/", html)
+
+
+# Prepended to shinylive-sw.js, so that it handles requests for the fingerprinted assets
+# before Shinylive's own handlers. Their URLs change whenever their content does, so the
+# responses are cached for good; the cache outlives deploys, and the activate handler
+# only drops assets of other fingerprints.
+_SERVICEWORKER_ASSETS_CACHE = """\
+// Added by `shinylive export --fingerprint`.
+{
+  const assetsDirName = %(assets_dir_name)s;
+  const assetsCacheName = %(cache_name)s;
+  const swDir = self.location.origin + self.location.pathname.replace(/[^/]*$/, "");
+  const assetsUrl = swDir + assetsDirName + "/";
+
+  const withCoiHeaders = (resp) => {
+    const headers = new Headers(resp.headers);
+    headers.set("Cross-Origin-Embedder-Policy", "credentialless");
+    headers.set("Cross-Origin-Resource-Policy", "cross-origin");
+    headers.set("Cross-Origin-Opener-Policy", "same-origin");
+    return new Response(resp.body, {
+      status: resp.status,
+      statusText: resp.statusText,
+      headers,
+    });
+  };
+
+  self.addEventListener("activate", (event) => {
+    event.waitUntil(
+      (async () => {
+        const cache = await caches.open(assetsCacheName);
+        for (const request of await cache.keys()) {
+          if (
+            request.url.startsWith(swDir + "shinylive-") &&
+            !request.url.startsWith(assetsUrl)
+          ) {
+            await cache.delete(request);
+          }
+        }
+      })()
+    );
+  });
+
+  self.addEventListener("fetch", (event) => {
+    const request = event.request;
+    if (request.method !== "GET" || !request.url.startsWith(assetsUrl)) {
+      return;
+    }
+    const coiRequested =
+      new URL(request.url).searchParams.get("coi") === "1" ||
+      request.referrer.includes("coi=1");
+    event.stopImmediatePropagation();
+    event.respondWith(
+      (async () => {
+        const cache = await caches.open(assetsCacheName);
+        let resp = await cache.match(request);
+        if (!resp) {
+          resp = await fetch(request);
+          if (resp.ok) {
+            await cache.put(request, resp.clone());
+          }
+        }
+        return coiRequested ? withCoiHeaders(resp) : resp;
+      })()
+    );
+  });
+}
+
+"""
+
+
+def patch_serviceworker(source: str, assets_dir_name: str) -> str | None:
+    """
+    Add a cache for the fingerprinted assets to the source of shinylive-sw.js, or return
+    None if it does not look as expected.
+
+    The cache is named after Shinylive's own, so that Shinylive's activate handler, which
+    deletes the caches of other service worker versions, keeps it.
+    """
+    version = re.search(r'^var version = "([^"]+)";$', source, re.MULTILINE)
+    cache_name = re.search(r'^var cacheName = "([^"]+)";$', source, re.MULTILINE)
+    if version is None or cache_name is None:
+        return None
+    snippet = _SERVICEWORKER_ASSETS_CACHE % {
+        "assets_dir_name": f'"{assets_dir_name}"',
+        "cache_name": f'"{version.group(1)}{cache_name.group(1)}::assets"',
+    }
+    return snippet + source
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # No file name or time in the header, so that the output only depends on data.
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    import brotli  # pyright: ignore[reportMissingImports]
+
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def precompress(
+    manifest: ExportManifest,
+    rel_paths: Iterable[str],
+    *,
+    jobs: int | None = None,
+    verbose_print: Callable[..., None] = lambda *args: None,
+) -> None:
+    """
+    Write .gz copies, and .br copies if the brotli package is installed, next to the
+    compressible files among `rel_paths`, for hosts that serve precompressed files.
+    Copies that are up to date with their file are left alone.
+    """
+    encodings = {"gzip": ".gz"}
+    try:
+        import brotli  # pyright: ignore[reportMissingImports, reportUnusedImport]
+
+        encodings["br"] = ".br"
+    except ImportError:
+        print(
+            "The brotli package is not installed; only writing .gz files.",
+            file=sys.stderr,
+        )
+
+    todo: list[tuple[Path, str, str]] = []
+    for rel_path in sorted(rel_paths):
+        source = manifest.destdir / rel_path
+        if (
+            Path(rel_path).suffix not in COMPRESSIBLE_SUFFIXES
+            or source.stat().st_size < MIN_COMPRESS_SIZE
+        ):
+            continue
+        for encoding, suffix in encodings.items():
+            if manifest.is_current(rel_path + suffix, source):
+                manifest.keep(rel_path + suffix)
+            else:
+                todo.append((source, rel_path + suffix, encoding))
+
+    def run(item: tuple[Path, str, str]) -> bytes:
+        source, _, encoding = item
+        return _compress(source.read_bytes(), encoding)
+
+    # Compression releases the GIL, so threads run in parallel.
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for (source, rel_path, _), data in zip(todo, pool.map(run, todo)):
+            with manifest.open(rel_path, "wb", source=source) as f:
+                f.write(data)
+            verbose_print(f"Compressed {rel_path}")
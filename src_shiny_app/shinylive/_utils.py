@@ -66,11 +66,14 @@ def copy_file_and_substitute(
     dest: str | Path,
     data: dict[str, object],
 ) -> None:
+    out_content = render_template(src, data)
+    with open(dest, "w") as fout:
+        fout.write(out_content)
+
+
+def render_template(src: str | Path, data: dict[str, object]) -> str:
     with open(src, "r", encoding="utf-8") as fin:
-        in_content = fin.read()
-        out_content = chevron.render(in_content, data)
-        with open(dest, "w") as fout:
-            fout.write(out_content)
+        return chevron.render(fin.read(), data)
 
 
 def create_copy_fn(
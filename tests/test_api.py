@@ -0,0 +1,100 @@
+import io
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("httpx")
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from fieldsim import api
+from fieldsim.api import FieldAPI
+from fieldsim.kernel import superpose
+
+CHARGES = [[0.0, 0.0, 1e-9], [1.0, 0.0, -1e-9]]
+GRID = {"x": [-2.0, 2.0, 5], "y": [-1.0, 1.0, 4]}
+
+
+def client(field_api=None):
+    return TestClient(Starlette(routes=(field_api or FieldAPI()).routes()))
+
+
+def test_json_response_matches_superposition():
+    with client() as c:
+        response = c.post("/api/field", json={"charges": CHARGES, "grid": GRID})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["shape"] == [4, 5]
+    x, y = np.meshgrid(body["x"], body["y"])
+    for key, expected in zip(("Ex", "Ey", "V"), superpose(np.array(CHARGES), x, y)):
+        np.testing.assert_allclose(body[key], expected, rtol=1e-12)
+
+
+def test_npy_response():
+    with client() as c:
+        response = c.post(
+            "/api/field", json={"config": "[(0, 0, 1e-9)]", "grid": GRID, "format": "npy"}
+        )
+    assert response.status_code == 200
+    assert response.headers["X-Field-Shape"] == "3,4,5"
+    # The client undoes the gzip content encoding.
+    values = np.load(io.BytesIO(response.content))
+    assert values.shape == (3, 4, 5) and values.dtype == np.dtype("<f4")
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        [1, 2, 3],
+        {},
+        {"charges": [[0, 0]]},
+        {"charges": [[0, 0, "q"]]},
+        {"config": "[(0, 0"},
+        {"charges": CHARGES, "grid": {"x": [1, 0, 5], "y": [0, 1, 5]}},
+        {"charges": CHARGES, "grid": {"x": [0, 1, 2.5], "y": [0, 1, 5]}},
+        {"charges": CHARGES, "grid": {"x": [0, 1, 2048], "y": [0, 1, 2048]}},
+        {"charges": CHARGES, "format": "xml"},
+    ],
+)
+def test_malformed_requests_are_rejected(payload):
+    with client() as c:
+        response = c.post("/api/field", json=payload)
+    assert response.status_code == 400
+    assert response.json()["error"]
+
+
+def test_non_json_body_is_rejected():
+    with client() as c:
+        response = c.post("/api/field", content=b"charges=1")
+    assert response.status_code == 400
+
+
+def test_saturated_api_answers_503(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    compute_field = api.compute_field
+
+    def blocking_compute_field(*args):
+        started.set()
+        release.wait(10)
+        return compute_field(*args)
+
+    monkeypatch.setattr(api, "compute_field", blocking_compute_field)
+    payload = {"charges": CHARGES, "grid": GRID}
+    with client(FieldAPI(workers=1, queue_limit=0)) as c:
+        statuses = []
+        first = threading.Thread(
+            target=lambda: statuses.append(c.post("/api/field", json=payload).status_code)
+        )
+        first.start()
+        assert started.wait(10)
+
+        busy = c.post("/api/field", json=payload)
+        assert busy.status_code == 503
+        assert busy.headers["Retry-After"] == "1"
+
+        release.set()
+        first.join(10)
+        assert statuses == [200]
+        # Once the worker is free again requests are served.
+        assert c.post("/api/field", json=payload).status_code == 200
@@ -0,0 +1,113 @@
+import base64
+import hashlib
+
+import pytest
+
+from shinylive._app_json import _installed_files, _is_ignored, _read_ignore_rules, list_app_files
+
+
+def rules(*lines, tmp_path):
+    ignore_file = tmp_path / ".shinyliveignore"
+    ignore_file.write_text("\n".join(lines) + "\n")
+    return _read_ignore_rules(ignore_file)
+
+
+@pytest.mark.parametrize(
+    "lines, path, is_dir, expected",
+    [
+        # Patterns without a slash match any part of the path.
+        (["*.csv"], "data/x.csv", False, True),
+        (["*.csv"], "data/x.csvx", False, False),
+        (["cache"], "a/cache/b.py", False, True),
+        # A trailing slash only matches directories, and what is inside them.
+        (["data/"], "data", False, False),
+        (["data/"], "data", True, True),
+        (["data/"], "data/x.py", False, True),
+        # A leading slash anchors the pattern at the top of the app.
+        (["/build"], "build/x.py", False, True),
+        (["/build"], "src/build/x.py", False, False),
+        # Patterns with a slash match the path from the top.
+        (["docs/*.md"], "docs/a.md", False, True),
+        (["docs/*.md"], "x/docs/a.md", False, False),
+        # The last matching rule wins.
+        (["*.csv", "!keep.csv"], "keep.csv", False, False),
+        (["*.csv", "!keep.csv"], "drop.csv", False, True),
+        (["!keep.csv", "*.csv"], "keep.csv", False, True),
+        (["# comment", "", "*.log"], "a.log", False, True),
+    ],
+)
+def test_is_ignored(lines, path, is_dir, expected, tmp_path):
+    assert _is_ignored(path, is_dir, rules(*lines, tmp_path=tmp_path), False) is expected
+
+
+def test_negation_brings_back_installed_files(tmp_path):
+    ignore = rules("!pkg/patched.py", tmp_path=tmp_path)
+    assert not _is_ignored("pkg/patched.py", False, ignore, True)
+    assert _is_ignored("pkg/other.py", False, ignore, True)
+    assert not _is_ignored("app.py", False, [], False)
+
+
+def record_hash(content):
+    digest = base64.urlsafe_b64encode(hashlib.sha256(content).digest()).rstrip(b"=")
+    return "sha256=" + digest.decode()
+
+
+def install(appdir, name, files):
+    """Lay out a distribution the way `pip install --target` does."""
+    dist_info = appdir / f"{name}-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(f"Name: {name}\n")
+    rows = [f"{dist_info.name}/METADATA,,", f"{dist_info.name}/RECORD,,"]
+    for path, content in files.items():
+        (appdir / path).parent.mkdir(parents=True, exist_ok=True)
+        (appdir / path).write_bytes(content)
+        rows.append(f"{path},{record_hash(content)},{len(content)}")
+    rows.append(f"../../bin/{name},,")
+    (dist_info / "RECORD").write_text("\n".join(rows) + "\n")
+    return dist_info
+
+
+def test_installed_files(tmp_path):
+    install(tmp_path, "alpha", {"alpha/__init__.py": b"A = 1\n", "alpha/data.txt": b"x"})
+    assert _installed_files(tmp_path) == {
+        "alpha/__init__.py",
+        "alpha/data.txt",
+        "alpha-1.0.dist-info/METADATA",
+        "alpha-1.0.dist-info/RECORD",
+    }
+
+
+def test_modified_distributions_stay_in_the_app(tmp_path, capsys):
+    install(tmp_path, "alpha", {"alpha/__init__.py": b"A = 1\n"})
+    install(tmp_path, "beta", {"beta/__init__.py": b"B = 1\n"})
+    (tmp_path / "beta/__init__.py").write_bytes(b"B = 2\n")
+    installed = _installed_files(tmp_path)
+    assert "alpha/__init__.py" in installed
+    assert not any(path.startswith("beta") for path in installed)
+    assert "beta-1.0.dist-info has files that differ" in capsys.readouterr().out
+
+
+def test_converted_line_endings_and_removed_files_are_not_changes(tmp_path):
+    # Installed with CRLF line endings, then checked out with LF.
+    files = {"alpha/__init__.py": b"A = 1\r\nB = 2\r\n", "alpha/gone.py": b""}
+    install(tmp_path, "alpha", files)
+    (tmp_path / "alpha/__init__.py").write_bytes(b"A = 1\nB = 2\n")
+    (tmp_path / "alpha/gone.py").unlink()
+    assert "alpha/__init__.py" in _installed_files(tmp_path)
+
+
+def test_list_app_files(tmp_path):
+    (tmp_path / "util.py").write_text("")
+    (tmp_path / "app.py").write_text("")
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data/big.csv").write_text("")
+    (tmp_path / "data/small.csv").write_text("")
+    (tmp_path / ".hidden").write_text("")
+    install(tmp_path, "alpha", {"alpha/__init__.py": b"A = 1\n", "alpha/patched.py": b""})
+    (tmp_path / ".shinyliveignore").write_text("big.csv\n!alpha/patched.py\n")
+    assert list_app_files(tmp_path, tmp_path / "out") == [
+        "app.py",
+        "util.py",
+        "alpha/patched.py",
+        "data/small.csv",
+    ]
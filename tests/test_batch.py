@@ -0,0 +1,53 @@
+import json
+
+from fieldsim import batch, engine
+from fieldsim.batch import MANIFEST_NAME, read_configs, render_batch
+
+
+def write_configs(source):
+    source.mkdir()
+    (source / "dipole.txt").write_text("[(-1, 0, 1), (1, 0, -1)]", encoding="utf-8")
+    (source / "single.py").write_text("[(0, 0, 1)]", encoding="utf-8")
+    (source / "broken.txt").write_text("[(0, 0", encoding="utf-8")
+    (source / "notes.md").write_text("not a configuration", encoding="utf-8")
+
+
+def test_read_configs(tmp_path):
+    write_configs(tmp_path / "configs")
+    assert [name for name, _ in read_configs(tmp_path / "configs")] == [
+        "broken",
+        "dipole",
+        "single",
+    ]
+    jsonl = tmp_path / "configs.jsonl"
+    jsonl.write_text(
+        '{"name": "a", "config": "[(0, 0, 1)]"}\n\n"[(1, 1, 1)]"\n', encoding="utf-8"
+    )
+    assert list(read_configs(jsonl)) == [("a", "[(0, 0, 1)]"), ("config-0003", "[(1, 1, 1)]")]
+
+
+def test_unchanged_images_are_skipped_until_the_engine_changes(tmp_path, monkeypatch):
+    source, dest = tmp_path / "configs", tmp_path / "images"
+    write_configs(source)
+
+    report = render_batch(source, dest, dpi=20, workers=1)
+    assert (report.rendered, report.skipped) == (2, 0)
+    assert [outcome.name for outcome in report.failed] == ["broken"]
+    assert sorted(p.name for p in dest.iterdir()) == [MANIFEST_NAME, "dipole.png", "single.png"]
+    manifest = json.loads((dest / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert sorted(manifest) == ["dipole.png", "single.png"]
+
+    report = render_batch(source, dest, dpi=20, workers=1)
+    assert (report.rendered, report.skipped, len(report.failed)) == (0, 2, 1)
+
+    (source / "single.py").write_text("[(0, 0, 2)]", encoding="utf-8")
+    report = render_batch(source, dest, dpi=20, workers=1)
+    assert (report.rendered, report.skipped) == (1, 1)
+
+    monkeypatch.setattr(engine, "ENGINE_VERSION", engine.ENGINE_VERSION + 1)
+    report = render_batch(source, dest, dpi=20, workers=1)
+    assert (report.rendered, report.skipped) == (2, 0)
+
+    monkeypatch.setattr(batch, "RENDER_VERSION", batch.RENDER_VERSION + 1)
+    assert render_batch(source, dest, fmt="svg", dpi=20, workers=1).rendered == 2
+    assert render_batch(source, dest, dpi=20, workers=1, force=True).rendered == 2
@@ -0,0 +1,159 @@
+import importlib
+import importlib.util
+import sys
+import zipfile
+
+import pytest
+
+from shinylive._bundle import (
+    BUNDLE_NAME,
+    PYC_UNCHECKED_HASH,
+    bundle_file_name,
+    bundled_pyodide_lock,
+    can_bundle,
+    write_bundle,
+)
+
+PYTHON = sys.version_info[:2]
+CACHE_TAG = "cpython-{}{}".format(*PYTHON)
+
+
+def make_wheel(path, files):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return path
+
+
+def pkg_info(name, **kwargs):
+    info = {
+        "name": name,
+        "version": "1.0",
+        "file_name": f"{name}-1.0-py3-none-any.whl",
+        "install_dir": "site",
+        "sha256": name * 4,
+        "package_type": "package",
+        "imports": [name],
+        "depends": [],
+        "shared_library": False,
+    }
+    info.update(kwargs)
+    return info
+
+
+@pytest.fixture
+def wheels(tmp_path):
+    return [
+        make_wheel(
+            tmp_path / "alpha-1.0-py3-none-any.whl",
+            {
+                "alpha/__init__.py": "VALUE = 'compiled'\n",
+                "alpha/template.py": "{% if python %}\n",
+                "alpha/data.txt": "data",
+                "shared.txt": "from alpha",
+            },
+        ),
+        make_wheel(
+            tmp_path / "beta-1.0-py3-none-any.whl",
+            {"beta/__init__.py": "from alpha import VALUE\n", "shared.txt": "from beta"},
+        ),
+    ]
+
+
+def test_bundle_has_unchecked_hash_pyc_files(tmp_path, wheels):
+    bundle = tmp_path / "bundle.zip"
+    with open(bundle, "wb") as f:
+        assert write_bundle(f, wheels, PYTHON) == 2
+
+    with zipfile.ZipFile(bundle) as zf:
+        names = set(zf.namelist())
+        pyc = zf.read(f"alpha/__pycache__/__init__.{CACHE_TAG}.pyc")
+        # The first wheel's copy of a file wins.
+        assert zf.read("shared.txt") == b"from alpha"
+    assert f"beta/__pycache__/__init__.{CACHE_TAG}.pyc" in names
+    # Not valid Python, so left as it is.
+    assert not any("template" in name and name.endswith(".pyc") for name in names)
+    assert pyc[:4] == importlib.util.MAGIC_NUMBER
+    assert int.from_bytes(pyc[4:8], "little") == PYC_UNCHECKED_HASH
+    assert pyc[8:16] == importlib.util.source_hash(b"VALUE = 'compiled'\n")
+
+
+def test_extracted_bundle_imports_from_pyc(tmp_path, wheels, monkeypatch):
+    bundle = tmp_path / "bundle.zip"
+    with open(bundle, "wb") as f:
+        write_bundle(f, wheels, PYTHON)
+    site = tmp_path / "site"
+    with zipfile.ZipFile(bundle) as zf:
+        zf.extractall(site)
+    # Extraction gives the sources new times; an unchecked .pyc is used anyway,
+    # which this edit makes visible.
+    (site / "alpha" / "__init__.py").write_text("VALUE = 'source'\n")
+
+    monkeypatch.syspath_prepend(str(site))
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    for name in ("alpha", "beta"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    assert importlib.import_module("beta").VALUE == "compiled"
+    for name in ("alpha", "beta"):
+        sys.modules.pop(name, None)
+
+
+def test_bundle_is_reproducible_and_sources_only_without_version(tmp_path, wheels):
+    contents = []
+    for i in range(2):
+        path = tmp_path / f"{i}.zip"
+        with open(path, "wb") as f:
+            assert write_bundle(f, wheels) == 0
+        contents.append(path.read_bytes())
+    assert contents[0] == contents[1]
+    with zipfile.ZipFile(tmp_path / "0.zip") as zf:
+        assert not any(name.endswith(".pyc") for name in zf.namelist())
+
+
+def test_pyc_files_need_the_running_python(tmp_path, wheels):
+    with open(tmp_path / "bundle.zip", "wb") as f, pytest.raises(ValueError):
+        write_bundle(f, wheels, (PYTHON[0], PYTHON[1] + 1))
+
+
+def test_can_bundle(tmp_path, wheels):
+    assert can_bundle(pkg_info("alpha"), wheels[0])
+    assert not can_bundle(pkg_info("alpha", shared_library=True), wheels[0])
+    assert not can_bundle(pkg_info("alpha", install_dir="dynlib"), wheels[0])
+    libs = make_wheel(tmp_path / "gamma.whl", {"gamma.libs/libx.so": b"\0"})
+    assert not can_bundle(pkg_info("gamma"), libs)
+
+
+def test_bundle_file_name_follows_the_packages():
+    infos = [pkg_info("alpha"), pkg_info("beta")]
+    name = bundle_file_name(infos, PYTHON)
+    assert name == bundle_file_name(infos[::-1], PYTHON)
+    assert name != bundle_file_name(infos, None)
+    assert name != bundle_file_name([pkg_info("alpha", sha256="x"), infos[1]], PYTHON)
+
+
+def test_bundled_pyodide_lock():
+    lock = {
+        "info": {},
+        "packages": {
+            "alpha": pkg_info("alpha", depends=["numpy"]),
+            "beta": pkg_info("beta", depends=["alpha"]),
+            "numpy": pkg_info("numpy"),
+            "app-user": pkg_info("app-user", depends=["beta", "alpha"]),
+        },
+    }
+    bundled = [lock["packages"]["alpha"], lock["packages"]["beta"]]
+    name = bundle_file_name(bundled, PYTHON)
+    result = bundled_pyodide_lock(lock, bundled, name, "abc")
+
+    assert set(result["packages"]) == {"numpy", "app-user", BUNDLE_NAME}
+    assert result["packages"]["app-user"]["depends"] == [BUNDLE_NAME]
+    bundle = result["packages"][BUNDLE_NAME]
+    assert bundle["file_name"] == name
+    assert bundle["version"] == name[len(BUNDLE_NAME) + 1 : -len(".zip")]
+    assert bundle["imports"] == ["alpha", "beta"]
+    assert bundle["depends"] == ["numpy"]
+    # The input is left alone.
+    assert "alpha" in lock["packages"]
+
+    with pytest.raises(ValueError):
+        bundled_pyodide_lock(lock, bundled, "packages.zip", "abc")
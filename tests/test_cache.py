@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from fieldsim import engine
+from fieldsim.cache import DiskCache
+from fieldsim.charges import parse_config
+from fieldsim.engine import compute_field
+
+
+def entry(size):
+    # np.save adds a 128-byte header.
+    return np.zeros((size - 128) // 8)
+
+
+def age(cache, key, seconds_ago):
+    t = 1_000_000_000 - seconds_ago
+    os.utime(cache.path(key), (t, t))
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=3 * 1024)
+    for i, key in enumerate("abc"):
+        cache.store(key, entry(1024))
+        age(cache, key, 100 - i)
+    # A hit makes "a" the most recently used.
+    assert cache.load("a") is not None
+    cache.store("d", entry(1024))
+    assert sorted(p.stem for p in tmp_path.glob("*.npy")) == ["a", "c", "d"]
+    assert cache.size() <= cache.max_bytes
+
+
+def test_entries_larger_than_the_cache_are_not_kept(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1024)
+    cache.store("a", entry(1024))
+    age(cache, "a", 10)
+    cache.store("b", entry(4096))
+    assert [p.stem for p in tmp_path.glob("*.npy")] == []
+    cache.store("c", entry(512))
+    assert [p.stem for p in tmp_path.glob("*.npy")] == ["c"]
+
+
+def test_unreadable_entries_are_misses(tmp_path):
+    cache = DiskCache(tmp_path)
+    assert cache.load("missing") is None
+    cache.path("broken").write_bytes(b"\x93NUMPY truncated")
+    assert cache.load("broken") is None
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_compute_field_round_trips(tmp_path):
+    cache = DiskCache(tmp_path)
+    config = parse_config("[(0, 0, 1), (1, 1, -1)]")
+    first = cache.compute_field(config)
+    assert cache.path(cache.key(config)).exists()
+    second = cache.compute_field(config)
+    direct = compute_field(config)
+    for name in ("Ex", "Ey", "V"):
+        np.testing.assert_array_equal(getattr(second, name), getattr(direct, name))
+        np.testing.assert_array_equal(getattr(first, name), getattr(direct, name))
+    # Hits are memory-mapped rather than read.
+    assert isinstance(second.Ex, np.memmap)
+
+
+def test_entries_of_another_engine_version_are_not_reused(tmp_path, monkeypatch):
+    config = parse_config("[(0, 0, 1)]")
+    key = DiskCache.key(config)
+    assert DiskCache.key(parse_config("[(0.0, 0.0, 1.0)]")) == key
+    monkeypatch.setattr(engine, "ENGINE_VERSION", engine.ENGINE_VERSION + 1)
+    assert DiskCache.key(config) != key
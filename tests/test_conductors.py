@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from fieldsim.conductors import IMAGE_ORDER, GroundedPlane, GroundedSphere, image_charges
+from fieldsim.kernel import superpose
+
+ONE = np.array([[1.0, 2.0, 1e-9]])
+SEVERAL = np.array([[1.0, 2.0, 1e-9], [-2.0, 1.5, -3e-9], [3.0, 4.0, 2e-9]])
+
+
+def residual(charges, conductors, x, y, order=IMAGE_ORDER):
+    # Largest potential on the surface, relative to that of the bare charges.
+    _, _, V = superpose(image_charges(charges, conductors, order), x, y)
+    _, _, bare = superpose(charges, x, y)
+    return np.abs(V).max() / np.abs(bare).max()
+
+
+def plane_points(plane, half=20.0, n=201):
+    t = np.linspace(-half, half, n)
+    return plane.x0 - t * plane.ny, plane.y0 + t * plane.nx
+
+
+def sphere_points(sphere, n=360):
+    a = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    return sphere.cx + sphere.radius * np.cos(a), sphere.cy + sphere.radius * np.sin(a)
+
+
+@pytest.mark.parametrize("charges", [ONE, SEVERAL], ids=["one", "several"])
+def test_plane_is_grounded(charges):
+    plane = GroundedPlane(0.0, 0.5, 0.3, 1.0)
+    assert residual(charges, [plane], *plane_points(plane)) < 1e-12
+
+
+@pytest.mark.parametrize("charges", [ONE, SEVERAL], ids=["one", "several"])
+def test_sphere_is_grounded(charges):
+    sphere = GroundedSphere(0.5, -1.0, 1.2)
+    assert residual(charges, [sphere], *sphere_points(sphere)) < 1e-12
+
+
+@pytest.mark.parametrize("charges", [ONE, SEVERAL], ids=["one", "several"])
+def test_plane_and_sphere_converge_with_order(charges):
+    plane = GroundedPlane(0.0, 0.0, 0.0, 1.0)
+    sphere = GroundedSphere(0.0, 3.0, 0.8)
+    points = [plane_points(plane), sphere_points(sphere)]
+    errors = [
+        max(residual(charges, [plane, sphere], x, y, order) for x, y in points)
+        for order in (1, 2, IMAGE_ORDER, 8)
+    ]
+    assert errors[2] < 2e-2
+    assert errors[0] > errors[2] > errors[3]
+
+
+def test_planes_at_right_angles_are_exact():
+    # The image behind the corner is reached through either plane; it must
+    # only be counted once.
+    floor = GroundedPlane(0.0, 0.0, 0.0, 1.0)
+    wall = GroundedPlane(0.0, 0.0, 1.0, 0.0)
+    charges = np.array([[1.0, 2.0, 1e-9], [2.0, 1.5, -3e-9], [3.0, 4.0, 2e-9]])
+    t = np.linspace(0, 20, 101)
+    for x, y in [(t, 0 * t), (0 * t, t)]:
+        assert residual(charges, [floor, wall], x, y) < 1e-12
+    images = image_charges(ONE, [floor, wall])
+    assert len(images) == 4
+    assert images[:, 2].sum() == pytest.approx(0.0, abs=1e-24)
+
+
+def test_coincident_charges_keep_their_own_images():
+    plane = GroundedPlane(0.0, 0.0, 0.0, 1.0)
+    twice = np.concatenate([ONE, ONE])
+    images = image_charges(twice, [plane])
+    np.testing.assert_allclose(images[2:], [[1.0, -2.0, -1e-9]] * 2)
@@ -0,0 +1,94 @@
+import pytest
+
+from shinylive import _deps
+from shinylive._deps import _find_import_graph_app_contents, explain_package_deps
+
+
+def text(name, content):
+    return {"name": name, "content": content, "type": "text"}
+
+
+def pkg_info(name, imports=None, depends=()):
+    return {"name": name, "imports": imports or [name], "depends": list(depends)}
+
+
+@pytest.fixture
+def lock(monkeypatch):
+    packages = {
+        "numpy": pkg_info("numpy"),
+        "pillow": pkg_info("Pillow", imports=["PIL"]),
+        "pandas": pkg_info("pandas", depends=["numpy"]),
+        "scipy": pkg_info("scipy", depends=["numpy"]),
+        "polars": pkg_info("polars"),
+        "requests": pkg_info("requests"),
+    }
+    _deps._module_to_package_key_mappings.cache_clear()
+    _deps._dep_name_to_dep_key_mappings.cache_clear()
+    monkeypatch.setattr(_deps, "_pyodide_lock_data", lambda: {"packages": packages})
+    yield packages
+    _deps._module_to_package_key_mappings.cache_clear()
+    _deps._dep_name_to_dep_key_mappings.cache_clear()
+
+
+APP = [
+    text("app.py", "import numpy as np\nfrom mylib import render\n"),
+    text("mylib/__init__.py", "from .render import render\n"),
+    text(
+        "mylib/render.py",
+        "import typing\n"
+        "if typing.TYPE_CHECKING:\n"
+        "    import polars\n"
+        "try:\n"
+        "    import requests\n"
+        "except ImportError:\n"
+        "    requests = None\n"
+        "def render():\n"
+        "    from PIL import Image\n"
+        "    from . import stats\n",
+    ),
+    text("mylib/stats.py", "import scipy.stats\n"),
+    # Not reachable from app.py.
+    text("mylib/unused.py", "import pandas\n"),
+    text("vendored/__init__.py", "import pandas\n"),
+]
+
+
+def test_import_graph_follows_lazy_imports():
+    found = _find_import_graph_app_contents(APP)
+    assert sorted(found) == [
+        ("PIL", "mylib/render.py", "lazy"),
+        ("mylib", "app.py", "module"),
+        ("numpy", "app.py", "module"),
+        # Only reached through an import inside a function, but imported at the
+        # top of its own module.
+        ("scipy", "mylib/stats.py", "module"),
+        ("typing", "mylib/render.py", "module"),
+    ]
+
+
+def test_explain_package_deps(lock):
+    reasons = explain_package_deps(APP)
+    assert reasons == {
+        "numpy": ["imported by app.py", "required by scipy"],
+        "pillow": ["imported inside a function in mylib/render.py"],
+        "scipy": ["imported by mylib/stats.py"],
+    }
+
+
+def test_top_level_files_count_in_full(lock):
+    app = [text("app.py", "def main():\n    import pandas\n"), text("helper.py", "import polars\n")]
+    assert explain_package_deps(app) == {
+        "pandas": ["imported by app.py"],
+        "numpy": ["required by pandas"],
+        "polars": ["imported by helper.py"],
+    }
+
+
+def test_include_exclude_and_requirements(lock):
+    app = [*APP, text("requirements.txt", "requests>=2\n")]
+    reasons = explain_package_deps(app, include=["polars"], exclude=["Pillow", "numpy"])
+    assert reasons == {
+        "scipy": ["imported by mylib/stats.py"],
+        "requests": ["listed in requirements.txt"],
+        "polars": ["included explicitly"],
+    }
@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+
+from fieldsim import distributions
+from fieldsim.charges import parse_config
+from fieldsim.distributions import Arc, Disc, Polygon, Segment, gauss_panels
+from fieldsim.kernel import K, superpose
+
+# Points around the shapes below, none of them on a shape.
+POINTS = np.array([[0.3, 1.7], [-2.5, 0.4], [3.1, -1.2], [0.9, -0.35], [-0.2, 4.0]])
+
+
+def fine_segment(x1, y1, x2, y2, lam1, lam2, panels=256):
+    """The segment as Gauss-Legendre point charges, summed by the direct kernel."""
+    t, w = gauss_panels(0.0, 1.0, panels)
+    length = np.hypot(x2 - x1, y2 - y1)
+    lam = lam1 + (lam2 - lam1) * t
+    return np.column_stack((x1 + (x2 - x1) * t, y1 + (y2 - y1) * t, lam * w * length))
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        (-1.0, 0.0, 1.0, 0.0, 1e-9, 1e-9),
+        (-0.5, -1.0, 1.5, 2.0, 2e-9, -1e-9),
+        (2.0, 1.0, -1.0, -0.5, 0.0, 3e-9),
+    ],
+)
+def test_segment_matches_direct_kernel(args):
+    Ex, Ey, V = Segment(*args).field(POINTS[:, 0], POINTS[:, 1])
+    ex, ey, v = superpose(fine_segment(*args), POINTS[:, 0], POINTS[:, 1])
+    scale = np.hypot(ex, ey).max()
+    np.testing.assert_allclose(Ex, ex, rtol=1e-9, atol=1e-9 * scale)
+    np.testing.assert_allclose(Ey, ey, rtol=1e-9, atol=1e-9 * scale)
+    np.testing.assert_allclose(V, v, rtol=1e-9)
+
+
+def test_segment_is_zero_on_itself():
+    Ex, Ey, V = Segment(-1.0, 0.0, 1.0, 0.0, 1e-9, 1e-9).field(
+        np.array([-1.0, 0.0, 1.0]), np.array([0.0, 0.0, 0.0])
+    )
+    assert not Ex.any() and not Ey.any() and not V.any()
+
+
+def test_arc_converges_to_direct_kernel():
+    arc = Arc(0.0, 0.0, 2.0, 30.0, 300.0, 1e-9, -2e-9)
+    Ex, Ey, V = arc.field(POINTS[:, 0], POINTS[:, 1])
+    ex, ey, v = superpose(arc._nodes(512), POINTS[:, 0], POINTS[:, 1])
+    np.testing.assert_allclose(np.hypot(Ex - ex, Ey - ey) / np.hypot(ex, ey), 0, atol=1e-6)
+    np.testing.assert_allclose(V, v, rtol=1e-6)
+
+
+def test_adaptive_refinement_is_chunked_not_skipped(monkeypatch):
+    arc = Arc(0.0, 0.0, 2.0, 0.0, 180.0, 1e-9, 1e-9)
+    x, y = np.meshgrid(np.linspace(-3, 3, 40), np.linspace(-3, 3, 40))
+    expected = arc.field(x, y)
+    # Less than one level's worth of pairs: every level is split into chunks.
+    monkeypatch.setattr(distributions, "QUAD_MAX_PAIRS", 300)
+    for actual, want in zip(arc.field(x, y), expected):
+        np.testing.assert_allclose(actual, want, rtol=1e-12, atol=1e-12 * np.abs(want).max())
+
+
+def test_disc_outside_matches_direct_kernel():
+    disc = Disc(0.5, -0.2, 1.5, 1e-9)
+    px, py = np.array([3.5, 0.5, -2.0, 12.0]), np.array([1.0, 1.6, -1.5, 3.0])
+    Ex, Ey, V = disc.field(px, py)
+    ex, ey, v = superpose(disc._nodes(64), px, py)
+    np.testing.assert_allclose(Ex, ex, rtol=1e-6, atol=1e-6 * np.abs(ex).max())
+    np.testing.assert_allclose(Ey, ey, rtol=1e-6, atol=1e-6 * np.abs(ey).max())
+    np.testing.assert_allclose(V, v, rtol=1e-6)
+
+
+def test_disc_inside_is_minus_gradient_of_potential():
+    disc = Disc(0.5, -0.2, 1.5, 1e-9)
+    px, py = np.array([0.8, 1.2, -0.5, 0.5]), np.array([0.0, -0.9, 0.3, 0.6])
+    Ex, Ey, V = disc.field(px, py)
+    h = 1e-6
+    dVdx = (disc.field(px + h, py)[2] - disc.field(px - h, py)[2]) / (2 * h)
+    dVdy = (disc.field(px, py + h)[2] - disc.field(px, py - h)[2]) / (2 * h)
+    np.testing.assert_allclose(Ex, -dVdx, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(Ey, -dVdy, rtol=1e-5, atol=1e-5)
+    # The potential inside is finite and converges under quadrature.
+    np.testing.assert_allclose(V, superpose(disc._nodes(128), px, py)[2], rtol=1e-3)
+
+
+def test_disc_centre_has_no_field():
+    Ex, Ey, V = Disc(0.0, 0.0, 1.0, 1e-9).field(np.array([0.0]), np.array([0.0]))
+    assert Ex[0] == 0 and Ey[0] == 0
+    np.testing.assert_allclose(V, 2 * np.pi * 9e9 * 1e-9)
+
+
+def polar_disc(disc, px, py, n=400):
+    """
+    The disc's field by quadrature in polar coordinates about each point, which
+    leaves only smooth integrals over the direction ``theta``: the charge along
+    a ray from ``r1`` to ``r2`` adds ``sigma (r2 - r1)`` to the potential and
+    ``-sigma log(r2 / r1)`` along the ray to the field.
+    """
+    out = []
+    for x, y in zip(px, py):
+        dx, dy = x - disc.cx, y - disc.cy
+        d2 = dx * dx + dy * dy
+        if d2 < disc.radius**2:
+            theta = np.arange(n) * (2 * np.pi / n)
+            w = np.full(n, 2 * np.pi / n)
+        else:
+            # Only the rays that hit the disc, with theta = phi + alpha sin(t)
+            # smoothing out the ends of the range.
+            phi = np.arctan2(-dy, -dx)
+            alpha = np.arcsin(disc.radius / np.sqrt(d2))
+            t, wt = np.polynomial.legendre.leggauss(n)
+            theta = phi + alpha * np.sin(t * np.pi / 2)
+            w = wt * np.pi / 2 * alpha * np.cos(t * np.pi / 2)
+        ux, uy = np.cos(theta), np.sin(theta)
+        b = ux * dx + uy * dy
+        root = np.sqrt(np.maximum(b * b - (d2 - disc.radius**2), 0))
+        r2 = -b + root
+        r1 = np.maximum(-b - root, 0)
+        # Inside, the log(r1) terms of opposite rays cancel.
+        log = np.log(r2) - np.log(np.where(r1 > 0, r1, 1))
+        ks = K * disc.sigma
+        out.append(
+            (-ks * (w * ux * log).sum(), -ks * (w * uy * log).sum(), ks * (w * (r2 - r1)).sum())
+        )
+    return np.array(out).T
+
+
+def test_disc_matches_polar_quadrature_off_axis():
+    disc = Disc(0.5, -0.2, 1.5, 1e-9)
+    px = np.array([0.8, 1.2, -0.5, 0.5, 1.9, 3.5, -2.0, 12.0, 2.1])
+    py = np.array([0.0, -0.9, 0.3, 0.6, -0.7, 1.0, -1.5, 3.0, -0.1])
+    for actual, expected in zip(disc.field(px, py), polar_disc(disc, px, py)):
+        np.testing.assert_allclose(actual, expected, rtol=1e-10, atol=1e-10 * np.abs(expected).max())
+
+
+TRIANGLE = ((0.0, 0.0), (2.0, 0.0), (0.0, 1.5))
+
+
+def test_polygon_density_varies_along_the_perimeter():
+    polygon = Polygon(TRIANGLE, 1e-9, 4e-9)
+    edges = polygon.edges()
+    # Edges 2, 2.5 and 1.5 long: the vertices are 1/3 and 3/4 of the way round.
+    np.testing.assert_allclose(
+        [(e.lam1, e.lam2) for e in edges],
+        [(1e-9, 2e-9), (2e-9, 3.25e-9), (3.25e-9, 4e-9)],
+        rtol=1e-12,
+    )
+    nodes = np.concatenate([fine_segment(e.x1, e.y1, e.x2, e.y2, e.lam1, e.lam2) for e in edges])
+    Ex, Ey, V = polygon.field(POINTS[:, 0], POINTS[:, 1])
+    ex, ey, v = superpose(nodes, POINTS[:, 0], POINTS[:, 1])
+    np.testing.assert_allclose(np.hypot(Ex - ex, Ey - ey) / np.hypot(ex, ey), 0, atol=1e-9)
+    np.testing.assert_allclose(V, v, rtol=1e-9)
+    # The total charge is the perimeter times the mean density.
+    assert polygon.nodes()[:, 2].sum() == pytest.approx(6 * 2.5e-9, rel=1e-12)
+
+
+def test_polygon_second_density_is_optional():
+    config = parse_config(f"[('polygon', {list(TRIANGLE)}, 1e-9)]")
+    assert config.distributions == [Polygon(TRIANGLE, 1e-9, 1e-9)]
+    config = parse_config(f"[('polygon', {list(TRIANGLE)}, 1e-9, 2e-9)]")
+    assert config.distributions == [Polygon(TRIANGLE, 1e-9, 2e-9)]
+    with pytest.raises(ValueError):
+        parse_config(f"[('polygon', {list(TRIANGLE)}, 1e-9, 2e-9, 3e-9)]")
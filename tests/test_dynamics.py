@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from fieldsim.dynamics import Particles, Simulation, direct_forces, tree_forces
+
+
+def particles(n, seed=0, clustered=False):
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-10, 10, (n, 2))
+    if clustered:
+        centers = rng.uniform(-10, 10, (5, 2))
+        pos = centers[rng.integers(5, size=n)] + rng.normal(0, 0.3, (n, 2))
+    q = rng.choice([-1.0, 1.0], n) * rng.uniform(0.5, 2, n)
+    return pos, q
+
+
+def relative_error(approx, exact):
+    return np.linalg.norm(approx - exact, axis=-1) / np.linalg.norm(exact, axis=-1)
+
+
+# theta, then bounds on the median relative force error, and on the largest
+# force and potential errors relative to the typical force and potential.
+# Mixed-sign nodes only carry a monopole and a dipole, so the worst particles,
+# whose forces nearly cancel, are well off.
+ACCURACY = [(0.3, 1e-3, 5e-3, 1e-2), (0.5, 5e-3, 5e-2, 5e-2), (0.8, 3e-2, 0.3, 0.15)]
+
+
+@pytest.mark.parametrize("clustered", [False, True])
+@pytest.mark.parametrize("theta, median_tol, force_tol, potential_tol", ACCURACY)
+def test_tree_matches_direct_forces(clustered, theta, median_tol, force_tol, potential_tol):
+    pos, q = particles(600, clustered=clustered)
+    F, P = direct_forces(pos, q)
+    tF, tP = tree_forces(pos, q, theta=theta)
+    assert np.median(relative_error(tF, F)) < median_tol
+    assert np.abs(tF - F).max() < force_tol * np.median(np.linalg.norm(F, axis=-1))
+    assert np.abs(tP - P).max() < potential_tol * np.abs(P).mean()
+
+
+def test_tree_error_shrinks_with_theta():
+    pos, q = particles(600, seed=1)
+    F, _ = direct_forces(pos, q)
+    errors = [relative_error(tree_forces(pos, q, theta=t)[0], F).mean() for t in (0.8, 0.5, 0.3)]
+    assert errors[0] > errors[1] > errors[2]
+
+
+def test_tree_is_exact_when_nothing_is_far():
+    # With theta = 0 every node is opened down to its particles.
+    pos, q = particles(200, seed=2)
+    F, P = direct_forces(pos, q)
+    tF, tP = tree_forces(pos, q, theta=0.0)
+    np.testing.assert_allclose(tF, F, rtol=1e-10, atol=1e-10 * np.abs(F).max())
+    np.testing.assert_allclose(tP, P, rtol=1e-10, atol=1e-10 * np.abs(P).max())
+
+
+def pair(distance=2.0, speed=0.1):
+    # Opposite charges on an eccentric bound orbit, with one close approach
+    # every ~5 time units.
+    return Particles(
+        pos=np.array([[-distance / 2, 0.0], [distance / 2, 0.0]]),
+        vel=np.array([[0.0, -speed], [0.0, speed]]),
+        q=np.array([1e-5, -1e-5]),
+        m=np.array([1.0, 1.0]),
+    )
+
+
+def worst_drift(simulation, duration=5.0, frame_time=0.1):
+    worst = 0.0
+    for _ in range(int(round(duration / frame_time))):
+        simulation.advance(frame_time)
+        worst = max(worst, abs(simulation.energy_drift()))
+    return worst
+
+
+@pytest.mark.parametrize("integrator", ["verlet", "leapfrog"])
+def test_energy_drift_is_second_order(integrator):
+    coarse = worst_drift(Simulation(pair(), integrator=integrator, eta=0.04))
+    fine = worst_drift(Simulation(pair(), integrator=integrator, eta=0.02))
+    assert coarse < 1e-3
+    # Halving the step size quarters the error.
+    assert 3 < coarse / fine < 5
+
+
+def test_energy_includes_the_fixed_charges():
+    particles = Particles(
+        pos=np.array([[1.0, 0.0]]), vel=np.array([[0.0, 0.2]]), q=np.array([-1e-5]), m=np.array([1.0])
+    )
+    simulation = Simulation(particles, np.array([[0.0, 0.0, 1e-5]]))
+    kq = 9e9 * 1e-5 * -1e-5
+    assert simulation.potential_energy() == pytest.approx(kq / np.hypot(1.0, 0.02))
+    assert worst_drift(simulation, duration=2.0) < 1e-3
+
+
+def test_time_step_follows_the_closest_encounter():
+    far = Simulation(pair(distance=2.0))
+    near = Simulation(pair(distance=0.2))
+    assert near.time_step() < far.time_step()
+
+    a_max = np.linalg.norm(far._acc, axis=1).max()
+    expected = far.eta * min(np.sqrt(far.softening / a_max), far.softening / 0.1)
+    assert far.time_step() == pytest.approx(expected)
+
+    # Nothing to resolve: one particle at rest.
+    alone = Particles(np.zeros((1, 2)), np.zeros((1, 2)), np.ones(1), np.ones(1))
+    assert Simulation(alone).time_step() == 1.0
+
+
+def test_advance_lands_on_the_target_time():
+    simulation = Simulation(pair())
+    simulation.advance(0.5)
+    assert simulation.t == pytest.approx(0.5, rel=1e-12)
+    steps = simulation.steps
+    simulation.advance(0.5, max_steps=3)
+    assert simulation.steps == steps + 3
+    assert simulation.t < 1.0
+
+
+def test_frames():
+    simulation = Simulation(pair())
+    frames = simulation.frames(0.25)
+    first = next(frames)
+    assert (first.t, first.steps, first.drift) == (0.0, 0, 0.0)
+    np.testing.assert_array_equal(first.pos, pair().pos)
+
+    later = [next(frames) for _ in range(4)]
+    np.testing.assert_allclose([f.t for f in later], [0.25, 0.5, 0.75, 1.0], rtol=1e-12)
+    assert all(a.steps < b.steps for a, b in zip(later, later[1:]))
+    # Frames are snapshots, not views of the moving particles.
+    assert not np.array_equal(later[0].pos, later[-1].pos)
+    assert later[-1].energy == pytest.approx(first.energy, rel=1e-3)
+
+    capped = Simulation(pair()).frames(0.25, max_steps_per_frame=5)
+    next(capped)
+    frame = next(capped)
+    assert frame.steps == 5
+    assert frame.t < 0.25
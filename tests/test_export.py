@@ -0,0 +1,85 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+
+from fieldsim import export
+from fieldsim.charges import parse_config
+from fieldsim.engine import compute_field
+from fieldsim.export import EXPORTS, aiter_chunks, csv_chunks, npz_chunks, vtk_chunks
+
+
+@pytest.fixture
+def field():
+    config = parse_config("[(-1, 0, 1e-9), (1, 0.5, -2e-9)]")
+    x, y = np.meshgrid(np.linspace(-3, 3, 31), np.linspace(-2, 2.5, 19))
+    return compute_field(config, (x, y))
+
+
+@pytest.fixture(params=[export.CHUNK_BYTES, 200], ids=["one chunk", "many chunks"])
+def chunk_bytes(request, monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_BYTES", request.param)
+    return request.param
+
+
+def test_npz_round_trip(field, chunk_bytes):
+    chunks = list(npz_chunks(field))
+    # Small chunks hold a grid row or two each.
+    assert (len(chunks) > 20) == (chunk_bytes == 200)
+    with np.load(io.BytesIO(b"".join(chunks))) as data:
+        assert sorted(data.files) == ["Ex", "Ey", "V", "x", "y"]
+        np.testing.assert_array_equal(data["x"], field.x[0])
+        np.testing.assert_array_equal(data["y"], field.y[:, 0])
+        for key in ("Ex", "Ey", "V"):
+            np.testing.assert_array_equal(data[key], getattr(field, key))
+
+
+def test_csv_round_trip(field, chunk_bytes):
+    text = b"".join(csv_chunks(field)).decode()
+    assert text.startswith("x,y,Ex,Ey,V\n")
+    rows = np.loadtxt(io.StringIO(text), delimiter=",", skiprows=1)
+    assert rows.shape == (field.x.size, 5)
+    for column, key in zip(rows.T, ("x", "y", "Ex", "Ey", "V")):
+        np.testing.assert_allclose(column, getattr(field, key).ravel(), rtol=1e-8)
+
+
+def test_vtk_round_trip(field, chunk_bytes):
+    data = b"".join(vtk_chunks(field))
+    m, n = field.x.shape
+    header, rest = data.split(b"LOOKUP_TABLE default\n", 1)
+    lines = header.decode("ascii").splitlines()
+    assert lines[:4] == [
+        "# vtk DataFile Version 3.0",
+        "fieldsim",
+        "BINARY",
+        "DATASET STRUCTURED_POINTS",
+    ]
+    assert f"DIMENSIONS {n} {m} 1" in lines
+    assert f"POINT_DATA {m * n}" in lines
+    origin = [float(v) for v in lines[5].split()[1:]]
+    spacing = [float(v) for v in lines[6].split()[1:]]
+    assert origin == [field.x[0, 0], field.y[0, 0], 0.0]
+    assert spacing == pytest.approx([0.2, 0.25, 1.0])
+
+    scalars, rest = rest[: 4 * m * n], rest[4 * m * n :]
+    assert rest.startswith(b"\nVECTORS E float\n")
+    vectors = rest[len(b"\nVECTORS E float\n") :]
+    assert len(vectors) == 12 * m * n + 1 and vectors.endswith(b"\n")
+    V = np.frombuffer(scalars, dtype=">f4").reshape(m, n)
+    E = np.frombuffer(vectors[:-1], dtype=">f4").reshape(m, n, 3)
+    np.testing.assert_allclose(V, field.V, rtol=1e-6)
+    np.testing.assert_allclose(E[..., 0], field.Ex, rtol=1e-6)
+    np.testing.assert_allclose(E[..., 1], field.Ey, rtol=1e-6)
+    assert not E[..., 2].any()
+
+
+def test_exports_are_streamed_off_the_event_loop(field, chunk_bytes):
+    async def collect(chunks):
+        return [chunk async for chunk in aiter_chunks(chunks)]
+
+    for item in EXPORTS.values():
+        expected = list(item.chunks(field))
+        streamed = asyncio.run(collect(item.chunks(field)))
+        assert all(streamed)
+        assert b"".join(streamed) == b"".join(expected)
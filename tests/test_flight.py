@@ -0,0 +1,178 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fieldsim.flight import FlightStats, SingleFlight
+
+
+@pytest.fixture
+def executor():
+    # One worker, so a blocked job keeps later ones from starting.
+    with ThreadPoolExecutor(1) as executor:
+        yield executor
+
+
+def blocker():
+    release = threading.Event()
+    return release, lambda: release.wait(5)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_callers_share_one_computation(executor):
+    calls = []
+
+    def compute(x):
+        calls.append(x)
+        return x * 2
+
+    async def main():
+        flights = SingleFlight(executor)
+        results = await asyncio.gather(*(flights.run("k", compute, 21) for _ in range(5)))
+        return flights, results
+
+    flights, results = asyncio.run(main())
+    assert results == [42] * 5
+    assert calls == [21]
+    assert flights.snapshot() == FlightStats(computed=1, shared=4)
+    assert flights.in_flight() == 0
+
+
+def test_cancelling_one_waiter_leaves_the_others(executor):
+    release, wait = blocker()
+
+    async def main():
+        flights = SingleFlight(executor)
+        first = asyncio.ensure_future(flights.run("k", lambda: wait() and "done"))
+        second = asyncio.ensure_future(flights.run("k", lambda: "other"))
+        await settle()
+        first.cancel()
+        await settle()
+        release.set()
+        return flights, first, await second
+
+    flights, first, result = asyncio.run(main())
+    assert first.cancelled()
+    assert result == "done"
+    stats = flights.snapshot()
+    assert (stats.computed, stats.shared, stats.cancelled, stats.abandoned) == (1, 1, 1, 0)
+
+
+def test_last_waiter_leaving_drops_a_pending_computation(executor):
+    release, wait = blocker()
+    calls = []
+
+    async def main():
+        flights = SingleFlight(executor)
+        running = asyncio.ensure_future(flights.run("busy", wait))
+        pending = asyncio.ensure_future(flights.run("k", calls.append, 1))
+        await settle()
+        pending.cancel()
+        await settle()
+        release.set()
+        await running
+        # A new caller starts afresh instead of joining the dropped computation.
+        await flights.run("k", calls.append, 2)
+        return flights
+
+    flights = asyncio.run(main())
+    assert calls == [2]
+    stats = flights.snapshot()
+    assert (stats.computed, stats.cancelled, stats.abandoned) == (3, 1, 1)
+    assert flights.in_flight() == 0
+
+
+def test_running_computation_is_left_to_finish(executor):
+    release, wait = blocker()
+    started = threading.Event()
+
+    def compute():
+        started.set()
+        wait()
+        return "late"
+
+    async def main():
+        flights = SingleFlight(executor)
+        first = asyncio.ensure_future(flights.run("k", compute))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        first.cancel()
+        await settle()
+        # It cannot be interrupted, so a caller arriving meanwhile joins it.
+        second = asyncio.ensure_future(flights.run("k", lambda: "fresh"))
+        await settle()
+        release.set()
+        return flights, await second
+
+    flights, result = asyncio.run(main())
+    assert result == "late"
+    stats = flights.snapshot()
+    assert (stats.computed, stats.shared, stats.cancelled, stats.abandoned) == (1, 1, 1, 0)
+
+
+def test_failures_reach_every_waiter(executor):
+    def fail():
+        raise ValueError("boom")
+
+    async def main():
+        flights = SingleFlight(executor)
+        return flights, await asyncio.gather(
+            flights.run("k", fail), flights.run("k", fail), return_exceptions=True
+        )
+
+    flights, results = asyncio.run(main())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert flights.snapshot().failed == 1
+
+
+def test_app_sessions_share_the_field_computation(monkeypatch):
+    pytest.importorskip("shiny")
+    from fieldsim import flight
+    from fieldsim.engine import compute_field
+    from fieldsim.load import MockSession, load_app
+
+    sessions = 4
+    release = threading.Event()
+    calls = []
+
+    def compute(config):
+        calls.append(config)
+        # Held until every session has asked for the field, which they can only
+        # do if the first one is not awaiting it inside the reactive lock.
+        release.wait(10)
+        return compute_field(config)
+
+    flights = SingleFlight()
+    monkeypatch.setattr(flight, "field_flights", flights)
+    monkeypatch.setattr(flight, "field_cache", None)
+    monkeypatch.setattr(flight, "compute_field", compute)
+    data = {
+        ".clientdata_pixelratio": 1,
+        "charge_input": "[(0, 1, -2), (-1, 2, 3), (4, -1, 7), (0, 0, -1)]",
+        ".clientdata_output_canvas_hidden": False,
+        ".clientdata_output_canvas_width": 600,
+        ".clientdata_output_canvas_height": 400,
+    }
+
+    async def main():
+        app = load_app()
+        opened = [MockSession(app) for _ in range(sessions)]
+        opening = asyncio.gather(*(session.open(data) for session in opened))
+        for _ in range(500):
+            if flights.snapshot().shared == sessions - 1:
+                break
+            await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.wait_for(opening, 30)
+        for session in opened:
+            await session.close()
+
+    asyncio.run(main())
+    assert len(calls) == 1
+    assert flights.snapshot().computed == 1
+    assert flights.snapshot().shared == sessions - 1
@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from shinylive._manifest import MANIFEST_FILE, ExportManifest, file_sha256
+
+
+@pytest.fixture
+def src(tmp_path):
+    src = tmp_path / "src"
+    (src / "pyodide").mkdir(parents=True)
+    (src / "a.js").write_text("a")
+    (src / "pyodide" / "b.whl").write_bytes(b"b" * 100)
+    return src
+
+
+def export(src, dest, app=".", **kwargs):
+    manifest = ExportManifest(dest)
+    manifest.copy_files(
+        [(src / "a.js", "shinylive/a.js"), (src / "pyodide" / "b.whl", "shinylive/b.whl")],
+        **kwargs,
+    )
+    manifest.prune(app)
+    manifest.save()
+    return manifest
+
+
+def test_unchanged_files_are_skipped(src, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    first = export(src, dest)
+    assert (first.copied, first.skipped) == (2, 0)
+    mtime = (dest / "shinylive/a.js").stat().st_mtime_ns
+
+    second = export(src, dest)
+    assert (second.copied, second.skipped) == (0, 2)
+    assert (dest / "shinylive/a.js").stat().st_mtime_ns == mtime
+
+
+def test_changed_sources_and_destinations_are_copied(src, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    export(src, dest)
+    (src / "a.js").write_text("changed")
+    (dest / "shinylive/b.whl").write_bytes(b"tampered")
+    manifest = export(src, dest)
+    assert (manifest.copied, manifest.skipped) == (2, 0)
+    assert (dest / "shinylive/a.js").read_text() == "changed"
+    assert (dest / "shinylive/b.whl").read_bytes() == b"b" * 100
+    assert manifest.entries["shinylive/a.js"]["sha256"] == file_sha256(src / "a.js")
+
+
+def test_touched_source_with_same_content_is_not_copied(src, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    export(src, dest)
+    os.utime(src / "a.js", ns=(1, 1))
+    manifest = export(src, dest)
+    assert (manifest.copied, manifest.skipped) == (0, 2)
+
+
+def test_links_are_replaced_not_written_through(src, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    export(src, dest, link=True)
+    assert (dest / "shinylive/b.whl").stat().st_ino == (src / "pyodide/b.whl").stat().st_ino
+    manifest = ExportManifest(dest)
+    with manifest.open("shinylive/b.whl", "wb") as f:
+        f.write(b"generated")
+    assert (dest / "shinylive/b.whl").read_bytes() == b"generated"
+    assert (src / "pyodide/b.whl").read_bytes() == b"b" * 100
+
+
+def test_generated_files_are_only_replaced_when_they_change(tmp_path):
+    manifest = ExportManifest(tmp_path)
+    with manifest.open("app.json") as f:
+        f.write("{}")
+    mtime = (tmp_path / "app.json").stat().st_mtime_ns
+    with manifest.open("app.json") as f:
+        f.write("{}")
+    assert (manifest.copied, manifest.skipped) == (1, 1)
+    assert (tmp_path / "app.json").stat().st_mtime_ns == mtime
+    assert [p.name for p in tmp_path.iterdir()] == ["app.json"]
+
+
+def test_prune_removes_files_no_app_uses(src, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    export(src, dest, app=".")
+    manifest = ExportManifest(dest)
+    manifest.copy_files([(src / "a.js", "shinylive-1234/a.js")])
+    manifest.prune("other")
+    manifest.save()
+
+    # Both apps use their own files.
+    assert (dest / "shinylive/b.whl").exists() and (dest / "shinylive-1234/a.js").exists()
+
+    # Exporting "other" again without it leaves nothing using shinylive-1234/.
+    manifest = ExportManifest(dest)
+    manifest.copy_files([(src / "a.js", "shinylive/a.js")])
+    assert manifest.prune("other") == 1
+    manifest.save()
+    assert not (dest / "shinylive-1234").exists()
+    assert (dest / "shinylive/b.whl").exists()
+    assert sorted(ExportManifest(dest).entries) == ["shinylive/a.js", "shinylive/b.whl"]
+
+
+def test_prune_leaves_files_changed_since(src, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    export(src, dest, app="one")
+    (dest / "shinylive/a.js").write_text("edited by hand")
+    manifest = ExportManifest(dest)
+    manifest.prune("one")
+    assert (dest / "shinylive/a.js").read_text() == "edited by hand"
+    assert not (dest / "shinylive/b.whl").exists()
+    assert manifest.entries == {}
+
+
+def test_unreadable_manifest_is_ignored(tmp_path):
+    (tmp_path / MANIFEST_FILE).write_text("{not json")
+    assert ExportManifest(tmp_path).entries == {}
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from fieldsim.monitor import LoopMonitor
+
+
+def busy(seconds):
+    # Hold the event loop, as a slow synchronous render would.
+    time.sleep(seconds)
+
+
+def test_heartbeat_measures_lag():
+    monitor = LoopMonitor(enabled=True, interval=0.01)
+
+    async def main():
+        monitor.ensure_heartbeat()
+        first = monitor._heartbeat
+        monitor.ensure_heartbeat()
+        assert monitor._heartbeat is first
+        await asyncio.sleep(0.05)
+        busy(0.2)
+        await asyncio.sleep(0.05)
+        first.cancel()
+
+    asyncio.run(main())
+    assert monitor.beats >= 3
+    assert 0.15 < monitor.max_lag < 1.0
+    assert sorted(monitor.lag)[len(monitor.lag) // 2] < 0.1
+
+
+def test_callbacks_are_timed_per_step(caplog):
+    monitor = LoopMonitor(enabled=True, threshold=0.1)
+
+    async def render():
+        busy(0.02)
+        await asyncio.sleep(0.05)
+        busy(0.15)
+        return "done"
+
+    async def main():
+        return await monitor.timed("effect", lambda: "output plot", "s1", render())
+
+    with caplog.at_level(logging.WARNING, logger="fieldsim.monitor"):
+        assert asyncio.run(main()) == "done"
+    stats = monitor.callbacks[("effect", "output plot")]
+    assert stats.runs == 1 and stats.slow == 1
+    # The longest stretch counts, not the time spent waiting in between.
+    assert 0.15 <= stats.max_held < 0.2
+    assert "effect output plot held the event loop" in caplog.text
+    assert "session s1" in caplog.text
+
+
+def test_failures_and_cancellation_are_recorded():
+    monitor = LoopMonitor(enabled=True, threshold=1.0)
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("bad")
+
+    async def wait_forever():
+        await asyncio.sleep(10)
+
+    async def run_field():
+        await monitor.timed("calc", lambda: "field", None, wait_forever())
+
+    async def main():
+        with pytest.raises(ValueError):
+            await monitor.timed("calc", lambda: "config", None, fail())
+        task = asyncio.create_task(run_field())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert monitor.callbacks[("calc", "config")].runs == 1
+    assert monitor.callbacks[("calc", "field")].runs == 1
+    assert not monitor.recent
+
+
+def test_snapshot():
+    monitor = LoopMonitor(enabled=True, threshold=0.1)
+    for lag in (0.0, 0.01, 0.02, 0.5):
+        monitor.record_lag(lag)
+    monitor.record_callback("effect", "output plot", "s1", 0.3)
+    monitor.record_callback("effect", "output plot", "s2", 0.05)
+    monitor.record_callback("calc", "field", "s1", 0.2)
+    monitor.record_callback("calc", "config", "s1", 0.001)
+
+    snapshot = monitor.snapshot()
+    assert snapshot["threshold"] == 0.1
+    assert snapshot["lag"]["beats"] == 4 and snapshot["lag"]["max"] == 0.5
+    assert snapshot["lag"]["p50"] == pytest.approx(0.015)
+    assert [c["label"] for c in snapshot["callbacks"]] == ["output plot", "field", "config"]
+    plot = snapshot["callbacks"][0]
+    assert (plot["runs"], plot["slow"]) == (2, 1)
+    assert plot["total_held"] == pytest.approx(0.35)
+    # Most recent slow callback first.
+    assert [(s["label"], s["session"]) for s in snapshot["slow"]] == [
+        ("field", "s1"),
+        ("output plot", "s1"),
+    ]
+
+
+def test_empty_snapshot():
+    snapshot = LoopMonitor().snapshot()
+    assert snapshot["lag"]["beats"] == 0 and "p50" not in snapshot["lag"]
+    assert snapshot["callbacks"] == [] and snapshot["slow"] == []
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldsim.charges import config_key, parse_config
+from fieldsim.engine import compute_field, engine_hash
+from fieldsim.presets import INDEX_NAME, PRESETS, PresetStore, build_presets
+
+GALLERY = Path(__file__).parents[1] / "src_shiny_app" / "www" / "presets"
+
+
+def test_committed_gallery_is_current():
+    # If this fails, rebuild it with `python -m fieldsim presets www/presets`.
+    index = json.loads((GALLERY / INDEX_NAME).read_text(encoding="utf-8"))
+    assert index["engine"] == engine_hash()
+    assert index["presets"] == {
+        name: config_key(parse_config(preset.text)) for name, preset in PRESETS.items()
+    }
+
+
+@pytest.mark.parametrize("name", PRESETS)
+def test_committed_fields_match_the_engine(name):
+    # Catches engine changes that should have bumped ENGINE_VERSION.
+    field = compute_field(parse_config(PRESETS[name].text))
+    stored = np.load(GALLERY / (name + ".npy"))
+    for values, expected in zip(stored, (field.Ex, field.Ey, field.V)):
+        np.testing.assert_allclose(values, expected, rtol=1e-9, atol=1e-9 * np.abs(expected).max())
+
+
+def test_store_matches_any_spelling_of_a_preset():
+    store = PresetStore(GALLERY)
+    assert store.match(parse_config("[(-1.0, 0.0, 1), (1, 0, -1.0)]")) == "dipole"
+    assert store.match(parse_config("[(-1, 0, 1), (1, 0, -2)]")) is None
+    config = parse_config(PRESETS["dipole"].text)
+    field = store.field("dipole", config)
+    assert field.Ex.shape == field.x.shape == compute_field(config).x.shape
+
+
+def test_store_ignores_a_gallery_from_another_engine(tmp_path):
+    build_presets(tmp_path, dpi=20)
+    dipole = parse_config(PRESETS["dipole"].text)
+    assert PresetStore(tmp_path).match(dipole) == "dipole"
+
+    index_file = tmp_path / INDEX_NAME
+    index = json.loads(index_file.read_text(encoding="utf-8"))
+    index["engine"] = "0" * 16
+    index_file.write_text(json.dumps(index), encoding="utf-8")
+    assert PresetStore(tmp_path).match(dipole) is None
+    assert PresetStore(tmp_path / "missing").match(dipole) is None
@@ -0,0 +1,101 @@
+import io
+import zlib
+
+import numpy as np
+import pytest
+
+from fieldsim.charges import parse_config
+from fieldsim.engine import compute_field
+from fieldsim.raster import (
+    LEVELS,
+    MARKER_EDGE,
+    MARKER_FILL,
+    PALETTES,
+    encode_png,
+    fit_size,
+    heatmap_png,
+    resample,
+    scale_magnitude,
+    scale_potential,
+)
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(scope="module")
+def field():
+    # Wider than tall, with the positive charge near the top left.
+    config = parse_config("[(-2, 1, 1e-9), (2, -1, -1e-9)]")
+    x, y = np.meshgrid(np.linspace(-4, 4, 81), np.linspace(-2, 2, 41))
+    return compute_field(config, (x, y))
+
+
+def decode(png):
+    image = Image.open(io.BytesIO(png))
+    image.load()
+    return image
+
+
+def test_encode_png_round_trip():
+    rng = np.random.default_rng(0)
+    index = rng.integers(0, 256, (7, 13), dtype=np.uint8)
+    png = encode_png(index, PALETTES["potential"])
+    image = decode(png)
+    assert image.mode == "P" and image.size == (13, 7)
+    np.testing.assert_array_equal(np.asarray(image), index)
+    palette = np.frombuffer(bytes(image.getpalette()), dtype=np.uint8).reshape(-1, 3)
+    np.testing.assert_array_equal(palette[:256], PALETTES["potential"])
+
+    # Every chunk carries a valid CRC.
+    pos = 8
+    while pos < len(png):
+        length = int.from_bytes(png[pos : pos + 4], "big")
+        body = png[pos + 4 : pos + 8 + length]
+        assert zlib.crc32(body) == int.from_bytes(png[pos + 8 + length : pos + 12 + length], "big")
+        pos += 12 + length
+    assert pos == len(png)
+
+
+@pytest.mark.parametrize("quantity", ["magnitude", "potential"])
+def test_heatmap_png_fits_and_decodes(field, quantity):
+    png, w, h = heatmap_png(field, 300, 300, quantity, markers=False)
+    assert (w, h) == (300, 150)
+    image = decode(png)
+    assert image.size == (w, h)
+    assert np.asarray(image).max() < LEVELS
+
+
+def test_heatmap_is_upright_with_markers(field):
+    png, w, h = heatmap_png(field, 400, 200, "potential")
+    index = np.asarray(decode(png))
+    # The positive charge at (-2, 1) is a quarter of the way across and down.
+    ys, xs = np.nonzero(index == MARKER_FILL)
+    assert len(xs)
+    top_left = (xs < w / 2) & (ys < h / 2)
+    assert abs(xs[top_left].mean() - w / 4) < 2 and abs(ys[top_left].mean() - h / 4) < 2
+    assert (index == MARKER_EDGE).any()
+    # Positive potential above the middle on the left, negative on the right.
+    assert index[h // 4, w // 8] > LEVELS / 2 > index[3 * h // 4, 7 * w // 8]
+
+
+def test_scales(field):
+    magnitude = scale_magnitude(field)
+    assert magnitude.min() == 0 and magnitude.max() == 1
+    potential = scale_potential(field)
+    assert potential.min() >= 0 and potential.max() <= 1
+    # Leave out the rounding noise along the zero line between the charges.
+    clear = np.abs(field.V) > 1e-9 * np.abs(field.V).max()
+    np.testing.assert_array_equal(np.sign(potential - 0.5)[clear], np.sign(field.V)[clear])
+
+
+def test_resample_is_bilinear():
+    y, x = np.mgrid[0:5, 0:9].astype(float)
+    values = 2 * x - 3 * y + 1
+    out = resample(values, 17, 33)
+    expected = 2 * np.linspace(0, 8, 33)[None, :] - 3 * np.linspace(0, 4, 17)[:, None] + 1
+    np.testing.assert_allclose(out, expected, atol=1e-5)
+
+
+def test_fit_size(field):
+    assert fit_size(field, 1000, 100) == (200, 100)
+    assert fit_size(field, 100, 1000) == (100, 50)
@@ -0,0 +1,121 @@
+import gzip
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from shinylive._manifest import ExportManifest
+from shinylive._static import (
+    MIN_COMPRESS_SIZE,
+    fingerprint_dir_name,
+    patch_serviceworker,
+    precompress,
+    rewrite_asset_references,
+)
+
+
+def test_fingerprint_dir_name():
+    files = [("shinylive/a.js", "aa"), ("shinylive/b.css", "bb")]
+    name = fingerprint_dir_name(files)
+    assert name.startswith("shinylive-") and len(name) == len("shinylive-") + 12
+    assert fingerprint_dir_name(reversed(files)) == name
+    assert fingerprint_dir_name([files[0], ("shinylive/b.css", "bc")]) != name
+    # Paths and hashes are separated, not just run together.
+    assert fingerprint_dir_name([("shinylive/a.jsb", "b.css")]) != fingerprint_dir_name(
+        [("shinylive/a.js", "bb.css")]
+    )
+
+
+def test_rewrite_asset_references():
+    html = (
+        '<script src="./shinylive/load-shinylive-sw.js" type="module"></script>\n'
+        "<link href='shinylive/style.css'>\n"
+        '<script src="/shinylive/shinylive.js"></script>\n'
+        "<p>Made with shinylive/Pyodide, see myshinylive/ and shinylive-sw.js</p>\n"
+    )
+    assert rewrite_asset_references(html, "shinylive-0123") == (
+        '<script src="./shinylive-0123/load-shinylive-sw.js" type="module"></script>\n'
+        "<link href='shinylive-0123/style.css'>\n"
+        '<script src="/shinylive-0123/shinylive.js"></script>\n'
+        "<p>Made with shinylive/Pyodide, see myshinylive/ and shinylive-sw.js</p>\n"
+    )
+
+
+SERVICEWORKER = """\
+var version = "v9";
+var cacheName = "::shinyliveServiceworker";
+self.addEventListener("fetch", () => {});
+"""
+
+
+def test_patch_serviceworker():
+    patched = patch_serviceworker(SERVICEWORKER, "shinylive-0123")
+    assert patched is not None and patched.endswith(SERVICEWORKER)
+    assert 'const assetsDirName = "shinylive-0123";' in patched
+    # Named after Shinylive's own cache, so its activate handler keeps it.
+    assert 'const assetsCacheName = "v9::shinyliveServiceworker::assets";' in patched
+    assert patch_serviceworker("self.addEventListener('fetch', f);\n", "shinylive-0123") is None
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_patched_serviceworker_is_valid_javascript(tmp_path):
+    script = tmp_path / "shinylive-sw.js"
+    script.write_text(patch_serviceworker(SERVICEWORKER, "shinylive-0123"))
+    subprocess.run(["node", "--check", str(script)], check=True)
+
+
+@pytest.fixture
+def dest(tmp_path):
+    dest = tmp_path / "dest"
+    (dest / "shinylive").mkdir(parents=True)
+    (dest / "shinylive/big.js").write_text("let x = 1;\n" * 500)
+    (dest / "shinylive/small.js").write_text("let x = 1;\n")
+    (dest / "shinylive/pkg.whl").write_bytes(b"\0" * 2 * MIN_COMPRESS_SIZE)
+    return dest
+
+
+FILES = ["shinylive/big.js", "shinylive/small.js", "shinylive/pkg.whl"]
+
+
+def export(dest):
+    manifest = ExportManifest(dest)
+    manifest.touched.update(FILES)
+    precompress(manifest, FILES)
+    manifest.prune(".")
+    manifest.save()
+    return manifest
+
+
+def compressed(dest):
+    return sorted(p.name for p in (dest / "shinylive").glob("*.[gb][zr]"))
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    # The output should not depend on whether brotli happens to be installed.
+    monkeypatch.setitem(sys.modules, "brotli", None)
+
+
+def test_precompress(dest, no_brotli, capsys):
+    export(dest)
+    assert compressed(dest) == ["big.js.gz"]
+    big = (dest / "shinylive/big.js").read_bytes()
+    data = (dest / "shinylive/big.js.gz").read_bytes()
+    assert gzip.decompress(data) == big
+    # Reproducible: no time in the header.
+    assert data[4:8] == b"\0\0\0\0"
+    assert "only writing .gz files" in capsys.readouterr().err
+
+
+def test_precompressed_copies_survive_unchanged_exports(dest, no_brotli):
+    export(dest)
+    mtime = (dest / "shinylive/big.js.gz").stat().st_mtime_ns
+    second = export(dest)
+    assert compressed(dest) == ["big.js.gz"]
+    assert (dest / "shinylive/big.js.gz").stat().st_mtime_ns == mtime
+    assert second.copied == 0
+
+    (dest / "shinylive/big.js").write_text("let y = 2;\n" * 500)
+    export(dest)
+    assert gzip.decompress((dest / "shinylive/big.js.gz").read_bytes()).startswith(b"let y")
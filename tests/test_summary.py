@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from fieldsim.charges import parse_config
+from fieldsim.kernel import K
+from fieldsim.summary import summarize
+
+
+def test_pair_forces_and_energies():
+    summary = summarize(parse_config("[(0, 0, 2e-9), (3, 4, -1e-9)]"))
+    coulomb = K * 2e-9 * -1e-9 / 25
+    # Attraction along the line joining them, equal and opposite.
+    np.testing.assert_allclose(summary.forces[0], -coulomb * np.array([0.6, 0.8]))
+    np.testing.assert_allclose(summary.forces[1], coulomb * np.array([0.6, 0.8]))
+    pair_energy = K * 2e-9 * -1e-9 / 5
+    np.testing.assert_allclose(summary.energies, [pair_energy, pair_energy])
+    assert summary.total_energy == pytest.approx(pair_energy)
+
+
+def test_tree_matches_pairwise_sum():
+    rng = np.random.default_rng(0)
+    rows = np.column_stack((rng.uniform(-5, 5, (300, 2)), rng.choice([-1e-9, 1e-9], 300)))
+    config = parse_config(repr([tuple(row) for row in rows.tolist()]))
+    direct = summarize(config, tree_threshold=10**9)
+    tree = summarize(config, tree_threshold=1)
+    scale = np.median(np.linalg.norm(direct.forces, axis=1))
+    assert np.median(np.linalg.norm(tree.forces - direct.forces, axis=1)) < 1e-2 * scale
+    assert tree.total_energy == pytest.approx(direct.total_energy, rel=1e-2)
+    np.testing.assert_array_equal(tree.dipole, direct.dipole)
+
+
+def test_charge_above_grounded_plane():
+    h, q = 0.5, 1e-9
+    summary = summarize(parse_config(f"[(0, {h}, {q}), ('plane', 0, 0, 0, 1)]"))
+    np.testing.assert_allclose(summary.forces, [[0.0, -K * q * q / (2 * h) ** 2]], atol=1e-20)
+    # The charge sits in the potential of its image; only half of that is
+    # stored energy, the induced charge grows with it.
+    assert summary.energies[0] == pytest.approx(-K * q * q / (2 * h))
+    assert summary.total_energy == pytest.approx(-K * q * q / (4 * h))
+
+
+def test_external_distribution_acts_on_the_charges():
+    summary = summarize(parse_config("[(0, 1, 1e-9), ('segment', -50, 0, 50, 0, 1e-9, 1e-9)]"))
+    # A long line charge: E = 2 K λ / r, with no self-energy of the line.
+    assert summary.forces[0, 0] == pytest.approx(0.0, abs=1e-12)
+    assert summary.forces[0, 1] == pytest.approx(2 * K * 1e-9 * 1e-9, rel=1e-3)
+    assert summary.total_energy == pytest.approx(summary.energies[0])
+
+
+def test_multipoles():
+    a, q = 2.0, 1e-9
+    dipole = summarize(parse_config(f"[({a}, 0, {q}), ({-a}, 0, {-q})]"))
+    np.testing.assert_allclose(dipole.dipole, [2 * q * a, 0.0])
+    np.testing.assert_allclose(dipole.quadrupole, [0.0, 0.0, 0.0], atol=1e-25)
+
+    linear = summarize(parse_config(f"[({a}, 0, {q}), ({-a}, 0, {q}), (0, 0, {-2 * q})]"))
+    np.testing.assert_allclose(linear.dipole, [0.0, 0.0], atol=1e-25)
+    np.testing.assert_allclose(linear.quadrupole, [4 * q * a * a, -2 * q * a * a, 0.0])
+
+    diagonal = summarize(
+        parse_config(f"[(1, 1, {q}), (-1, -1, {q}), (1, -1, {-q}), (-1, 1, {-q})]")
+    )
+    np.testing.assert_allclose(diagonal.quadrupole, [0.0, 0.0, 12 * q], atol=1e-25)
+
+
+def test_multipoles_include_distributions():
+    # A uniform segment of total charge 4e-9 centred on (1, 0).
+    summary = summarize(parse_config("[(0, 5, 0), ('segment', 0, 0, 2, 0, 2e-9, 2e-9)]"))
+    np.testing.assert_allclose(summary.dipole, [4e-9, 0.0], rtol=1e-6, atol=1e-20)
@@ -0,0 +1,109 @@
+import io
+
+import numpy as np
+import pytest
+
+from fieldsim.charges import parse_config
+from fieldsim.engine import compute_field
+from fieldsim.sweep import (
+    GIF_TRAILER,
+    Sweep,
+    SweepRenderer,
+    _split_gif,
+    gif_frame,
+    gif_stream,
+    iter_frames,
+)
+
+Image = pytest.importorskip("PIL.Image")
+
+COLORS = [(255, 0, 0), (0, 128, 255), (20, 200, 40)]
+
+
+def single_gif(color, size=(6, 4), **params):
+    image = Image.new("RGB", size, color)
+    image.putpixel((0, 0), (255, 255, 255))
+    out = io.BytesIO()
+    image.quantize(256, dither=Image.Dither.NONE).save(out, format="GIF", **params)
+    return out.getvalue()
+
+
+def read_frames(data):
+    image = Image.open(io.BytesIO(data))
+    frames = []
+    for k in range(image.n_frames):
+        image.seek(k)
+        frames.append((image.convert("RGB").getpixel((3, 2)), image.info.get("duration")))
+    return image, frames
+
+
+def test_split_gif_finds_the_first_image():
+    # PIL writes a global table and, with a duration, a graphic control extension.
+    data = single_gif(COLORS[0], duration=500, comment=b"skipped")
+    screen, table, image = _split_gif(data)
+    assert screen[:4] == data[6:10]
+    assert len(table) % 3 == 0 and bytes(COLORS[0]) in table
+    # Image descriptor, LZW code size, sub-blocks up to the terminator.
+    assert image[:4] == b"\0\0\0\0" and image[4:8] == b"\x06\0\x04\0"
+    assert image.endswith(b"\0") and image[9:] in data
+
+
+def test_split_gif_rejects_other_blocks():
+    data = single_gif(COLORS[0])
+    screen, table, _ = _split_gif(data)
+    with pytest.raises(ValueError, match="unexpected GIF block"):
+        _split_gif(data[: 13 + len(table)] + b"\x3b")
+
+
+@pytest.mark.parametrize("delay", [0.1, 0.25])
+def test_gif_stream_joins_frames(delay):
+    chunks = list(gif_stream((single_gif(c) for c in COLORS), delay))
+    assert len(chunks) == len(COLORS) + 1
+    assert chunks[0].startswith(b"GIF89a") and not chunks[1].startswith(b"GIF")
+    assert chunks[-1] == GIF_TRAILER
+    image, frames = read_frames(b"".join(chunks))
+    assert image.info["loop"] == 0
+    assert frames == [(color, round(delay * 1000)) for color in COLORS]
+
+
+def test_gif_frame_keeps_each_palette():
+    # Frames with entirely different palettes, and one interlaced.
+    first = single_gif(COLORS[0])
+    second = single_gif(COLORS[1], interlace=True)
+    data = gif_frame(first, first=True) + gif_frame(second) + GIF_TRAILER
+    _, frames = read_frames(data)
+    assert [color for color, _ in frames] == COLORS[:2]
+
+
+def test_sweep_validation():
+    config = parse_config("[(0, 0, 1e-9), (1, 0, -1e-9)]")
+    with pytest.raises(ValueError):
+        Sweep(config, 2, "x", 0, 1, 10)
+    with pytest.raises(ValueError):
+        Sweep(config, 0, "z", 0, 1, 10)
+    with pytest.raises(ValueError):
+        Sweep(config, 0, "x", 0, 1, 1)
+    sweep = Sweep(config, 1, "q", -1e-9, 1e-9, 5)
+    np.testing.assert_allclose(sweep.frame_config(4).charges, [[0, 0, 1e-9], [1, 0, 1e-9]])
+    np.testing.assert_array_equal(sweep.config.charges[1], [1, 0, -1e-9])
+
+
+def test_renderer_field_matches_the_frame_config():
+    config = parse_config("[(0, 1, 1e-9), (1, 2, -1e-9), ('sphere', 0, -1, 0.5)]")
+    sweep = Sweep(config, 1, "x", -2, 2, 3)
+    renderer = SweepRenderer(sweep)
+    for k in range(sweep.frames):
+        field = renderer.field(k)
+        expected = compute_field(sweep.frame_config(k), (renderer.x, renderer.y))
+        scale = np.abs(expected.V).max()
+        np.testing.assert_allclose(field.V, expected.V, atol=1e-10 * scale)
+    # The grid covers both ends of the path.
+    assert renderer.x.min() < -2 and renderer.x.max() > 2
+
+
+def test_rendered_sweep_is_an_animation():
+    sweep = Sweep(parse_config("[(0, 0, 1e-9), (1, 0, -1e-9)]"), 1, "y", -1, 1, 3)
+    data = b"".join(gif_stream(iter_frames(sweep, dpi=20, workers=1)))
+    image = Image.open(io.BytesIO(data))
+    assert image.n_frames == 3
+    assert image.size == (128, 96)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from fieldsim import symmetry
+from fieldsim.kernel import superpose
+from fieldsim.symmetry import detect_symmetries, symmetric_superpose
+
+
+def grid(n, m=None, half=3.0):
+    m = n if m is None else m
+    return np.meshgrid(np.linspace(-half, half, n), np.linspace(-half, half, m))
+
+
+def square_lattice(size=4):
+    coords = np.arange(size) - (size - 1) / 2
+    return np.array([(x, y, 1.0) for x in coords for y in coords])
+
+
+CASES = {
+    # Every operation of the square, with even parity.
+    "lattice": (square_lattice(), 41, 41, 7),
+    # Only mirror_y keeps the signs; mirror_x and rot180 flip them.
+    "dipoles": (np.array([[-1, 1, 1], [1, 1, -1], [-1, -1, 1], [1, -1, -1.0]]), 41, 31, 3),
+    # Rectangular grid: no square operations even though the charges allow them.
+    "rectangle": (square_lattice(), 40, 30, 3),
+    # SI-scale charges: only mirror_y maps the 1e-10 C charges onto each other.
+    "si_charges": (
+        np.array([[-1, 1, 1e-10], [1, 1, 3e-10], [-1, -1, 1e-10], [1, -1, 3e-10]]),
+        41,
+        41,
+        1,
+    ),
+    "none": (
+        np.array([[0.3, 0.1, 1], [-1.2, 0.7, 2], [0.5, -1.1, -1], [1.9, 1.3, 1.0]]),
+        41,
+        41,
+        0,
+    ),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_matches_direct_kernel(name):
+    charges, n, m, count = CASES[name]
+    x, y = grid(n, m)
+    assert len(detect_symmetries(charges, x, y)) == count
+    expected = superpose(charges, x, y)
+    for actual, want in zip(symmetric_superpose(charges, x, y), expected):
+        np.testing.assert_allclose(actual, want, rtol=1e-9, atol=1e-9 * np.abs(want).max())
+
+
+def test_dipole_parity():
+    charges = CASES["dipoles"][0]
+    x, y = grid(41, 31)
+    found = {s.name: parity for s, parity in detect_symmetries(charges, x, y)}
+    assert found == {"mirror_x": -1, "mirror_y": 1, "rot180": -1}
+
+
+def test_only_the_fundamental_domain_is_computed(monkeypatch):
+    evaluated = []
+
+    def counting_superpose(charges, x, y):
+        evaluated.append(x.size)
+        return superpose(charges, x, y)
+
+    monkeypatch.setattr(symmetry, "superpose", counting_superpose)
+    x, y = grid(41)
+    symmetric_superpose(square_lattice(), x, y)
+    # One eighth of the square, plus the points on its mirror lines.
+    assert evaluated == [21 * 22 // 2]
+
+
+def test_off_centre_charges_break_the_symmetry():
+    charges = square_lattice()
+    charges[0, 0] += 1e-3
+    x, y = grid(41)
+    assert detect_symmetries(charges, x, y) == []
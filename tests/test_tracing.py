@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from fieldsim.tracing import BUCKETS, Tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+
+    @tracer.timed("compute")
+    def compute(x):
+        return 2 * x
+
+    assert compute(3) == 6
+    with tracer.span("parse") as span:
+        assert span is None
+    assert tracer.chrome_trace()["traceEvents"] == []
+    assert "fieldsim_stage_seconds_bucket" not in tracer.prometheus()
+
+
+def test_spans_are_exported_as_chrome_trace_events():
+    tracer = Tracer(enabled=True)
+
+    @tracer.timed("compute")
+    def compute(x):
+        with tracer.span("encode", output="plot"):
+            return 2 * x
+
+    assert compute.__name__ == "compute"
+    assert compute(3) == 6
+    events = tracer.chrome_trace()["traceEvents"]
+    # Inner spans end, and are recorded, first.
+    assert [e["name"] for e in events] == ["encode", "compute"]
+    encode, outer = events
+    assert encode["args"] == {"output": "plot"} and outer["args"] == {}
+    assert {e["ph"] for e in events} == {"X"}
+    assert outer["ts"] <= encode["ts"]
+    assert encode["ts"] + encode["dur"] <= outer["ts"] + outer["dur"]
+    assert encode["tid"] == outer["tid"] == threading.get_native_id()
+
+
+def test_failures_are_counted_and_propagated():
+    tracer = Tracer(enabled=True)
+
+    @tracer.timed("parse")
+    def parse():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        parse()
+    with tracer.span("parse"):
+        pass
+    metrics = tracer.prometheus()
+    assert 'fieldsim_stage_seconds_count{stage="parse"} 2\n' in metrics
+    assert 'fieldsim_stage_errors_total{stage="parse"} 1\n' in metrics
+
+
+def test_prometheus_buckets_are_cumulative():
+    tracer = Tracer(enabled=True)
+    for seconds in (0.0005, 0.003, 0.003, 20.0):
+        tracer.record("compute", 0, int(seconds * 1e9), {})
+    samples = [line for line in tracer.prometheus().splitlines() if not line.startswith("#")]
+    lines = dict(line.rsplit(" ", 1) for line in samples)
+    bucket = 'fieldsim_stage_seconds_bucket{{stage="compute",le="{}"}}'.format
+    assert lines[bucket(0.001)] == "1"
+    assert lines[bucket(0.0025)] == "1"
+    assert lines[bucket(0.005)] == "3"
+    assert lines[bucket(BUCKETS[-1])] == "3"
+    assert lines[bucket("+Inf")] == "4"
+    assert float(lines['fieldsim_stage_seconds_sum{stage="compute"}']) == pytest.approx(20.0065)
+    assert lines['fieldsim_stage_seconds_count{stage="compute"}'] == "4"
+
+
+def test_ring_buffer_keeps_the_latest_spans_but_counts_all():
+    tracer = Tracer(enabled=True, capacity=3)
+    for k in range(5):
+        tracer.record("send", k, k + 1, {"k": k})
+    assert [e["args"]["k"] for e in tracer.chrome_trace()["traceEvents"]] == [2, 3, 4]
+    assert 'fieldsim_stage_seconds_count{stage="send"} 5\n' in tracer.prometheus()
+    tracer.clear()
+    assert tracer.chrome_trace()["traceEvents"] == []
+
+
+def test_spans_from_many_threads():
+    tracer = Tracer(enabled=True)
+
+    def work():
+        for _ in range(200):
+            with tracer.span("trace"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(tracer.chrome_trace()["traceEvents"]) == 800
+    assert 'fieldsim_stage_seconds_count{stage="trace"} 800\n' in tracer.prometheus()
+
+
+def test_debug_routes():
+    pytest.importorskip("httpx")
+    from starlette.applications import Starlette
+    from starlette.testclient import TestClient
+
+    tracer = Tracer(enabled=True)
+    with tracer.span("compute"):
+        pass
+    with TestClient(Starlette(routes=tracer.routes())) as client:
+        trace = client.get("/debug/trace.json")
+        metrics = client.get("/debug/metrics")
+    assert trace.json()["traceEvents"][0]["name"] == "compute"
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'fieldsim_stage_seconds_count{stage="compute"} 1' in metrics.text
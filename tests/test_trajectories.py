@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from fieldsim.charges import Config, parse_config
+from fieldsim.engine import compute_field, field_at
+from fieldsim.trajectories import COLLIDED, ESCAPED, RUNNING, GridField, launch_fan, trace
+
+# 1 nC gives K q = 9, so a unit test charge of -1 has a circular speed of 3 at r = 1.
+CENTRAL = Config(np.array([[0.0, 0.0, 1e-9]]))
+
+
+def energy(config, state, q=1.0, m=1.0):
+    _, _, V = field_at(config, state[:, 0], state[:, 1])
+    return 0.5 * m * (state[:, 2:] ** 2).sum(axis=1) + q * V
+
+
+def test_circular_orbit_keeps_its_radius():
+    start = np.array([[1.0, 0.0, 0.0, 3.0], [0.0, -2.0, 3 / np.sqrt(2), 0.0]])
+    result = trace(CENTRAL, start, q=-1.0, duration=2 * np.pi, max_steps=100_000)
+    assert result.t[-1] == pytest.approx(2 * np.pi)
+    assert (result.status == RUNNING).all()
+    radii = np.linalg.norm(result.paths, axis=-1)
+    np.testing.assert_allclose(radii, [[1.0, 2.0]] * len(radii), rtol=1e-3)
+    np.testing.assert_allclose(
+        energy(CENTRAL, result.state, q=-1.0), energy(CENTRAL, start, q=-1.0), rtol=1e-4
+    )
+
+
+def test_energy_is_conserved_in_a_dipole():
+    config = parse_config("[(-1, 0, 1e-9), (1, 0, -1e-9)]")
+    start = launch_fan(0.0, 1.0, 2.0, 8)
+    result = trace(config, start, duration=1.0, max_steps=100_000)
+    running = result.status == RUNNING
+    assert running.any()
+    drift = energy(config, result.state) - energy(config, start)
+    assert np.abs(drift[running]).max() < 1e-3 * np.abs(energy(config, start)).max()
+
+
+def test_grid_field_follows_the_direct_paths():
+    config = parse_config("[(-1, 0, 1e-9), (1, 0.5, -2e-9), (0, -1, 1e-9)]")
+    field = compute_field(config)
+    start = launch_fan(0.0, 2.0, 1.0, 6, spread=90, heading=-90)
+    direct = trace(config, start, duration=1.0, max_steps=100_000)
+    cached = trace(config, start, field=field, duration=1.0, max_steps=100_000)
+    np.testing.assert_array_equal(cached.status, direct.status)
+    size = np.ptp(field.x)
+    np.testing.assert_allclose(cached.state[:, :2], direct.state[:, :2], atol=1e-3 * size)
+
+
+def test_grid_field_is_accurate_where_it_claims_to_be():
+    config = parse_config("[(-1, 0, 1e-9), (1, 0.5, -2e-9)]")
+    grid = GridField(compute_field(config), tol=1e-2)
+    assert grid.accurate.any()
+    rng = np.random.default_rng(0)
+    x = rng.uniform(grid.field.x.min(), grid.field.x.max(), 20_000)
+    y = rng.uniform(grid.field.y.min(), grid.field.y.max(), 20_000)
+    Ex, Ey, usable = grid.lookup(x, y)
+    ex, ey, _ = field_at(config, x[usable], y[usable])
+    error = np.hypot(Ex[usable] - ex, Ey[usable] - ey) / np.hypot(ex, ey)
+    assert error.max() < 1e-2
+
+
+def test_particles_collide_and_escape():
+    # One falls straight into the charge, the other is repelled.
+    start = np.array([[1.0, 0.0, -1.0, 0.0], [0.0, 1.0, 0.0, 1.0]])
+    result = trace(CENTRAL, start, q=-1.0, max_steps=100_000)
+    assert result.status[0] == COLLIDED
+    assert np.hypot(*result.state[0, :2]) < 0.05
+    result = trace(CENTRAL, start[1:], q=1.0, max_steps=100_000)
+    assert result.status[0] == ESCAPED
+    # Stopped particles stay where they stopped.
+    assert (result.paths[-1] == result.state[:, :2]).all()
+
+
+def test_conductors_stop_particles():
+    config = parse_config("[(0, 2, 1e-9), ('plane', 0, 0, 0, 1)]")
+    result = trace(config, np.array([[0.5, 1.0, 0.0, 0.0]]), max_steps=100_000)
+    assert result.status[0] == COLLIDED
+    assert result.state[0, 1] <= 0
+
+
+def test_record_every_thins_the_paths():
+    start = np.array([[1.0, 0.0, 0.0, 3.0]])
+    full = trace(CENTRAL, start, q=-1.0, max_steps=100)
+    thin = trace(CENTRAL, start, q=-1.0, max_steps=100, record_every=10)
+    assert len(full.t) == 101
+    assert len(thin.t) == 11
+    np.testing.assert_array_equal(thin.paths, full.paths[::10])
+
+
+def test_launch_fan():
+    fan = launch_fan(1.0, 2.0, 3.0, 4)
+    np.testing.assert_allclose(fan[:, :2], [[1.0, 2.0]] * 4)
+    np.testing.assert_allclose(fan[:, 2:], [[3, 0], [0, 3], [-3, 0], [0, -3]], atol=1e-12)
+    cone = launch_fan(0.0, 0.0, 1.0, 3, spread=90, heading=90)
+    np.testing.assert_allclose(np.degrees(np.arctan2(cone[:, 3], cone[:, 2])), [45, 90, 135])
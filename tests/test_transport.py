@@ -0,0 +1,92 @@
+import asyncio
+import base64
+
+import numpy as np
+import pytest
+
+from fieldsim.charges import parse_config
+from fieldsim.engine import compute_field
+from fieldsim.raster import PALETTES, scale_magnitude, scale_potential
+from fieldsim.transport import (
+    dequantize_float16,
+    dequantize_uint16,
+    downsample,
+    encode_field,
+    quantize_float16,
+    quantize_uint16,
+)
+
+CONFIG = "[(0, 1, -2), (-1, 2, 3), (4, -1, 7), (0, 0, -1)]"
+
+
+def test_float16_keeps_three_significant_digits():
+    rng = np.random.default_rng(0)
+    # Within the normal float16 range once divided by the scale.
+    values = rng.choice([-1, 1], 1000) * 10 ** rng.uniform(-3, 4, 1000)
+    decoded = dequantize_float16(quantize_float16(values, 2.5), 2.5, values.shape)
+    np.testing.assert_allclose(decoded, values, rtol=2**-11)
+
+
+def test_float16_clips_and_zeroes_what_it_cannot_hold():
+    values = np.array([1e9, -1e9, np.nan, 0.0])
+    decoded = dequantize_float16(quantize_float16(values, 1.0), 1.0, values.shape)
+    limit = float(np.finfo(np.float16).max)
+    np.testing.assert_array_equal(decoded, [limit, -limit, 0.0, 0.0])
+
+
+def test_uint16_error_is_half_a_step():
+    values = np.linspace(0, 1, 1001).reshape(7, 143)
+    decoded = dequantize_uint16(quantize_uint16(values), values.shape)
+    assert np.abs(decoded - values).max() <= 0.5 / 65535
+    clipped = dequantize_uint16(quantize_uint16(np.array([-1.0, 2.0])), (2,))
+    np.testing.assert_array_equal(clipped, [0.0, 1.0])
+
+
+def test_downsample_bounds_the_longest_side():
+    field = compute_field(parse_config(CONFIG))
+    assert downsample(field, max(field.x.shape)) is field
+    small = downsample(field, 20)
+    assert max(small.x.shape) <= 20
+    np.testing.assert_array_equal(small.Ex, field.Ex[::4, ::4])
+
+
+def test_encode_field():
+    field = compute_field(parse_config(CONFIG))
+    payload = encode_field(field, max_side=40)
+    small = downsample(field, 40)
+    shape = tuple(payload["shape"])
+    assert shape == small.x.shape
+    assert payload["extent"] == [small.x[0, 0], small.x[0, -1], small.y[0, 0], small.y[-1, 0]]
+    assert payload["scale"] == np.median(np.hypot(small.Ex, small.Ey))
+    assert payload["charges"] == field.config.charges.tolist()
+
+    scale = payload["scale"]
+    for name, values in (("ex", small.Ex), ("ey", small.Ey)):
+        decoded = dequantize_float16(payload[name], scale, shape)
+        np.testing.assert_allclose(decoded, values, rtol=2**-11, atol=1e-4 * scale)
+    for name, values in (("magnitude", scale_magnitude(small)), ("potential", scale_potential(small))):
+        decoded = dequantize_uint16(payload[name], shape)
+        assert np.abs(decoded - values).max() <= 0.5 / 65535
+    assert payload["palettes"].keys() == PALETTES.keys()
+    for name, palette in PALETTES.items():
+        assert base64.b64decode(payload["palettes"][name]) == palette.tobytes()
+
+
+def test_field_canvas_renders_the_payload():
+    pytest.importorskip("shiny")
+    from shiny.express._stub_session import ExpressStubSession
+    from shiny.session import session_context
+
+    from fieldsim.output import field_canvas
+
+    field = compute_field(parse_config(CONFIG))
+    with session_context(ExpressStubSession()):
+
+        @field_canvas(max_side=30)
+        def canvas():
+            return field
+
+        ui = str(canvas.tagify())
+    assert 'id="canvas"' in ui
+    assert "fieldsim-canvas-output" in ui
+    assert asyncio.run(canvas.render()) == encode_field(field, 30)